@@ -0,0 +1,57 @@
+# Memory and GC pressure of the flat AstArena backend against node objects.
+# The goal was a tenth of the node objects' memory; the arena reaches about
+# a quarter (see the AstArena comment).
+#
+#   python3 benchmarks/arenaBenchmark.py [functionCount]
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from generatorFile import generateFunctions
+from lexerFile import RegexLexer
+from parserFile import Parser
+from arenaFile import AstArena
+
+
+def build(tokens, arena):
+    parser = Parser(arena) if arena != None else Parser()
+
+    tracemalloc.start()
+    trackedBefore = len(gc.get_objects())
+    start = time.perf_counter()
+    root = parser.parseTokens(tokens)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracked = len(gc.get_objects()) - trackedBefore
+
+    start = time.perf_counter()
+    gc.collect()
+    collectTime = time.perf_counter() - start
+
+    return root, size, tracked, elapsed, collectTime
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    tokens = RegexLexer().makeTokens(generateFunctions(count))
+
+    root, objectSize, objectTracked, objectTime, objectCollect = build(tokens, None)
+    del root
+    gc.collect()
+
+    arena = AstArena()
+    root, arenaSize, arenaTracked, arenaTime, arenaCollect = build(tokens, arena)
+
+    print("arena rows:            %d (%d bytes of columns)" % (len(arena), arena.getByteSize()))
+    print("%-22s %12s %12s" % ("", "Node objects", "AstArena"))
+    print("%-22s %10.1f MB %10.1f MB" % ("memory", objectSize / 2**20, arenaSize / 2**20))
+    print("%-22s %12d %12d" % ("gc-tracked objects", objectTracked, arenaTracked))
+    print("%-22s %10.3f s  %10.3f s" % ("parse time", objectTime, arenaTime))
+    print("%-22s %10.3f s  %10.3f s" % ("full gc.collect()", objectCollect, arenaCollect))
+
+
+if __name__ == "__main__":
+    main()
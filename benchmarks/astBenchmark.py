@@ -0,0 +1,131 @@
+# AST memory footprint and traversal speed of the slotted node classes
+# against the previous representation, where every Node carried its own
+# attribute-name and value lists and getValue scanned them linearly.
+#
+#   python3 benchmarks/astBenchmark.py [functionCount]
+
+import sys
+import time
+import tracemalloc
+
+from generatorFile import generateFunctions
+from lexerFile import RegexLexer
+from parserFile import Parser
+
+
+class ListNode:
+    # the old generic Node, kept here only as the baseline
+    def __init__(self, nodeType, attributes, values):
+        self.attributes = attributes
+        self.values = values
+        self.type = nodeType
+
+    def getAttributes(self):
+        return self.attributes
+
+    def getValue(self, attribute):
+        i = 0
+        while i < len(self.attributes) and self.attributes[i] != attribute:
+            i += 1
+        return self.values[i]
+
+    def getType(self):
+        return self.type
+
+
+def toListNodes(node):
+    values = []
+    for attr in node.getAttributes():
+        value = node.getValue(attr)
+        if ".node" in attr and value != None:
+            value = toListNodes(value)
+        elif ".list" in attr and value != None:
+            value = [toListNodes(elem) for elem in value]
+        values.append(value)
+
+    return ListNode(node.getType(), list(node.getAttributes()), values)
+
+
+def countNodes(node):
+    count = 1
+    for attr in node.getAttributes():
+        value = node.getValue(attr)
+        if ".node" in attr and value != None:
+            count += countNodes(value)
+        elif ".list" in attr and value != None:
+            for elem in value:
+                count += countNodes(elem)
+    return count
+
+
+# slotted nodes walked through their fields directly, without the
+# getValue shim; postfixExpression's field is a node, a list or a name
+def countNodesDirect(node):
+    count = 1
+    for field, kind in directFields(node):
+        value = getattr(node, field)
+        if value == None:
+            continue
+        if kind == "node":
+            count += countNodesDirect(value)
+        elif kind == "list":
+            for elem in value:
+                count += countNodesDirect(elem)
+    return count
+
+
+childFieldCache = {}
+
+def directFields(node):
+    if node.getType() == "postfixExpression":
+        kind = {"[]": "node", "()": "list"}.get(node.operator)
+        return [("field", kind)]
+
+    fields = childFieldCache.get(node.__class__)
+    if fields == None:
+        fields = [tuple(attr.split(".")) for attr in node.getAttributes()]
+        fields = [(field, kind) for field, kind in fields if kind != "lit"]
+        childFieldCache[node.__class__] = fields
+    return fields
+
+
+def traced(function, *args):
+    tracemalloc.start()
+    result = function(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(function, *args):
+    best = None
+    for attempt in range(3):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    tokens = RegexLexer().makeTokens(generateFunctions(count))
+
+    program, slottedSize = traced(Parser().parseTokens, tokens)
+    listProgram, listSize = traced(toListNodes, program)
+    nodes = countNodes(program)
+
+    print("nodes:                %d" % nodes)
+    print("attribute-list nodes: %.1f MB, %.1f bytes/node" % (listSize / 2**20, listSize / nodes))
+    print("slotted nodes:        %.1f MB, %.1f bytes/node" % (slottedSize / 2**20, slottedSize / nodes))
+
+    listTime = timed(countNodes, listProgram)
+    slottedTime = timed(countNodes, program)
+    directTime = timed(countNodesDirect, program)
+    print("traversal, attribute-list nodes:        %.3f s" % listTime)
+    print("traversal, slotted nodes via getValue:  %.3f s" % slottedTime)
+    print("traversal, slotted nodes, direct:       %.3f s" % directTime)
+
+
+if __name__ == "__main__":
+    main()
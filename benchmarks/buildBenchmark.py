@@ -0,0 +1,70 @@
+# Cold and warm multi-file builds through the on-disk AST cache, on a
+# generated corpus of hundreds of files: without the cache, with an empty
+# cache (parse and store every file), with a full cache (load every file)
+# and after editing a tenth of the files.
+#
+#   python3 benchmarks/buildBenchmark.py [fileCount] [unitsPerFile]
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from generatorFile import generateFunction, formatSize
+from builderFile import Builder
+from cacheFile import AstCache
+
+
+def writeCorpus(directory, fileCount, unitsPerFile):
+    size = 0
+    for fileIndex in range(fileCount):
+        text = "".join(generateFunction(fileIndex * unitsPerFile + unit) for unit in range(unitsPerFile))
+        with open(os.path.join(directory, "file%04d.src" % fileIndex), "w") as file:
+            file.write(text)
+        size += len(text)
+    return size
+
+
+def timedBuild(builder, directory):
+    start = time.perf_counter()
+    sourceFiles = builder.build([directory])
+    elapsed = time.perf_counter() - start
+    cached = sum(1 for sourceFile in sourceFiles if sourceFile.cached)
+    return elapsed, cached
+
+
+def main():
+    fileCount = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    unitsPerFile = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    root = tempfile.mkdtemp()
+    try:
+        sourceDir = os.path.join(root, "sources")
+        cacheDir = os.path.join(root, "cache")
+        os.mkdir(sourceDir)
+        size = writeCorpus(sourceDir, fileCount, unitsPerFile)
+        print("corpus:           %d files, %s" % (fileCount, formatSize(size)))
+
+        elapsed, cached = timedBuild(Builder(), sourceDir)
+        print("no cache:         %.3f s" % elapsed)
+
+        cache = AstCache(cacheDir)
+        elapsed, cached = timedBuild(Builder(cache), sourceDir)
+        cacheSize = sum(os.path.getsize(os.path.join(cacheDir, name)) for name in os.listdir(cacheDir))
+        print("cold cache:       %.3f s   (%d from cache, %s cached)" % (elapsed, cached, formatSize(cacheSize)))
+
+        elapsed, cached = timedBuild(Builder(cache), sourceDir)
+        print("warm cache:       %.3f s   (%d from cache)" % (elapsed, cached))
+
+        for fileIndex in range(0, fileCount, 10):
+            with open(os.path.join(sourceDir, "file%04d.src" % fileIndex), "a") as file:
+                file.write("\nvar int edited%d = 1;\n" % fileIndex)
+        elapsed, cached = timedBuild(Builder(cache), sourceDir)
+        print("10%% edited:       %.3f s   (%d from cache)" % (elapsed, cached))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Dumping a tree of about a million nodes with AstDumper in each format,
+# to a file and to /dev/null, against the old SyntaxTree that called
+# print once per node. The tree is parsed from a generated file.
+#
+#   python3 benchmarks/dumperBenchmark.py [unitCount]
+#
+# Every generated unit is a struct and two functions, about 94 nodes.
+
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+from generatorFile import generateFunctions, formatSize
+from lexerFile import RegexLexer
+from parserFile import Parser
+from visitorFile import Visitor, walk
+from dumperFile import AstDumper
+
+
+class PrintingTree(Visitor):
+    # SyntaxTree as it was, one print per node
+    def enterNode(self, node, depth):
+        if node.getType() == "binaryExpression":
+            print("   " * depth + node.getValue("operator.lit"))
+        else:
+            print("   " * depth + node.getType())
+
+
+def printTree(program, path):
+    with open(path, "w") as file, contextlib.redirect_stdout(file):
+        PrintingTree().visit(program)
+
+
+def dumpTree(program, path, format):
+    with open(path, "w") as file:
+        AstDumper(file, format).dump(program)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 11000
+
+    text = generateFunctions(count)
+    program = Parser().parseTokens(RegexLexer().makeTokens(text))
+    print("source size:      " + formatSize(len(text)) + ", %d nodes" % sum(1 for node in walk(program)))
+    print()
+
+    handle, path = tempfile.mkstemp()
+    os.close(handle)
+    try:
+        print("%-22s %10s %10s %10s" % ("dump", "file", "/dev/null", "size"))
+
+        fileTime = timed(printTree, program, path)
+        nullTime = timed(printTree, program, os.devnull)
+        print("%-22s %8.2f s %8.2f s %10s" % ("print per node", fileTime, nullTime, formatSize(os.path.getsize(path))))
+
+        for format in AstDumper.formats:
+            fileTime = timed(dumpTree, program, path, format)
+            nullTime = timed(dumpTree, program, os.devnull, format)
+            print("%-22s %8.2f s %8.2f s %10s" % (format, fileTime, nullTime, formatSize(os.path.getsize(path))))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Parse throughput on expression-heavy input: functions whose bodies are
+# long arithmetic and logical expressions, and a single operator chain
+# far longer than the recursion limit would allow a recursive parser.
+#
+#   python3 benchmarks/expressionBenchmark.py [functionCount] [chainLength]
+
+import sys
+import time
+
+from generatorFile import formatSize
+from lexerFile import RegexLexer
+from parserFile import Parser
+
+
+EXPRESSION_TEMPLATE = """
+func int expr{index}(int a, int b, int c){{
+    var int x = a + b * c - (a - b) / 3 + c % 7 * 2 - 1;
+    var int y = x * x - a * b + b * c - c * a + {index};
+    let x = (x + y) * (x - y) / (a * a + 1) + y % 13 - x % 5;
+    if (x < y && a + b >= c || !c && a * 2 != b - 1){{
+        return x + y - a - b - c + 1 - 2 + 3 - 4 + 5;
+    }}
+    return (a + b) * (b + c) * (c + a) - x * y + a * b * c;
+}}
+"""
+
+
+def generateExpressions(count):
+    return "".join(EXPRESSION_TEMPLATE.format(index=index) for index in range(count))
+
+
+def generateChain(length):
+    terms = " + ".join("a%d" % (i % 10) for i in range(length))
+    return "func int chain(){\n    return " + terms + ";\n}\n"
+
+
+def bestParse(tokens):
+    best = None
+    for attempt in range(3):
+        start = time.perf_counter()
+        program = Parser().parseTokens(tokens)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return program, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    chainLength = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+    text = generateExpressions(count)
+    tokens = RegexLexer().makeTokens(text)
+    program, elapsed = bestParse(tokens)
+    print("source size:      " + formatSize(len(text)))
+    print("tokens:           %d" % len(tokens))
+    print("parse time:       %.3f s" % elapsed)
+    print("tokens per sec:   %.0f" % (len(tokens) / elapsed))
+
+    tokens = RegexLexer().makeTokens(generateChain(chainLength))
+    try:
+        program, elapsed = bestParse(tokens)
+        print("chain of %d:  %.3f s" % (chainLength, elapsed))
+    except RecursionError:
+        print("chain of %d:  recursion limit exceeded" % chainLength)
+
+
+if __name__ == "__main__":
+    main()
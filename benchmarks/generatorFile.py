@@ -0,0 +1,63 @@
+# Synthetic source generator shared by the benchmark scripts.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+
+FUNCTION_TEMPLATE = """
+struct node{index}{{
+    int value;
+    int items[{index}];
+}}
+
+func int helper{index}(int i, int value){{
+    return i * value;
+}}
+
+# function number {index}
+func int compute{index}(int count, struct node{index} * head){{
+    var int total = 0;
+    for(var int i = 0; i < count ; i = i + 1){{
+        while( total == (12+4/2) ){{
+            let total = total + helper{index}(i, head->value) * 2;
+        }}
+        if (total > {index}){{
+            return total - 1;
+        }} else {{
+            let total = -total;
+        }}
+    }}
+    return total;
+}}
+"""
+
+
+def generateFunction(index):
+    return FUNCTION_TEMPLATE.format(index=index)
+
+
+def generateProgram(targetSize):
+    parts = []
+    size = 0
+    index = 0
+
+    while size < targetSize:
+        function = generateFunction(index)
+        parts.append(function)
+        size += len(function)
+        index += 1
+
+    return "".join(parts)
+
+
+def generateFunctions(count):
+    return "".join(generateFunction(index) for index in range(count))
+
+
+def formatSize(size):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            return str(round(size, 1)) + " " + unit
+        size /= 1024
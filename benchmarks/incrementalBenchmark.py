@@ -0,0 +1,79 @@
+# Latency of single-character edits on a 50k line file: IncrementalParser
+# against lexing and parsing the whole file again. Edits type a character
+# into a random line and delete it again; a newline is timed separately,
+# since it renumbers the nodes of every declaration after it.
+#
+#   python3 benchmarks/incrementalBenchmark.py [lineCount] [editCount]
+
+import random
+import sys
+import time
+
+from generatorFile import generateFunction, formatSize
+from incrementalFile import IncrementalParser
+from lexerFile import RegexLexer
+from parserFile import Parser
+
+
+def generateLines(lineCount):
+    parts = []
+    lines = 0
+    index = 0
+    while lines < lineCount:
+        function = generateFunction(index)
+        parts.append(function)
+        lines += function.count("\n")
+        index += 1
+    return "".join(parts)
+
+
+def percentile(times, fraction):
+    return sorted(times)[int(fraction * (len(times) - 1))]
+
+
+def timeEdits(parser, offsets, insertedText):
+    times = []
+    for offset in offsets:
+        start = time.perf_counter()
+        parser.edit(offset, 0, insertedText)
+        parser.getProgram()
+        times.append(time.perf_counter() - start)
+
+        parser.edit(offset, len(insertedText), "")
+        parser.getProgram()
+    return times
+
+
+def report(label, times):
+    print("%-22s median %7.2f ms   p95 %7.2f ms   max %7.2f ms" %
+          (label, percentile(times, 0.5) * 1e3, percentile(times, 0.95) * 1e3, max(times) * 1e3))
+
+
+def main():
+    lineCount = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    editCount = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    text = generateLines(lineCount)
+    print("source size:          " + formatSize(len(text)) + ", %d lines" % text.count("\n"))
+
+    start = time.perf_counter()
+    Parser().parseTokens(RegexLexer().makeTokens(text))
+    print("full reparse:         %.1f ms" % ((time.perf_counter() - start) * 1e3))
+
+    start = time.perf_counter()
+    parser = IncrementalParser(text)
+    print("initial parse:        %.1f ms" % ((time.perf_counter() - start) * 1e3))
+
+    # points just after a '(' or ';', where a character can go in without
+    # breaking a token
+    random.seed(1)
+    candidates = [i + 1 for i in range(len(text)) if text[i] in "(;"]
+    offsets = random.sample(candidates, min(editCount, len(candidates)))
+
+    report("space:", timeEdits(parser, offsets, " "))
+    report("identifier char:", timeEdits(parser, offsets, "x"))
+    report("newline:", timeEdits(parser, offsets[:editCount // 4], "\n"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# The symbol index on generated code: building it in one pass over a
+# program, looking up the uses of functions against walking the AST
+# for each, updating it after an edit against building it again, and
+# refreshing a saved index of a multi-file corpus against indexing it
+# from scratch.
+#
+#   python3 benchmarks/indexBenchmark.py [functionCount] [fileCount]
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from generatorFile import generateFunctions, generateFunction, formatSize
+from incrementalFile import IncrementalParser
+from indexFile import SymbolIndex, makeKey, FUNCTION
+from builderFile import Builder
+from visitorFile import walk
+from nodeFile import PostfixExpression, FunctionDeclaration
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+# what finding the call sites of a function takes without an index
+def findCalls(program, name):
+    return [node.line for node, depth in walk(program)
+            if node.__class__ == PostfixExpression and node.operator == "()" and node.identifier == name]
+
+
+def writeCorpus(directory, fileCount):
+    for fileIndex in range(fileCount):
+        with open(os.path.join(directory, "file%04d.src" % fileIndex), "w") as file:
+            file.write("".join(generateFunction(fileIndex * 20 + unit) for unit in range(20)))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    fileCount = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    text = generateFunctions(count)
+    parser = IncrementalParser(text)
+    program = parser.getProgram()
+    names = [decl.identifier for decl in program.declarations if decl.__class__ == FunctionDeclaration]
+
+    print("source size:      " + formatSize(len(text)))
+    print("declarations:     %d" % len(program.declarations))
+
+    index = SymbolIndex()
+    buildTime, result = timed(lambda: index.update("program.src", program))
+    references = sum(len(index.getReferences(key)) for key in index.symbols)
+    print("symbols:          %d" % len(index.symbols))
+    print("references:       %d" % references)
+    print()
+
+    sample = names[::max(len(names) // 100, 1)]
+    walkTime, expected = timed(lambda: [findCalls(program, name) for name in sample])
+    lookupTime, found = timed(lambda: [[location.line for location in index.getUses(makeKey(FUNCTION, name))]
+                                       for name in sample])
+    assert expected == found
+
+    # a declaration added in the middle, then the index brought up to date
+    middle = text.index("func", len(text) // 2)
+    parser.edit(middle, 0, "var int added;\n")
+    program = parser.getProgram()
+    updateTime, result = timed(lambda: index.update("program.src", program))
+    rebuildTime, result = timed(lambda: SymbolIndex().update("program.src", program))
+    del parser, program, index
+
+    print("%-40s %12s" % ("in memory", "time"))
+    print("%-40s %9.1f ms" % ("build in one pass", buildTime * 1e3))
+    print("%-40s %9.1f us" % ("uses of a function, walking the AST", walkTime / len(sample) * 1e6))
+    print("%-40s %9.1f us" % ("uses of a function, from the index", lookupTime / len(sample) * 1e6))
+    print("%-40s %9.1f ms" % ("update after an edit", updateTime * 1e3))
+    print("%-40s %9.1f ms" % ("rebuild after an edit", rebuildTime * 1e3))
+    print()
+
+    directory = tempfile.mkdtemp()
+    writeCorpus(directory, fileCount)
+    builder = Builder()
+    sources = builder.findSources([directory])
+    indexPath = os.path.join(directory, ".symbolindex")
+
+    def refresh():
+        saved = SymbolIndex.open(indexPath)
+        parsed = saved.refresh(builder, sources)
+        saved.save()
+        return parsed
+
+    coldTime, coldParsed = timed(refresh)
+    warmTime, warmParsed = timed(refresh)
+    with open(sources[0], "a") as file:
+        file.write(generateFunction(fileCount * 20))
+    editTime, editParsed = timed(refresh)
+    size = os.path.getsize(indexPath)
+    shutil.rmtree(directory)
+
+    print("%-40s %12s %8s" % ("%d files, saved index (%s)" % (fileCount, formatSize(size)), "time", "parsed"))
+    print("%-40s %9.1f ms %8d" % ("no index yet", coldTime * 1e3, coldParsed))
+    print("%-40s %9.1f ms %8d" % ("nothing changed", warmTime * 1e3, warmParsed))
+    print("%-40s %9.1f ms %8d" % ("one file edited", editTime * 1e3, editParsed))
+
+
+if __name__ == "__main__":
+    main()
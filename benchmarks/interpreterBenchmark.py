@@ -0,0 +1,72 @@
+# Loop-heavy programs from benchmarks/programs run by the tree-walking
+# Interpreter. Also checks that recursion deeper than the Python stack is
+# reported as a runtime error.
+#
+#   python3 benchmarks/interpreterBenchmark.py [program ...]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from lexerFile import RegexLexer
+from parserFile import Parser
+from resolverFile import Resolver
+from interpreterFile import Interpreter, ExecutionError
+
+
+programDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "programs")
+
+
+def loadProgram(name):
+    with open(os.path.join(programDir, name + ".src")) as file:
+        program = Parser().parseTokens(RegexLexer().makeTokens(file.read()))
+    return Resolver().resolveProgram(program)
+
+
+def programNames():
+    if len(sys.argv) > 1:
+        return sys.argv[1:]
+    return sorted(name[:-4] for name in os.listdir(programDir) if name.endswith(".src"))
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+DEEP_RECURSION = """
+func int depth(int n){
+    if (n == 0){
+        return 0;
+    }
+    return 1 + depth(n - 1);
+}
+func int main(){
+    return depth(100000);
+}
+"""
+
+
+def checkCallStackOverflow():
+    program = Resolver().resolveProgram(Parser().parseTokens(RegexLexer().makeTokens(DEEP_RECURSION)))
+    try:
+        Interpreter().run(program)
+    except ExecutionError as error:
+        assert error.message == "call stack overflow" and error.line == 6, str(error)
+    else:
+        assert False, "100000 nested calls did not overflow"
+
+
+def main():
+    for name in programNames():
+        program = loadProgram(name)
+        result, elapsed = timed(Interpreter().run, program)
+        print("%-14s %8.3f s" % (name, elapsed))
+    checkCallStackOverflow()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Time to first execution and memory with and without lazy function
+# bodies, on a generated file of 50k functions of which main calls 1%.
+# Each mode is run twice: once timed, once under tracemalloc for the
+# memory held by the tree after parsing and after running.
+#
+#   python3 benchmarks/lazyBenchmark.py [functionCount] [usedEvery]
+
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+
+from generatorFile import formatSize
+from lexerFile import RegexLexer
+from parserFile import Parser
+from resolverFile import Resolver
+from optimizerFile import Optimizer
+from interpreterFile import Interpreter
+from nodeFile import FunctionDeclaration
+
+
+WORK_TEMPLATE = """
+# function number {index}
+func int work{index}(int count){{
+    var int total = 0;
+    var int i = 0;
+    while(i < count){{
+        if(i % 3 == 0){{
+            let total = total + i * {index};
+        }} else {{
+            let total = total - 1;
+        }}
+        let i = i + 1;
+    }}
+    return total;
+}}
+"""
+
+
+def generateSource(count, usedEvery):
+    parts = [WORK_TEMPLATE.format(index = index) for index in range(count)]
+    parts.append("func int main(){\n    var int sum = 0;\n")
+    for index in range(0, count, usedEvery):
+        parts.append("    let sum = sum + work%d(10);\n" % index)
+    parts.append("    print(sum);\n    return 0;\n}\n")
+    return "".join(parts)
+
+
+# Runs every step up to the end of main, returns the step times and the program
+def runSource(text, lazy):
+    times = []
+    start = time.perf_counter()
+
+    tokens = RegexLexer().makeTokens(text)
+    times.append(time.perf_counter())
+    program = Parser(lazyBodies = lazy).parseTokens(tokens)
+    times.append(time.perf_counter())
+    program = Optimizer().optimizeProgram(Resolver().resolveProgram(program))
+    times.append(time.perf_counter())
+    with contextlib.redirect_stdout(io.StringIO()):
+        Interpreter().run(program)
+    times.append(time.perf_counter())
+
+    return [end - begin for begin, end in zip([start] + times, times)], program
+
+
+def measureMemory(text, lazy):
+    tokens = RegexLexer().makeTokens(text)
+    tracemalloc.start()
+    program = Parser(lazyBodies = lazy).parseTokens(tokens)
+    parsed = tracemalloc.get_traced_memory()[0]
+    program = Optimizer().optimizeProgram(Resolver().resolveProgram(program))
+    with contextlib.redirect_stdout(io.StringIO()):
+        Interpreter().run(program)
+    ran = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return parsed, ran
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    usedEvery = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    text = generateSource(count, usedEvery)
+    print("source size:      " + formatSize(len(text)) + ", %d functions, %d called" %
+          (count + 1, (count + usedEvery - 1) // usedEvery))
+    print()
+
+    print("%-8s %8s %8s %10s %8s %10s %10s %10s %8s" %
+          ("mode", "lex", "parse", "resolve+", "run", "to result", "tree", "after run", "parsed"))
+    for lazy in (False, True):
+        times, program = runSource(text, lazy)
+        functions = [decl for decl in program.declarations if decl.__class__ == FunctionDeclaration]
+        loaded = sum(1 for decl in functions if decl.isBodyLoaded())
+        del program, functions
+
+        parsed, ran = measureMemory(text, lazy)
+        print("%-8s %6.2f s %6.2f s %8.2f s %6.2f s %8.2f s %10s %10s %8d" %
+              ("lazy" if lazy else "eager", times[0], times[1], times[2], times[3], sum(times),
+               formatSize(parsed), formatSize(ran), loaded))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Tokens per second of the character-loop Lexer against the regex RegexLexer.
+#
+#   python3 benchmarks/lexerBenchmark.py [maxSizeInBytes]
+
+import sys
+import time
+
+from generatorFile import generateProgram, formatSize
+from lexerFile import Lexer, RegexLexer
+
+
+SIZES = [1 << 10, 10 << 10, 100 << 10, 1 << 20, 10 << 20, 100 << 20]
+
+# Non-ASCII letters, digits and numerals that both lexers must treat alike
+UNICODE_CASES = ["var int x² = ²2;", "var int Ⅻ = 12;", "let café_٣ = ٣ + ½;", "func int ²x(int é){ return é; }",
+                 "let ③ = µ - ª;", "var int 二 = 〇;"]
+
+
+def measure(lexerClass, text):
+    start = time.perf_counter()
+    tokens = lexerClass().makeTokens(text)
+    elapsed = time.perf_counter() - start
+    return tokens, elapsed
+
+
+def main():
+    maxSize = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+
+    for text in UNICODE_CASES:
+        oldLexer = Lexer()
+        newLexer = RegexLexer()
+        if oldLexer.makeTokens(text) != newLexer.makeTokens(text) or \
+           [str(diagnostic) for diagnostic in oldLexer.diagnostics] != [str(diagnostic) for diagnostic in newLexer.diagnostics]:
+            print("Token streams differ for " + repr(text))
+            exit(-1)
+
+    print("%10s %12s %16s %16s %8s" % ("size", "tokens", "Lexer tok/s", "RegexLexer tok/s", "speedup"))
+    for size in SIZES:
+        if size > maxSize:
+            break
+
+        text = generateProgram(size)
+        oldTokens, oldTime = measure(Lexer, text)
+        newTokens, newTime = measure(RegexLexer, text)
+
+        if oldTokens != newTokens:
+            print("Token streams differ for " + formatSize(size))
+            exit(-1)
+
+        count = len(newTokens)
+        print("%10s %12d %16d %16d %7.1fx" % (formatSize(size), count, count / oldTime, count / newTime, oldTime / newTime))
+        del oldTokens, newTokens
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Node count and run time before and after the Optimizer pass, on the
+# programs in benchmarks/programs and on a generated file.
+#
+#   python3 benchmarks/optimizerBenchmark.py [functionCount]
+
+import contextlib
+import io
+import os
+import subprocess
+import sys
+
+from generatorFile import generateFunctions
+from interpreterBenchmark import loadProgram, programDir, timed
+from lexerFile import RegexLexer
+from parserFile import Parser
+from resolverFile import Resolver
+from optimizerFile import Optimizer
+from visitorFile import walk
+from interpreterFile import Interpreter
+from vmFile import VirtualMachine
+
+
+def countNodes(root):
+    return sum(1 for node, depth in walk(root))
+
+
+# Best of three runs of one program in a fresh interpreter process, so
+# that CPython's specialization for one tree shape does not slow down the
+# other. Prints the program's output and the time.
+def runProgram(name, tierName, optimize):
+    tier = Interpreter if tierName == "ast" else VirtualMachine
+    program = loadProgram(name)
+    if optimize == "1":
+        Optimizer().optimizeProgram(program)
+
+    best = None
+    for attempt in range(3):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            result, elapsed = timed(tier().run, program)
+        best = elapsed if best == None else min(best, elapsed)
+    print(repr(output.getvalue()))
+    print(best)
+
+
+def measure(name, tierName, optimize):
+    lines = subprocess.run([sys.executable, __file__, "--run", name, tierName, optimize],
+                           capture_output=True, text=True).stdout.splitlines()
+    return lines[0], float(lines[1])
+
+
+def main():
+    if sys.argv[1:2] == ["--run"]:
+        runProgram(*sys.argv[2:5])
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    program = Resolver().resolveProgram(Parser().parseTokens(RegexLexer().makeTokens(generateFunctions(count))))
+    before = countNodes(program)
+    optimized, elapsed = timed(Optimizer().optimizeProgram, program)
+    after = countNodes(optimized)
+    print("generated:      %d -> %d nodes (-%.1f%%), pass %.3f s" %
+          (before, after, 100 * (before - after) / before, elapsed))
+
+    print("%-14s %14s %18s %18s" % ("program", "nodes", "ast", "vm"))
+    for name in sorted(name[:-4] for name in os.listdir(programDir) if name.endswith(".src")):
+        program = loadProgram(name)
+        before = countNodes(program)
+        after = countNodes(Optimizer().optimizeProgram(program))
+
+        astOutput, astBefore = measure(name, "ast", "0")
+        astOptimized, astAfter = measure(name, "ast", "1")
+        vmOutput, vmBefore = measure(name, "vm", "0")
+        vmOptimized, vmAfter = measure(name, "vm", "1")
+
+        if astOutput != astOptimized or vmOutput != vmOptimized:
+            print("%-14s output differs after optimizing" % name)
+            continue
+
+        print("%-14s %6d -> %5d %6.3f -> %6.3f s %6.3f -> %6.3f s" %
+              (name, before, after, astBefore, astAfter, vmBefore, vmAfter))
+
+
+if __name__ == "__main__":
+    main()
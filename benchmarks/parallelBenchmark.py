@@ -0,0 +1,53 @@
+# Scaling of ParallelParser from one worker up to the number of cores, on
+# a generated file with 100k functions, against a sequential parse into an
+# AstArena (the same output) and into node objects. Lexing is done once up
+# front and not included.
+#
+#   python3 benchmarks/parallelBenchmark.py [unitCount] [maxWorkers]
+#
+# Every generated unit is a struct and two functions.
+
+import os
+import sys
+import time
+
+from generatorFile import generateFunctions, formatSize
+from lexerFile import RegexLexer
+from parserFile import Parser
+from arenaFile import AstArena
+from parallelFile import ParallelParser
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    maxWorkers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+
+    text = generateFunctions(count)
+    tokens = RegexLexer().makeTokens(text)
+    print("source size:      " + formatSize(len(text)) + ", %d functions" % (count * 2))
+    print("tokens:           %d" % len(tokens))
+
+    program, nodeTime = timed(Parser().parseTokens, tokens)
+    del program
+    arena = AstArena()
+    root, arenaTime = timed(Parser(arena).parseTokens, tokens)
+    del root, arena
+    print("sequential nodes: %.2f s" % nodeTime)
+    print("sequential arena: %.2f s" % arenaTime)
+    print()
+
+    print("%-8s %10s %10s" % ("workers", "time", "speedup"))
+    for workers in range(1, maxWorkers + 1):
+        root, elapsed = timed(ParallelParser(workers).parseTokens, tokens)
+        del root
+        print("%-8d %8.2f s %9.2fx" % (workers, elapsed, arenaTime / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# Parse time per top-level declaration on a file with tens of thousands of
+# functions. Lexing is done up front and not included in the timing.
+#
+#   python3 benchmarks/parserBenchmark.py [functionCount]
+
+import sys
+import time
+
+from generatorFile import generateFunctions, formatSize
+from lexerFile import RegexLexer
+from parserFile import Parser
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = generateFunctions(count)
+    tokens = RegexLexer().makeTokens(text)
+
+    best = None
+    for attempt in range(3):
+        start = time.perf_counter()
+        program = Parser().parseTokens(tokens)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+
+    declarations = len(program.getValue("declarations.list"))
+    print("source size:      " + formatSize(len(text)))
+    print("tokens:           %d" % len(tokens))
+    print("declarations:     %d" % declarations)
+    print("parse time:       %.3f s" % best)
+    print("per declaration:  %.1f us" % (best / declarations * 1e6))
+    print("per token:        %.2f us" % (best / len(tokens) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Cost of timing every grammar rule with Profiler.instrumentParser, and a
+# check that the report has every rule the parser reaches through its
+# declaration and statement dispatch tables.
+#
+#   python3 benchmarks/profilerBenchmark.py [functionCount]
+
+import sys
+import time
+
+from generatorFile import generateFunctions
+from lexerFile import RegexLexer
+from parserFile import Parser
+from profilerFile import Profiler
+
+
+# rules only ever called through Parser.declarationRules / statementRules
+DISPATCHED_RULES = ["parseFunctionDeclaration", "parseStructDeclaration", "parseVariableDeclarationStatement",
+                    "parseIfStatement", "parseWhileStatement", "parseForStatement", "parseReturnStatement",
+                    "parseExpressionStatement"]
+
+
+def timedParse(tokens, profiler):
+    parser = Parser()
+    if profiler != None:
+        profiler.instrumentParser(parser)
+
+    start = time.perf_counter()
+    parser.parseTokens(tokens)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tokens = RegexLexer().makeTokens(generateFunctions(count))
+
+    plainTime = timedParse(tokens, None)
+    profiler = Profiler()
+    profiledTime = timedParse(tokens, profiler)
+
+    rules = profiler.getReport()["rules"]
+    missing = [name for name in DISPATCHED_RULES if name not in rules]
+    assert not missing, "rules missing from the report: " + ", ".join(missing)
+
+    print("rules reported:   %d" % len(rules))
+    print("plain parse:      %.3f s" % plainTime)
+    print("profiled parse:   %.3f s (%.1fx)" % (profiledTime, profiledTime / plainTime))
+    print("%-36s %10s %10s %10s" % ("rule", "calls", "total", "self"))
+    for name in DISPATCHED_RULES:
+        record = rules[name]
+        print("%-36s %10d %8.3f s %8.3f s" % (name, record["calls"], record["total"], record["self"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Parsing a source with syntax errors spread through it: every errorEvery-th
+# function gets a broken expression and a missing ';'. The parser recovers
+# after each one, so a single pass reports them all and still returns the
+# rest of the program. The printed error report is not timed.
+#
+#   python3 benchmarks/recoveryBenchmark.py [functionCount] [errorEvery]
+
+import contextlib
+import io
+import sys
+import time
+
+from generatorFile import generateFunction, formatSize
+from lexerFile import RegexLexer
+from parserFile import Parser
+
+
+def generateBrokenFunctions(count, errorEvery):
+    parts = []
+    for index in range(count):
+        function = generateFunction(index)
+        if index % errorEvery == 0:
+            function = function.replace("return total - 1;", "return total - ;")
+            function = function.replace("var int total = 0;", "var int total = 0")
+        parts.append(function)
+    return "".join(parts)
+
+
+def timedParse(tokens):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        parser = Parser()
+        program = parser.parseTokens(tokens)
+        elapsed = time.perf_counter() - start
+    return parser, program, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    errorEvery = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    text = generateBrokenFunctions(count, errorEvery)
+    tokens = RegexLexer().makeTokens(text)
+    parser, program, elapsed = timedParse(tokens)
+
+    print("source size:      " + formatSize(len(text)))
+    print("tokens:           %d" % len(tokens))
+    print("diagnostics:      %d" % len(parser.diagnostics))
+    print("declarations:     %d of %d" % (len(program.getValue("declarations.list")), count * 3))
+    print("parse time:       %.3f s" % elapsed)
+    print("first:            " + str(parser.diagnostics[0]).split("\n")[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Cost of the Resolver pass on a large file, and run time of the
+# variable-access-heavy loops in benchmarks/programs/variables.src, where
+# every variable access is a slot index instead of a lookup by name.
+#
+#   python3 benchmarks/resolverBenchmark.py [functionCount]
+
+import contextlib
+import io
+import sys
+import time
+
+from generatorFile import generateFunctions, formatSize
+from interpreterBenchmark import loadProgram, timed
+from lexerFile import RegexLexer
+from parserFile import Parser
+from resolverFile import Resolver
+from interpreterFile import Interpreter
+from vmFile import VirtualMachine
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = generateFunctions(count)
+    tokens = RegexLexer().makeTokens(text)
+
+    best = None
+    for attempt in range(3):
+        program = Parser().parseTokens(tokens)
+        start = time.perf_counter()
+        Resolver().resolveProgram(program)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+
+    declarations = len(program.declarations)
+    print("source size:      " + formatSize(len(text)))
+    print("declarations:     %d" % declarations)
+    print("resolve time:     %.3f s" % best)
+    print("per declaration:  %.1f us" % (best / declarations * 1e6))
+
+    program = loadProgram("variables")
+    with contextlib.redirect_stdout(io.StringIO()):
+        result, astTime = timed(Interpreter().run, program)
+        result, vmTime = timed(VirtualMachine().run, program)
+    print("variables.src:    ast %.3f s, vm %.3f s" % (astTime, vmTime))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# File size and load time of the binary AST format against lexing and
+# parsing the source again and against pickle, on a generated file. The
+# mapped load only reads the header; the cost of then touching every row
+# (a walk over all nodes) and of building node objects from the mapping
+# is listed separately, so it can be set against a full reparse or unpickle.
+#
+#   python3 benchmarks/serializerBenchmark.py [unitCount]
+#
+# Every generated unit is a struct and two functions.
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+from generatorFile import generateFunctions, formatSize
+from lexerFile import RegexLexer
+from parserFile import Parser
+from arenaFile import AstArena
+from serializerFile import AstSerializer, MappedArena
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def parseNodes(text):
+    return Parser().parseTokens(RegexLexer().makeTokens(text))
+
+
+def parseArena(text):
+    arena = AstArena()
+    Parser(arena).parseTokens(RegexLexer().makeTokens(text))
+    return arena
+
+
+def loadPickle(path):
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def writePickle(path, value):
+    with open(path, "wb") as file:
+        pickle.dump(value, file, pickle.HIGHEST_PROTOCOL)
+
+
+# Visits every row and every literal tuple, as a pass over the whole tree would.
+def walkArena(arena):
+    literalPool = arena.literalPool
+    count = 0
+    for row in range(len(arena)):
+        count += arena.kinds[row] + arena.firstChildren[row] + arena.nextSiblings[row]
+        literalPool[arena.literals[row]]
+    return count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    text = generateFunctions(count)
+    nodes = parseNodes(text)
+    arena = parseArena(text)
+    print("source size:      " + formatSize(len(text)) + ", %d nodes in the arena" % len(arena))
+
+    directory = tempfile.mkdtemp()
+    try:
+        binaryPath = os.path.join(directory, "ast.astb")
+        nodePicklePath = os.path.join(directory, "nodes.pickle")
+        arenaPicklePath = os.path.join(directory, "arena.pickle")
+
+        serializer = AstSerializer()
+        result, writeTime = timed(serializer.write, arena, binaryPath)
+        result, nodePickleTime = timed(writePickle, nodePicklePath, nodes)
+        result, arenaPickleTime = timed(writePickle, arenaPicklePath, arena)
+        del nodes
+
+        print()
+        print("%-24s %10s %10s" % ("file", "size", "write"))
+        print("%-24s %10s %10s" % ("source", formatSize(len(text)), "-"))
+        print("%-24s %10s %8.3f s" % ("binary AST", formatSize(os.path.getsize(binaryPath)), writeTime))
+        print("%-24s %10s %8.3f s" % ("pickle of nodes", formatSize(os.path.getsize(nodePicklePath)), nodePickleTime))
+        print("%-24s %10s %8.3f s" % ("pickle of arena", formatSize(os.path.getsize(arenaPicklePath)), arenaPickleTime))
+
+        print()
+        print("%-32s %10s" % ("load", "time"))
+        result, elapsed = timed(parseNodes, text)
+        print("%-32s %8.3f s" % ("lex + parse into nodes", elapsed))
+        result, elapsed = timed(parseArena, text)
+        print("%-32s %8.3f s" % ("lex + parse into arena", elapsed))
+        result, elapsed = timed(loadPickle, nodePicklePath)
+        print("%-32s %8.3f s" % ("unpickle nodes", elapsed))
+        result, elapsed = timed(loadPickle, arenaPicklePath)
+        print("%-32s %8.3f s" % ("unpickle arena", elapsed))
+        del result
+
+        mapped, elapsed = timed(MappedArena, binaryPath)
+        print("%-32s %8.3f s" % ("map binary AST", elapsed))
+        total, elapsed = timed(walkArena, mapped)
+        print("%-32s %8.3f s" % ("  then walk every row", elapsed))
+        program, elapsed = timed(mapped.makeNodes)
+        print("%-32s %8.3f s" % ("  then build nodes", elapsed))
+        del program
+        mapped.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# Latency of diagnostics for one file from the language server, which
+# keeps the file parsed between requests, against starting
+# 'python3 src/main.py --no-cache' for it every time: the server asked
+# again about the unchanged file on disk, after the file was edited on
+# disk, and for an open document after a one-character change sent by
+# the client.
+#
+#   python3 benchmarks/serverBenchmark.py [functionCount] [rounds]
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from generatorFile import generateFunctions, formatSize
+
+mainPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "main.py")
+
+
+class Client:
+    # Just enough of an LSP client to time requests.
+
+    def __init__(self):
+        self.process = subprocess.Popen([sys.executable, mainPath, "--server"],
+                                        stdin = subprocess.PIPE, stdout = subprocess.PIPE)
+        self.lastId = 0
+
+
+    def send(self, message):
+        body = json.dumps(message).encode()
+        self.process.stdin.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        self.process.stdin.flush()
+
+
+    def receive(self):
+        length = None
+        while True:
+            header = self.process.stdout.readline().strip()
+            if not header:
+                break
+            name, separator, value = header.partition(b":")
+            if name.lower() == b"content-length":
+                length = int(value)
+        return json.loads(self.process.stdout.read(length))
+
+
+    def request(self, method, params):
+        self.lastId += 1
+        self.send({"jsonrpc": "2.0", "id": self.lastId, "method": method, "params": params})
+        while True:
+            message = self.receive()
+            if message.get("id") == self.lastId:
+                if "error" in message:
+                    raise RuntimeError(message["error"]["message"])
+                return message["result"]
+
+
+    def notify(self, method, params):
+        self.send({"jsonrpc": "2.0", "method": method, "params": params})
+
+
+    def close(self):
+        self.request("shutdown", None)
+        self.notify("exit", None)
+        self.process.wait()
+
+
+def timed(function, rounds):
+    times = []
+    for round in range(rounds):
+        start = time.perf_counter()
+        function(round)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2], times[-1]
+
+
+def report(name, times, cold):
+    median, worst = times
+    print("%-34s %10.2f ms %10.2f ms %9.0fx" % (name, median * 1e3, worst * 1e3, cold / median))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "program.src")
+    text = generateFunctions(count)
+    with open(path, "w") as file:
+        file.write(text)
+    uri = "file://" + path
+
+    print("source size:      " + formatSize(len(text)))
+    print("rounds:           %d" % rounds)
+    print()
+
+    def spawn(round):
+        subprocess.run([sys.executable, mainPath, "--no-cache", path], stdout = subprocess.DEVNULL, check = True)
+    cold = timed(spawn, rounds)
+
+    client = Client()
+    # a client that pulls diagnostics, so none are pushed after changes
+    client.request("initialize", {"capabilities": {"textDocument": {"diagnostic": {}}}})
+    client.notify("initialized", {})
+    diagnostic = lambda documentUri: client.request("textDocument/diagnostic", {"textDocument": {"uri": documentUri}})
+
+    start = time.perf_counter()
+    diagnostic(uri)
+    firstRequest = time.perf_counter() - start
+
+    unchanged = timed(lambda round: diagnostic(uri), rounds)
+
+    # each round adds a declaration in the middle of the file
+    middle = text.index("func", len(text) // 2)
+    def editFile(round):
+        with open(path, "w") as file:
+            file.write(text[:middle] + "var int edit%d;\n" % round + text[middle:])
+        diagnostic(uri)
+    editedOnDisk = timed(editFile, rounds)
+
+    openUri = "file://" + os.path.join(directory, "open.src")
+    client.notify("textDocument/didOpen", {"textDocument": {"uri": openUri, "languageId": "src",
+                                                             "version": 1, "text": text}})
+    diagnostic(openUri)
+    line = text.count("\n", 0, middle)
+    def editOpen(round):
+        position = {"line": line, "character": 0}
+        client.notify("textDocument/didChange", {"textDocument": {"uri": openUri, "version": round + 2},
+                      "contentChanges": [{"range": {"start": position, "end": position}, "text": " "}]})
+        diagnostic(openUri)
+    editedOpen = timed(editOpen, rounds)
+    client.close()
+    shutil.rmtree(directory)
+
+    print("%-34s %13s %13s %10s" % ("diagnostics", "median", "worst", "speedup"))
+    report("cold process per request", cold, cold[0])
+    print("%-34s %10.2f ms" % ("server, first request (parse)", firstRequest * 1e3))
+    report("server, unchanged file", unchanged, cold[0])
+    report("server, file edited on disk", editedOnDisk, cold[0])
+    report("server, open document edited", editedOpen, cold[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Reading a large source file into a str against mapping it with
+# SourceText.open, on a generated file of 500 MB by default: the cost of
+# opening it, of placing an error near its start and near its end (line,
+# column and excerpt), of the full line index, and of lexing its first
+# lexSize MB from the str and from the mapping.
+#
+#   python3 benchmarks/sourceTextBenchmark.py [sizeMB] [lexSizeMB]
+
+import os
+import sys
+import tempfile
+import time
+
+from generatorFile import generateFunction, formatSize
+from lexerFile import RegexLexer
+from diagnosticFile import columnOf
+from sourceTextFile import SourceText
+
+
+def writeSource(path, size):
+    written = 0
+    index = 0
+    with open(path, "w") as file:
+        while written < size:
+            text = "".join(generateFunction(unit) for unit in range(index, index + 1000))
+            file.write(text)
+            written += len(text)
+            index += 1000
+    return written
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def readText(path):
+    with open(path, "r") as file:
+        return file.read()
+
+
+# What a str source offers without an index: count the lines before offset
+def locateInText(text, offset):
+    line = text.count("\n", 0, offset) + 1
+    return line, columnOf(text, offset)
+
+
+def locateInSource(source, offset):
+    line, column = source.getPosition(offset)
+    source.getExcerpt(line, column)
+    return line, column
+
+
+def lexRange(text, end):
+    lexer = RegexLexer()
+    return len(lexer.makeTokensInRange(text, 0, end, 1))
+
+
+def main():
+    size = int(sys.argv[1] if len(sys.argv) > 1 else 500) << 20
+    lexSize = int(sys.argv[2] if len(sys.argv) > 2 else 64) << 20
+
+    handle, path = tempfile.mkstemp(suffix = ".src")
+    os.close(handle)
+    try:
+        size = writeSource(path, size)
+        print("source size:      " + formatSize(size))
+        print()
+
+        text, readTime = timed(readText, path)
+        source, mapTime = timed(SourceText.open, path)
+        print("%-34s %10s %10s" % ("", "str", "mapped"))
+        print("%-34s %8.3f s %8.3f s" % ("open", readTime, mapTime))
+
+        # the end of a line near each end of the file
+        nearStart = text.find("\n", 1000)
+        nearEnd = text.rfind("\n", 0, len(text) - 1000)
+
+        textPosition, textTime = timed(locateInText, text, nearStart)
+        sourcePosition, sourceTime = timed(locateInSource, source, nearStart)
+        assert textPosition == sourcePosition
+        print("%-34s %8.3f s %8.3f s" % ("locate an error near the start", textTime, sourceTime))
+
+        textPosition, textTime = timed(locateInText, text, nearEnd)
+        sourcePosition, sourceTime = timed(locateInSource, source, nearEnd)
+        assert textPosition == sourcePosition
+        print("%-34s %8.3f s %8.3f s" % ("  then near the end", textTime, sourceTime))
+
+        textPosition, textTime = timed(locateInText, text, nearEnd - 500)
+        sourcePosition, sourceTime = timed(locateInSource, source, nearEnd - 500)
+        assert textPosition == sourcePosition
+        print("%-34s %8.3f s %8.3f s" % ("  then near the end again", textTime, sourceTime))
+        print("%-34s %21s" % ("line index", "%d lines, %s" % (source.getLineCount(),
+                                                           formatSize(2 * len(source.chunkStarts) * source.chunkStarts.itemsize))))
+
+        lexEnd = text.rfind("\n", 0, min(lexSize, len(text))) + 1
+        textCount, textTime = timed(lexRange, text, lexEnd)
+        del text
+        sourceCount, sourceTime = timed(lexRange, source.text, lexEnd)
+        assert textCount == sourceCount
+        print("%-34s %8.3f s %8.3f s" % ("lex the first " + formatSize(lexEnd), textTime, sourceTime))
+        source.close()
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
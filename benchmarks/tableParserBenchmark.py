@@ -0,0 +1,74 @@
+# Throughput of the LL(1) table-driven parser against the recursive descent
+# one, on the same tokens of a file with tens of thousands of functions,
+# building node objects and building an AstArena; the arenas they build
+# are checked to be identical. Then the deepest parenthesized expression
+# each of them parses.
+#
+#   python3 benchmarks/tableParserBenchmark.py [functionCount]
+
+import sys
+import time
+
+from generatorFile import generateFunctions, formatSize
+from lexerFile import RegexLexer
+from parserFile import Parser
+from tableParserFile import TableParser
+from arenaFile import AstArena
+import nodeFile
+
+
+def timeParse(parserClass, tokens, makeNodes):
+    best = None
+    for attempt in range(3):
+        nodes = makeNodes()
+        start = time.perf_counter()
+        parserClass(nodes).parseTokens(tokens)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best, nodes
+
+
+def getColumns(arena):
+    return (arena.kinds, arena.firstChildren, arena.nextSiblings, arena.literals, arena.lines, arena.literalPool)
+
+
+def parsesNesting(parserClass, depth):
+    text = "func int main(){\n    return " + "(" * depth + "1" + ")" * depth + ";\n}\n"
+    try:
+        parserClass().parseTokens(RegexLexer().makeTokens(text))
+    except RecursionError:
+        return False
+    return True
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = generateFunctions(count)
+    tokens = RegexLexer().makeTokens(text)
+
+    print("source size:      " + formatSize(len(text)))
+    print("tokens:           %d" % len(tokens))
+    print("grammar:          %d rules, %d table entries" %
+          (len(TableParser.rows), sum(len(row) for row in TableParser.rows.values())))
+    print()
+
+    print("%-10s %-12s %10s %14s %10s" % ("nodes", "parser", "time", "tokens/s", "per token"))
+    for name, makeNodes in (("objects", lambda: nodeFile), ("arena", AstArena)):
+        arenas = []
+        for parserClass in (Parser, TableParser):
+            elapsed, nodes = timeParse(parserClass, tokens, makeNodes)
+            arenas.append(nodes)
+            print("%-10s %-12s %8.3f s %14.0f %7.2f us" %
+                  (name, parserClass.__name__, elapsed, len(tokens) / elapsed, elapsed / len(tokens) * 1e6))
+        if name == "arena":
+            assert getColumns(arenas[0]) == getColumns(arenas[1])
+    print()
+
+    print("%-28s %15s %15s" % ("nesting depth of ( )", "Parser", "TableParser"))
+    for depth in (100, 1000, 10000, 100000):
+        results = ["ok" if parsesNesting(parserClass, depth) else "RecursionError" for parserClass in (Parser, TableParser)]
+        print("%-28d %15s %15s" % (depth, results[0], results[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Bytes per token of a list of token strings (the old lexer output, newline
+# tokens included) against the array-backed TokenStore.
+#
+#   python3 benchmarks/tokenMemoryBenchmark.py [sizeInBytes]
+
+import re
+import sys
+import tracemalloc
+
+from generatorFile import generateProgram, formatSize
+from lexerFile import RegexLexer
+
+
+stringTokenPattern = re.compile(r"[ ]*(?:(\n|::|!=|&&|\|\||->|==|\+\+|--|[][(){};,\-+/*=<>!&|]|[^\W\d]\w*|[0-9]+)|\#[^\n]*)")
+
+
+def makeStringTokens(text):
+    tokens = [token for token in stringTokenPattern.findall(text) if token]
+    tokens.append(-1)
+    return tokens
+
+
+def measure(function, text):
+    tracemalloc.start()
+    result = function(text)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50 << 20
+    text = generateProgram(size)
+
+    stringTokens, stringSize = measure(makeStringTokens, text)
+    stringCount = len(stringTokens)
+    del stringTokens
+
+    store, storeSize = measure(lambda text: RegexLexer().makeTokens(text), text)
+    count = len(store)
+
+    print("source size:          " + formatSize(len(text)))
+    print("tokens:               %d (%d with newline tokens)" % (count, stringCount))
+    print("string list:          %s, %.1f bytes/token" % (formatSize(stringSize), stringSize / count))
+    print("TokenStore:           %s, %.1f bytes/token" % (formatSize(storeSize), storeSize / count))
+    print("TokenStore + source:  %s, %.1f bytes/token" % (formatSize(storeSize + len(text)), (storeSize + len(text)) / count))
+
+
+if __name__ == "__main__":
+    main()
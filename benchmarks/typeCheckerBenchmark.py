@@ -0,0 +1,55 @@
+# Throughput of the TypeChecker pass on a large file against the
+# Resolver pass it follows, and run time of the member-access-heavy
+# benchmarks/programs/structs.src with and without the type checked fast
+# paths for "." and "->".
+#
+#   python3 benchmarks/typeCheckerBenchmark.py [functionCount]
+
+import contextlib
+import io
+import sys
+
+from generatorFile import generateFunctions, formatSize
+from interpreterBenchmark import loadProgram, timed
+from lexerFile import RegexLexer
+from parserFile import Parser
+from resolverFile import Resolver
+from typeCheckerFile import TypeChecker
+from interpreterFile import Interpreter
+from visitorFile import walk
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = generateFunctions(count)
+    tokens = RegexLexer().makeTokens(text)
+
+    resolveBest = checkBest = None
+    for attempt in range(3):
+        program = Parser().parseTokens(tokens)
+        result, resolveTime = timed(Resolver().resolveProgram, program)
+        result, checkTime = timed(TypeChecker().checkProgram, program)
+        assert result != None
+        resolveBest = resolveTime if resolveBest == None else min(resolveBest, resolveTime)
+        checkBest = checkTime if checkBest == None else min(checkBest, checkTime)
+
+    declarations = len(program.declarations)
+    nodes = sum(1 for node in walk(program))
+    print("source size:      " + formatSize(len(text)))
+    print("declarations:     %d" % declarations)
+    print("nodes:            %d" % nodes)
+    print("resolve time:     %.3f s" % resolveBest)
+    print("check time:       %.3f s (%.2fx resolve)" % (checkBest, checkBest / resolveBest))
+    print("check throughput: %.0f nodes/s, %.1f us per declaration" %
+          (nodes / checkBest, checkBest / declarations * 1e6))
+
+    program = loadProgram("structs")
+    with contextlib.redirect_stdout(io.StringIO()):
+        result, untypedTime = timed(Interpreter().run, program)
+        TypeChecker().checkProgram(program)
+        result, typedTime = timed(Interpreter().run, program)
+    print("structs.src:      untyped %.3f s, typed %.3f s" % (untypedTime, typedTime))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Explicit-stack walks from visitorFile against a recursive walk (the way
+# SyntaxTree used to traverse) on very deep expression trees. The trees
+# are built directly from node classes, as a right-leaning chain of
+# binaryExpressions like the parser's right-recursive rules produce.
+# Printing is not timed: an indented dump of a chain is quadratic in size.
+#
+#   python3 benchmarks/visitorBenchmark.py [depth ...]
+
+import sys
+import time
+
+import generatorFile    # puts src on the import path
+from nodeFile import BinaryExpression, NumericLiteral, PostfixExpression, ReturnStatement
+from optimizerFile import Optimizer
+from visitorFile import Visitor, walk
+
+
+def deepExpression(depth):
+    node = NumericLiteral("1", 1)
+    for i in range(depth):
+        node = BinaryExpression(PostfixExpression("x", None, None, 1), "+", node, 1)
+    return ReturnStatement(node, 1)
+
+
+def recursiveDepth(node, depth):
+    deepest = depth
+    for attr in node.getAttributes():
+        if ".node" in attr:
+            child = node.getValue(attr)
+            if child != None:
+                deepest = max(deepest, recursiveDepth(child, depth + 1))
+        elif ".list" in attr:
+            for child in node.getValue(attr) or ():
+                deepest = max(deepest, recursiveDepth(child, depth + 1))
+    return deepest
+
+
+class DepthVisitor(Visitor):
+    def __init__(self):
+        Visitor.__init__(self)
+        self.deepest = 0
+
+    def enterNode(self, node, depth):
+        if depth > self.deepest:
+            self.deepest = depth
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    try:
+        function(*args)
+    except RecursionError:
+        return "recursion"
+    return "%.3f s" % (time.perf_counter() - start)
+
+
+def main():
+    depths = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000]
+    defaultLimit = sys.getrecursionlimit()
+
+    print("%-8s %12s %12s %12s %12s %12s" %
+          ("depth", "recursive", "raised limit", "walk", "Visitor", "Transformer"))
+
+    for depth in depths:
+        tree = deepExpression(depth)
+
+        recursive = timed(recursiveDepth, tree, 0)
+
+        # the recursive walk only gets through with a raised limit
+        sys.setrecursionlimit(depth * 2 + 1000)
+        raised = timed(recursiveDepth, tree, 0)
+        sys.setrecursionlimit(defaultLimit)
+
+        iterative = timed(lambda: max(level for node, level in walk(tree)))
+        visitor = timed(DepthVisitor().visit, tree)
+        transformer = timed(Optimizer().transform, tree)
+
+        print("%-8d %12s %12s %12s %12s %12s" %
+              (depth, recursive, raised, iterative, visitor, transformer))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# Bytecode VM against the tree-walking Interpreter on the programs in
+# benchmarks/programs. Program output is captured and compared, so a
+# mismatch between the two tiers is reported instead of a time.
+#
+#   python3 benchmarks/vmBenchmark.py [program ...]
+
+import contextlib
+import io
+
+from interpreterBenchmark import loadProgram, programNames, timed
+from interpreterFile import Interpreter
+from compilerFile import Compiler
+from vmFile import VirtualMachine
+
+
+def runCaptured(function, *args):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result, elapsed = timed(function, *args)
+    return output.getvalue(), result, elapsed
+
+
+def main():
+    print("%-14s %10s %10s %10s %8s" % ("program", "ast", "compile", "vm", "speedup"))
+
+    for name in programNames():
+        program = loadProgram(name)
+
+        astOutput, astResult, astTime = runCaptured(Interpreter().run, program)
+        compiled, compileTime = timed(Compiler().compileProgram, program)
+        vmOutput, vmResult, vmTime = runCaptured(VirtualMachine().runCompiled, compiled)
+
+        if (astOutput, astResult) != (vmOutput, vmResult):
+            print("%-14s output differs: %r / %r" % (name, astOutput, vmOutput))
+            continue
+
+        print("%-14s %8.3f s %8.3f s %8.3f s %7.2fx" %
+              (name, astTime, compileTime, vmTime, astTime / vmTime))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+from array import array
+import nodeFile
+
+
+# Node kinds are indexes into nodeFile.nodeClasses, plus two kinds that only
+# exist in the arena: a placeholder for a missing (None) child and the head
+# of a child list such as a body or an argument list.
+NONE_KIND = len(nodeFile.nodeClasses)
+LIST_KIND = NONE_KIND + 1
+
+# Unsigned typecodes of the columns that start narrow, from narrowest
+columnTypecodes = ("B", "H", "I")
+
+
+# The values in the narrowest unsigned column that holds them all.
+def narrowColumn(values):
+    largest = max(values, default = 0)
+    for typecode in columnTypecodes:
+        if largest < 1 << 8 * array(typecode).itemsize:
+            return array(typecode, values)
+    raise OverflowError("column value " + str(largest) + " does not fit in 32 bits")
+
+
+# column with values appended, widened to values' typecode if that is wider.
+def extendColumn(column, values):
+    if values.typecode == column.typecode:
+        column.extend(values)
+        return column
+    if values.itemsize > column.itemsize:
+        column = array(values.typecode, column)
+    column.fromlist(values.tolist())
+    return column
+
+
+class AstArena:
+    # Flat AST backend, passed to Parser in place of nodeFile. Nodes are rows
+    # in parallel arrays (kind, first child, next sibling, literal pool index,
+    # line) and are referred to by row index. A node's children are its node
+    # and list fields in attribute order; its literal fields are stored as
+    # one tuple in a deduplicated literal pool. The literal index and line
+    # columns start one byte wide and are widened the first time a value
+    # does not fit, so a small file pays 1 byte per row for each.
+    #
+    # The arena holds an AST in about a quarter of the memory node objects
+    # take (4.5 MB against 17.3 MB for 188k rows in arenaBenchmark), not
+    # the tenth it was meant to reach: the two 4-byte child links per row
+    # and the literal pool, about a third of the total, set the floor.
+
+    def __init__(self):
+        self.kinds = array("B")
+        self.firstChildren = array("i")
+        self.nextSiblings = array("i")
+        self.literals = array("B")
+        self.lines = array("B")
+        self.literalPool = []
+        self.literalIndexes = {}
+
+
+    def __len__(self):
+        return len(self.kinds)
+
+
+    def addNode(self, kind, children, literals, line):
+        index = len(self.kinds)
+
+        literalIndex = self.literalIndexes.get(literals)
+        if literalIndex == None:
+            literalIndex = self.addLiterals(literals)
+
+        self.kinds.append(kind)
+        self.nextSiblings.append(-1)
+        try:
+            self.literals.append(literalIndex)
+        except OverflowError:
+            self.literals = extendColumn(self.literals, narrowColumn([literalIndex]))
+        try:
+            self.lines.append(line)
+        except OverflowError:
+            self.lines = extendColumn(self.lines, narrowColumn([line]))
+
+        if not children:
+            self.firstChildren.append(-1)
+            return index
+
+        self.firstChildren.append(children[0])
+        nextSiblings = self.nextSiblings
+        previous = children[0]
+        for child in children[1:]:
+            nextSiblings[previous] = child
+            previous = child
+
+        return index
+
+
+    def addLiterals(self, literals):
+        index = self.literalIndexes.get(literals)
+        if index == None:
+            index = len(self.literalPool)
+            self.literalPool.append(literals)
+            self.literalIndexes[literals] = index
+
+        return index
+
+
+    def addChild(self, node, line):
+        if node == None:
+            return self.addNode(NONE_KIND, (), (), line)
+        return node
+
+
+    def addList(self, nodes, line):
+        if nodes == None:
+            return self.addNode(NONE_KIND, (), (), line)
+        return self.addNode(LIST_KIND, nodes, (), line)
+
+
+    def PostfixExpression(self, identifier, operator, field, line):
+        if operator == "[]":
+            children = [field]
+            field = None
+        elif operator == "()":
+            children = [self.addList(field, line)]
+            field = None
+        else:
+            children = []
+
+        return self.addNode(POSTFIX_KIND, children, (identifier, operator, field), line)
+
+
+    # Appends the rows of another arena and returns the index they start
+    # at here; its literals are merged into this arena's pool.
+    def appendArena(self, other):
+        base = len(self.kinds)
+        literalIndexes = [self.addLiterals(literals) for literals in other.literalPool]
+
+        self.kinds.extend(other.kinds)
+        self.firstChildren.extend(array("i", [child + base if child >= 0 else -1 for child in other.firstChildren]))
+        self.nextSiblings.extend(array("i", [sibling + base if sibling >= 0 else -1 for sibling in other.nextSiblings]))
+        self.literals = extendColumn(self.literals, narrowColumn([literalIndexes[index] for index in other.literals]))
+        self.lines = extendColumn(self.lines, narrowColumn(other.lines))
+        return base
+
+
+    # Pickled without the literal lookup table, it is rebuilt from the pool.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["literalIndexes"]
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.literalIndexes = {literals: index for index, literals in enumerate(self.literalPool)}
+
+
+    def getNode(self, index):
+        return ArenaNode(self, index)
+
+
+    def getRoot(self):
+        return ArenaNode(self, len(self.kinds) - 1)
+
+
+    # Builds nodeFile objects for the tree under row index (the root by
+    # default), for the passes that work on node objects. Rows are built
+    # children first from an explicit stack.
+    def makeNodes(self, index = None):
+        if index == None:
+            index = len(self.kinds) - 1
+        kinds = self.kinds
+        firstChildren = self.firstChildren
+        nextSiblings = self.nextSiblings
+        built = {}
+
+        # entries are (row, children pushed yet)
+        stack = [(index, False)]
+        while stack:
+            row, expanded = stack.pop()
+            children = []
+            child = firstChildren[row]
+            while child != -1:
+                children.append(child)
+                child = nextSiblings[child]
+
+            if not expanded:
+                stack.append((row, True))
+                stack.extend((child, False) for child in children)
+                continue
+
+            kind = kinds[row]
+            line = self.lines[row]
+            if kind == NONE_KIND:
+                built[row] = None
+            elif kind == LIST_KIND:
+                built[row] = [built.pop(child) for child in children]
+            else:
+                literals = self.literalPool[self.literals[row]]
+                children = [built.pop(child) for child in children]
+                if kind == POSTFIX_KIND:
+                    identifier, operator, field = literals
+                    built[row] = nodeFile.PostfixExpression(identifier, operator, children[0] if children else field, line)
+                else:
+                    literals = iter(literals)
+                    children = iter(children)
+                    values = [next(literals) if role == "lit" else next(children) for role in attributeRoles[kind]]
+                    built[row] = nodeFile.nodeClasses[kind](*values, line)
+
+        return built[index]
+
+
+    # The reverse of makeNodes: adds rows for a tree of nodeFile objects,
+    # children first from an explicit stack, and returns the root's row.
+    def addNodes(self, root):
+        rows = {}    # id(node) -> its row, until its parent is added
+
+        # entries are (node, children pushed yet)
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            fields = [(node.getValue(attr), attr.split(".")[1]) for attr in node.getAttributes()]
+
+            if not expanded:
+                stack.append((node, True))
+                for value, role in fields:
+                    if value == None or role == "lit":
+                        continue
+                    if role == "node":
+                        stack.append((value, False))
+                    else:
+                        stack.extend((child, False) for child in value)
+                continue
+
+            values = []
+            for value, role in fields:
+                if value == None or role == "lit":
+                    values.append(value)
+                elif role == "node":
+                    values.append(rows.pop(id(value)))
+                else:
+                    values.append([rows.pop(id(child)) for child in value])
+
+            rows[id(node)] = getattr(self, node.__class__.__name__)(*values, node.line)
+
+        return rows[id(root)]
+
+
+    # The column arrays, in a fixed order.
+    def getColumns(self):
+        return [self.kinds, self.firstChildren, self.nextSiblings, self.literals, self.lines]
+
+
+    # Replaces the columns with arrays in getColumns() order, which may
+    # have other widths than the current ones.
+    def setColumns(self, columns):
+        self.kinds, self.firstChildren, self.nextSiblings, self.literals, self.lines = columns
+
+
+    def getByteSize(self):
+        return sum(column.itemsize * len(column) for column in self.getColumns())
+
+
+
+POSTFIX_KIND = nodeFile.nodeClasses.index(nodeFile.PostfixExpression)
+
+# For every node kind, the role ("lit", "node" or "list") of each attribute
+attributeRoles = [[attr.split(".")[1] for attr in nodeClass.attributes] for nodeClass in nodeFile.nodeClasses]
+
+
+def makeBuilder(kind, nodeClass):
+    roles = attributeRoles[kind]
+
+    def build(self, *values):
+        line = values[-1]
+        children = []
+        literals = []
+
+        for value, role in zip(values, roles):
+            if role == "lit":
+                literals.append(value)
+            elif role == "node":
+                children.append(self.addChild(value, line))
+            else:
+                children.append(self.addList(value, line))
+
+        return self.addNode(kind, children, tuple(literals), line)
+
+    build.__name__ = nodeClass.__name__
+    return build
+
+
+for kind, nodeClass in enumerate(nodeFile.nodeClasses):
+    if nodeClass != nodeFile.PostfixExpression:
+        setattr(AstArena, nodeClass.__name__, makeBuilder(kind, nodeClass))
+
+
+# For every node kind, attribute name -> ("child" or "lit", position)
+attributeSlots = []
+for nodeClass in nodeFile.nodeClasses:
+    slots = {}
+    childPos = 0
+    literalPos = 0
+    for attr in nodeClass.attributes:
+        if attr.endswith(".lit"):
+            slots[attr] = ("lit", literalPos)
+            literalPos += 1
+        else:
+            slots[attr] = ("child", childPos)
+            childPos += 1
+    attributeSlots.append(slots)
+
+attributeSlots[POSTFIX_KIND].update({"field.node": ("child", 0), "field.list": ("child", 0)})
+
+
+
+class ArenaNode:
+    # Lightweight view of one arena row with the same getType/getAttributes/
+    # getValue interface as nodeFile.Node, so SyntaxTree can walk it.
+    # Views are created on demand and hold no node data of their own.
+    __slots__ = ("arena", "index")
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+
+    def getKind(self):
+        return self.arena.kinds[self.index]
+
+
+    def getType(self):
+        return nodeFile.nodeClasses[self.getKind()].nodeType
+
+
+    def getAttributes(self):
+        kind = self.getKind()
+        if kind == POSTFIX_KIND:
+            operator = self.getLiteral(1)
+            return nodeFile.PostfixExpression.fieldAttributes.get(operator, nodeFile.PostfixExpression.attributes)
+
+        return nodeFile.nodeClasses[kind].attributes
+
+
+    def getValue(self, attribute):
+        slot = attributeSlots[self.getKind()].get(attribute)
+        if slot == None:
+            raise AttributeError("Attribute " + attribute + " doesn't exist")
+
+        role, position = slot
+        if role == "lit":
+            return self.getLiteral(position)
+
+        child = self.getChild(position)
+        kind = self.arena.kinds[child]
+        if kind == NONE_KIND:
+            return None
+        if kind == LIST_KIND:
+            return list(self.arena.getNode(child).getChildren())
+
+        return ArenaNode(self.arena, child)
+
+
+    def getLiteral(self, position):
+        return self.arena.literalPool[self.arena.literals[self.index]][position]
+
+
+    def getChild(self, position):
+        child = self.arena.firstChildren[self.index]
+        for i in range(position):
+            child = self.arena.nextSiblings[child]
+        return child
+
+
+    def getChildren(self):
+        child = self.arena.firstChildren[self.index]
+        while child != -1:
+            yield ArenaNode(self.arena, child)
+            child = self.arena.nextSiblings[child]
+
+
+    @property
+    def line(self):
+        return self.arena.lines[self.index]
@@ -0,0 +1,100 @@
+import os
+from contextlib import nullcontext
+from lexerFile import RegexLexer
+from parserFile import Parser
+from arenaFile import AstArena, NONE_KIND, LIST_KIND
+
+
+class SourceFile:
+    # The front end's result for one file. arena holds the AST, the
+    # Program being its last row. cached tells whether it was loaded from
+    # the cache rather than parsed.
+    __slots__ = ("path", "source", "tokens", "arena", "diagnostics", "cached")
+
+    def __init__(self, path, source, tokens, arena, diagnostics, cached):
+        self.path = path
+        self.source = source
+        self.tokens = tokens
+        self.arena = arena
+        self.diagnostics = diagnostics
+        self.cached = cached
+
+
+
+class Builder:
+    # Lexes and parses a set of source files, going through an AstCache
+    # when one is given: a file whose text is in the cache is loaded from
+    # it, any other is parsed and stored. parserClass is Parser or a
+    # subclass such as TableParser. With a Profiler, every step is timed as
+    # a phase and the parser's rules are instrumented.
+
+    sourceExtension = ".src"
+
+    def __init__(self, cache = None, profiler = None, parserClass = Parser):
+        self.cache = cache
+        self.profiler = profiler
+        self.parserClass = parserClass
+
+
+#------------- PUBLIC SECTION -------------------------------
+    # Files named in paths, with directories replaced by the source files
+    # under them, in name order.
+    def findSources(self, paths):
+        sources = []
+        for path in paths:
+            if not os.path.isdir(path):
+                sources.append(path)
+                continue
+
+            for directory, directoryNames, fileNames in os.walk(path):
+                directoryNames.sort()
+                for fileName in sorted(fileNames):
+                    if fileName.endswith(Builder.sourceExtension):
+                        sources.append(os.path.join(directory, fileName))
+        return sources
+
+
+    def build(self, paths):
+        return [self.buildFile(path) for path in self.findSources(paths)]
+
+
+    def buildFile(self, path):
+        with self._phase("read"):
+            with open(path, "r") as file:
+                source = file.read()
+
+        if self.cache != None:
+            with self._phase("cache load"):
+                entry = self.cache.load(source)
+            if entry != None:
+                tokens, arena, diagnostics = entry
+                return SourceFile(path, source, tokens, arena, diagnostics, True)
+
+        with self._phase("lex"):
+            lexer = RegexLexer()
+            tokens = lexer.makeTokens(source)
+
+        with self._phase("parse"):
+            arena = AstArena()
+            parser = self.parserClass(arena)
+            if self.profiler != None:
+                self.profiler.instrumentParser(parser)
+            parser.setTokens(tokens, lexer.diagnostics)
+            parser.parseProgram()
+
+        if self.profiler != None:
+            self.profiler.addCount("lex", "tokens", len(tokens))
+            self.profiler.addCount("parse", "nodes", len(arena) - arena.kinds.count(NONE_KIND) - arena.kinds.count(LIST_KIND))
+            self.profiler.addCount("parse", "diagnostics", len(parser.diagnostics))
+
+        if self.cache != None:
+            with self._phase("cache store"):
+                self.cache.store(source, tokens, arena, parser.diagnostics)
+        return SourceFile(path, source, tokens, arena, parser.diagnostics, False)
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def _phase(self, name):
+        if self.profiler == None:
+            return nullcontext()
+        return self.profiler.phase(name)
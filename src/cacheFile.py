@@ -0,0 +1,119 @@
+import hashlib
+import marshal
+import os
+import struct
+import sys
+from array import array
+from arenaFile import AstArena
+from diagnosticFile import Diagnostic
+from parserFile import Parser
+from tokenStoreFile import TokenStore
+
+
+class AstCache:
+    # On-disk cache of what the front end makes of a source text: its
+    # tokens, its AST as an AstArena and its diagnostics. There is one file
+    # per entry, named by a hash of the source text together with the
+    # parser class and version and the cache format, so an entry never goes
+    # stale; a changed source or parser simply looks up a different name.
+    #
+    # File layout: magic, the typecodes of the arena columns, a header of
+    # little-endian counts (the length of every token and arena column,
+    # then the byte size of the marshalled rest), the columns' raw bytes in
+    # getColumns() order, and a marshal dump of (literal pool, diagnostics
+    # as tuples).
+
+    formatVersion = 2
+    magic = b"ASTC"
+    columnCount = 9
+
+    def __init__(self, directory, parserClass = Parser):
+        self.directory = directory
+        self.parserClass = parserClass
+        os.makedirs(directory, exist_ok = True)
+
+
+#------------- PUBLIC SECTION -------------------------------
+    def getKey(self, source):
+        digest = hashlib.sha256()
+        digest.update(("%d %s %d %s\n" % (AstCache.formatVersion, self.parserClass.__name__, self.parserClass.version,
+                                          sys.byteorder)).encode())
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+
+    # Returns (tokens, arena, diagnostics) for source, or None if it is not
+    # cached or the entry cannot be read.
+    def load(self, source):
+        try:
+            with open(self._getPath(source), "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+
+        try:
+            return self._decode(source, data)
+        except (ValueError, EOFError, TypeError, struct.error):
+            return None
+
+
+    def store(self, source, tokens, arena, diagnostics):
+        path = self._getPath(source)
+        temporaryPath = path + ".%d.tmp" % os.getpid()
+
+        # written aside and renamed, so a reader never sees half an entry
+        with open(temporaryPath, "wb") as file:
+            file.write(self._encode(tokens, arena, diagnostics))
+        os.replace(temporaryPath, path)
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def _getPath(self, source):
+        return os.path.join(self.directory, self.getKey(source))
+
+
+    def _encode(self, tokens, arena, diagnostics):
+        columns = tokens.getColumns() + arena.getColumns()
+        diagnostics = [(diagnostic.line, diagnostic.column, diagnostic.message, tuple(diagnostic.expected),
+                        diagnostic.found, tuple(diagnostic.context)) for diagnostic in diagnostics]
+        rest = marshal.dumps((arena.literalPool, diagnostics))
+
+        typecodes = "".join(column.typecode for column in arena.getColumns()).encode()
+        header = struct.pack("<%dQ" % (AstCache.columnCount + 1), *([len(column) for column in columns] + [len(rest)]))
+        return b"".join([AstCache.magic, typecodes, header] + [column.tobytes() for column in columns] + [rest])
+
+
+    def _decode(self, source, data):
+        if data[:len(AstCache.magic)] != AstCache.magic:
+            return None
+
+        position = len(AstCache.magic)
+        arena = AstArena()
+        arenaColumns = [array(typecode) for typecode in data[position:position + len(arena.getColumns())].decode()]
+        position += len(arenaColumns)
+
+        headerSize = struct.calcsize("<%dQ" % (AstCache.columnCount + 1))
+        counts = struct.unpack_from("<%dQ" % (AstCache.columnCount + 1), data, position)
+        position += headerSize
+
+        tokens = TokenStore(source)
+        for column, count in zip(tokens.getColumns() + arenaColumns, counts):
+            end = position + count * column.itemsize
+            column.frombytes(data[position:end])
+            position = end
+
+        if len(data) != position + counts[-1]:
+            return None
+        literalPool, diagnosticTuples = marshal.loads(data[position:])
+
+        arena.setColumns(arenaColumns)
+        arena.literalPool = literalPool
+        arena.literalIndexes = {literals: index for index, literals in enumerate(literalPool)}
+
+        diagnostics = []
+        for line, column, message, expected, found, context in diagnosticTuples:
+            diagnostic = Diagnostic(line, column, message, list(expected), found)
+            diagnostic.context = list(context)
+            diagnostics.append(diagnostic)
+
+        return tokens, arena, diagnostics
@@ -0,0 +1,472 @@
+from array import array
+from nodeFile import *
+from resolverFile import builtinNames
+
+
+# Opcodes. Every instruction is two ints in a function's code array: the
+# opcode and one argument (0 when unused).
+
+CONST = 0             # push constants[arg]
+LOAD_LOCAL = 1        # push locals[arg]
+STORE_LOCAL = 2       # locals[arg] = pop
+LOAD_GLOBAL = 3
+STORE_GLOBAL = 4
+ADD = 5
+SUB = 6
+MUL = 7
+DIV = 8
+MOD = 9
+LESS_THAN = 10
+GREATER_THAN = 11
+LESS_EQUAL_THAN = 12
+GREATER_EQUAL_THAN = 13
+EQUAL_TO = 14
+NOT_EQUAL_TO = 15
+NEGATE = 16
+LOGICAL_NOT = 17
+JUMP = 18             # pc = arg
+JUMP_IF_FALSE = 19    # pc = arg if not pop
+POP = 20
+DUP = 21
+CALL = 22             # call functions[arg], arguments are on the stack
+CALL_BUILTIN = 23     # arg = builtin index << 8 | argument count
+RETURN = 24           # return pop
+LOAD_INDEX = 25       # index = pop, array = pop, push array[index]
+STORE_INDEX = 26      # index = pop, array = pop, array[index] = pop
+LOAD_MEMBER = 27      # push pop[arg], arg is the member slot
+STORE_MEMBER = 28     # struct = pop, struct[arg] = pop
+DEREF = 29            # push pop.get()
+REF_LOCAL = 30        # push a reference to locals[arg]
+REF_GLOBAL = 31
+REF_INDEX = 32
+REF_MEMBER = 33
+COPY = 34             # copy a struct value on top of the stack
+MAKE_ARRAY = 35       # size = pop, elements described by constants[arg]
+BUILD_STRUCT = 36     # pop arg member values into a StructValue
+
+# Superinstructions for the most common loop idioms
+ADD_CONST = 37        # top += constants[arg]
+JUMP_IF_NOT_LESS = 38 # right = pop, left = pop, pc = arg if not left < right
+
+binaryOpcodes = {
+    "+": ADD, "-": SUB, "*": MUL, "/": DIV, "%": MOD,
+    "<": LESS_THAN, ">": GREATER_THAN, "<=": LESS_EQUAL_THAN,
+    ">=": GREATER_EQUAL_THAN, "==": EQUAL_TO, "!=": NOT_EQUAL_TO,
+}
+
+
+
+class CodeObject:
+    # One compiled function: code and lines are parallel, lines holds the
+    # source line of every instruction for runtime errors.
+    __slots__ = ("name", "code", "lines", "paramCount", "localCount")
+
+    def __init__(self, name, paramCount):
+        self.name = name
+        self.code = array("i")
+        self.lines = array("i")
+        self.paramCount = paramCount
+        self.localCount = paramCount
+
+
+class CompiledProgram:
+    __slots__ = ("functions", "functionIndexes", "constants", "globalNames", "initializer")
+
+    def __init__(self):
+        self.functions = []
+        self.functionIndexes = {}
+        self.constants = []
+        self.globalNames = []
+        self.initializer = None
+
+
+
+class Compiler:
+    # Lowers a Program annotated by Resolver to bytecode for VirtualMachine.
+    # Variables and members use the slots Resolver assigned, and struct
+    # types get a compiled constructor function that builds a fresh value
+    # of the type.
+
+    def __init__(self):
+        self.expressionRules = {
+            ConditionalExpression: self.compileConditionalExpression,
+            BinaryExpression: self.compileBinaryExpression,
+            UnaryExpression: self.compileUnaryExpression,
+            NumericLiteral: self.compileNumericLiteral,
+            PostfixExpression: self.compilePostfixExpression,
+            AssignmentExpression: self.compileAssignmentExpression,
+        }
+
+        self.statementRules = {
+            IfStatement: self.compileIfStatement,
+            WhileStatement: self.compileWhileStatement,
+            ForStatement: self.compileForStatement,
+            ReturnStatement: self.compileReturnStatement,
+            VariableDeclaration: self.compileVariableDeclaration,
+        }
+        for nodeClass in self.expressionRules:
+            self.statementRules[nodeClass] = self.compileExpressionStatement
+
+
+#------------- PUBLIC SECTION -------------------------------
+    # The program must have been resolved, the slots are read from it.
+    def compileProgram(self, program):
+        if program.globalCount == None:
+            raise ValueError("Program is not resolved, run Resolver().resolveProgram on it first")
+
+        self.program = CompiledProgram()
+        self.constantIndexes = {}
+
+        declarations = program.declarations
+
+        # function and constructor indexes first, so calls can be emitted
+        # before the callee is compiled
+        for decl in declarations:
+            if decl.__class__ == FunctionDeclaration:
+                self.addFunction(decl.identifier, len(decl.parameterList))
+            elif decl.__class__ == StructDeclaration:
+                self.addFunction("struct " + decl.identifier, 0)
+
+        for decl in declarations:
+            if decl.__class__ == VariableDeclaration:
+                self.program.globalNames.append(decl.identifier)
+
+        for decl in declarations:
+            if decl.__class__ == FunctionDeclaration:
+                self.compileFunction(decl)
+            elif decl.__class__ == StructDeclaration:
+                self.compileConstructor(decl)
+
+        self.code = CodeObject("<globals>", 0)
+        for decl in declarations:
+            if decl.__class__ == VariableDeclaration:
+                self.compileVariableDeclaration(decl)
+        self.emit(CONST, self.constant(None), 0)
+        self.emit(RETURN, 0, 0)
+        self.program.initializer = self.code
+
+        return self.program
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def addFunction(self, name, paramCount):
+        self.program.functionIndexes[name] = len(self.program.functions)
+        self.program.functions.append(CodeObject(name, paramCount))
+
+
+    def emit(self, opcode, argument, line):
+        self.code.code.append(opcode)
+        self.code.code.append(argument)
+        self.code.lines.append(line)
+        return len(self.code.code) - 2
+
+
+    def here(self):
+        return len(self.code.code)
+
+
+    def patch(self, position, target):
+        self.code.code[position + 1] = target
+
+
+    def constant(self, value):
+        # keyed with the type so that 1 and True or 0 and None stay apart
+        key = (value.__class__, value)
+        index = self.constantIndexes.get(key)
+        if index == None:
+            index = len(self.program.constants)
+            self.program.constants.append(value)
+            self.constantIndexes[key] = index
+        return index
+
+
+    def compileFunction(self, decl):
+        self.code = self.program.functions[self.program.functionIndexes[decl.identifier]]
+        body = decl.body    # first, a lazy body sets frameSize once parsed
+        self.code.localCount = decl.frameSize
+
+        self.compileBlock(body)
+        self.emit(CONST, self.constant(None), decl.line)
+        self.emit(RETURN, 0, decl.line)
+
+
+    def compileConstructor(self, decl):
+        self.code = self.program.functions[self.program.functionIndexes["struct " + decl.identifier]]
+
+        for member in decl.memberList:
+            if member.isArray:
+                if member.expression != None:
+                    self.compileExpression(member.expression)
+                else:
+                    self.emit(CONST, self.constant(0), member.line)
+                self.emit(MAKE_ARRAY, self.elementDescriptor(member.type), member.line)
+            else:
+                self.compileDefaultValue(member.type, member.line)
+
+        self.emit(BUILD_STRUCT, len(decl.memberList), decl.line)
+        self.emit(RETURN, 0, decl.line)
+
+
+    # Array elements: None or 0 directly, or the index of a struct's
+    # constructor to call once per element.
+    def elementDescriptor(self, typeSpecifier):
+        if typeSpecifier.indirection or typeSpecifier.type == "void":
+            return self.constant(("value", None))
+        if typeSpecifier.type == "int":
+            return self.constant(("value", 0))
+        return self.constant(("struct", self.constructorIndex(typeSpecifier)))
+
+
+    def constructorIndex(self, typeSpecifier):
+        return self.program.functionIndexes["struct " + typeSpecifier.identifier]
+
+
+    def compileDefaultValue(self, typeSpecifier, line):
+        if typeSpecifier.indirection or typeSpecifier.type == "void":
+            self.emit(CONST, self.constant(None), line)
+        elif typeSpecifier.type == "int":
+            self.emit(CONST, self.constant(0), line)
+        else:
+            self.emit(CALL, self.constructorIndex(typeSpecifier), line)
+
+
+    # Emits the store for a plain variable or declaration; the value is on
+    # the stack.
+    def compileStore(self, node):
+        self.emit(STORE_GLOBAL if node.isGlobal else STORE_LOCAL, node.slot, node.line)
+
+
+    def compileLoad(self, node):
+        self.emit(LOAD_GLOBAL if node.isGlobal else LOAD_LOCAL, node.slot, node.line)
+
+
+    # Struct values are copied when assigned or passed, like the
+    # Interpreter does; only expressions that can yield one need COPY.
+    def compileCopy(self, node):
+        while node.__class__ == ConditionalExpression:
+            node = node.body
+
+        if node.__class__ == PostfixExpression or \
+           node.__class__ == AssignmentExpression or \
+           (node.__class__ == UnaryExpression and node.operator == "*"):
+            self.emit(COPY, 0, node.line)
+
+
+#--------------- STATEMENTS ---------------------------------
+    def compileBlock(self, statements):
+        for statement in statements:
+            self.statementRules[statement.__class__](statement)
+
+
+    def compileExpressionStatement(self, node):
+        if node.__class__ == AssignmentExpression:
+            self.compileAssignmentExpression(node, False)
+        else:
+            self.compileExpression(node)
+            self.emit(POP, 0, node.line)
+
+
+    def compileVariableDeclaration(self, node):
+        if node.declarationType == "array":
+            self.compileExpression(node.expression)
+            self.emit(MAKE_ARRAY, self.elementDescriptor(node.type), node.line)
+        elif node.expression != None:
+            self.compileExpression(node.expression)
+            self.compileCopy(node.expression)
+        else:
+            self.compileDefaultValue(node.type, node.line)
+
+        self.compileStore(node)
+
+
+    # Compiles a condition and the jump taken when it is false; returns the
+    # jump's position for patching.
+    def compileCondition(self, node):
+        while node.__class__ == ConditionalExpression:
+            node = node.body
+
+        if node.__class__ == BinaryExpression and node.operator == "<":
+            self.compileExpression(node.leftOP)
+            self.compileExpression(node.rightOP)
+            return self.emit(JUMP_IF_NOT_LESS, 0, node.line)
+
+        self.compileExpression(node)
+        return self.emit(JUMP_IF_FALSE, 0, node.line)
+
+
+    def compileIfStatement(self, node):
+        jumpToElse = self.compileCondition(node.condition)
+        self.compileBlock(node.body)
+
+        if node.elseBody != None:
+            jumpToEnd = self.emit(JUMP, 0, node.line)
+            self.patch(jumpToElse, self.here())
+            self.compileBlock(node.elseBody)
+            self.patch(jumpToEnd, self.here())
+        else:
+            self.patch(jumpToElse, self.here())
+
+
+    def compileWhileStatement(self, node):
+        start = self.here()
+        jumpToEnd = self.compileCondition(node.condition)
+        self.compileBlock(node.body)
+        self.emit(JUMP, start, node.line)
+        self.patch(jumpToEnd, self.here())
+
+
+    def compileForStatement(self, node):
+        if node.forInitializer != None:
+            self.compileVariableDeclaration(node.forInitializer)
+
+        start = self.here()
+        jumpToEnd = self.compileCondition(node.condition)
+        self.compileBlock(node.body)
+        self.compileExpressionStatement(node.forUpdater)
+        self.emit(JUMP, start, node.line)
+        self.patch(jumpToEnd, self.here())
+
+
+    def compileReturnStatement(self, node):
+        if node.returnValue != None:
+            self.compileExpression(node.returnValue)
+        else:
+            self.emit(CONST, self.constant(None), node.line)
+        self.emit(RETURN, 0, node.line)
+
+
+#--------------- EXPRESSIONS --------------------------------
+    def compileExpression(self, node):
+        self.expressionRules[node.__class__](node)
+
+
+    def compileConditionalExpression(self, node):
+        self.compileExpression(node.body)
+
+
+    def compileNumericLiteral(self, node):
+        self.emit(CONST, self.constant(int(node.value)), node.line)
+
+
+    def compileBinaryExpression(self, node):
+        operator = node.operator
+
+        if operator == "&&" or operator == "||":
+            self.compileExpression(node.leftOP)
+            if operator == "&&":
+                jumpToFalse = [self.emit(JUMP_IF_FALSE, 0, node.line)]
+                self.compileExpression(node.rightOP)
+                jumpToFalse.append(self.emit(JUMP_IF_FALSE, 0, node.line))
+                self.emit(CONST, self.constant(1), node.line)
+                jumpToEnd = self.emit(JUMP, 0, node.line)
+                for jump in jumpToFalse:
+                    self.patch(jump, self.here())
+                self.emit(CONST, self.constant(0), node.line)
+            else:
+                jumpToRight = self.emit(JUMP_IF_FALSE, 0, node.line)
+                self.emit(CONST, self.constant(1), node.line)
+                jumpToTrueEnd = self.emit(JUMP, 0, node.line)
+                self.patch(jumpToRight, self.here())
+                self.compileExpression(node.rightOP)
+                self.emit(LOGICAL_NOT, 0, node.line)
+                self.emit(LOGICAL_NOT, 0, node.line)
+                jumpToEnd = self.emit(JUMP, 0, node.line)
+                self.patch(jumpToTrueEnd, self.here())
+            self.patch(jumpToEnd, self.here())
+            return
+
+        self.compileExpression(node.leftOP)
+
+        right = node.rightOP
+        while right.__class__ == ConditionalExpression:
+            right = right.body
+        if operator == "+" and right.__class__ == NumericLiteral:
+            self.emit(ADD_CONST, self.constant(int(right.value)), node.line)
+            return
+
+        self.compileExpression(node.rightOP)
+        self.emit(binaryOpcodes[operator], 0, node.line)
+
+
+    def compileUnaryExpression(self, node):
+        operator = node.operator
+
+        if operator == "&":
+            self.compileReference(node.term)
+            return
+
+        self.compileExpression(node.term)
+        if operator == "-":
+            self.emit(NEGATE, 0, node.line)
+        elif operator == "!":
+            self.emit(LOGICAL_NOT, 0, node.line)
+        else:
+            self.emit(DEREF, 0, node.line)
+
+
+    def compilePostfixExpression(self, node):
+        operator = node.operator
+
+        if operator == None:
+            self.compileLoad(node)
+        elif operator == "()":
+            self.compileCall(node)
+        elif operator == "[]":
+            self.compileLoad(node)
+            self.compileExpression(node.field)
+            self.emit(LOAD_INDEX, 0, node.line)
+        else:
+            self.compileLoad(node)
+            if operator == "->":
+                self.emit(DEREF, 0, node.line)
+            self.emit(LOAD_MEMBER, node.memberSlot, node.line)
+
+
+    def compileReference(self, node):
+        operator = node.operator
+
+        if operator == None:
+            self.emit(REF_GLOBAL if node.isGlobal else REF_LOCAL, node.slot, node.line)
+        elif operator == "[]":
+            self.compileLoad(node)
+            self.compileExpression(node.field)
+            self.emit(REF_INDEX, 0, node.line)
+        else:
+            self.compileLoad(node)
+            if operator == "->":
+                self.emit(DEREF, 0, node.line)
+            self.emit(REF_MEMBER, node.memberSlot, node.line)
+
+
+    def compileAssignmentExpression(self, node, keepValue = True):
+        target = node.target
+
+        self.compileExpression(node.expression)
+        self.compileCopy(node.expression)
+        if keepValue:
+            self.emit(DUP, 0, node.line)
+
+        if target.operator == None:
+            self.compileStore(target)
+        elif target.operator == "[]":
+            self.compileLoad(target)
+            self.compileExpression(target.field)
+            self.emit(STORE_INDEX, 0, target.line)
+        else:
+            self.compileLoad(target)
+            if target.operator == "->":
+                self.emit(DEREF, 0, target.line)
+            self.emit(STORE_MEMBER, target.memberSlot, target.line)
+
+
+    def compileCall(self, node):
+        for argument in node.field:
+            self.compileExpression(argument)
+            self.compileCopy(argument)
+
+        index = self.program.functionIndexes.get(node.identifier)
+        if index != None:
+            self.emit(CALL, index, node.line)
+        else:
+            builtin = builtinNames.index(node.identifier)
+            self.emit(CALL_BUILTIN, builtin << 8 | len(node.field), node.line)
@@ -1 +1,72 @@
-EOF = -1
\ No newline at end of file
+EOF = -1
+
+
+# Token kinds. Tokens are classified once by the lexer and the parser only
+# compares these small integers.
+
+IDENTIFIER = 0
+NUMBER = 1
+
+STRUCT = 2
+FOR = 3
+WHILE = 4
+VOID = 5
+INT = 6
+IF = 7
+ELSE = 8
+RETURN = 9
+FUNC = 10
+VAR = 11
+LET = 12
+
+LEFT_BRACKET = 13
+RIGHT_BRACKET = 14
+LEFT_PAREN = 15
+RIGHT_PAREN = 16
+LEFT_BRACE = 17
+RIGHT_BRACE = 18
+SEMICOLON = 19
+COLON_COLON = 20
+COMMA = 21
+DOT = 22
+
+MINUS = 23
+PLUS = 24
+SLASH = 25
+STAR = 26
+PERCENT = 27
+ASSIGN = 28
+LESS = 29
+GREATER = 30
+LESS_EQUAL = 31
+GREATER_EQUAL = 32
+NOT = 33
+AMPERSAND = 34
+PIPE = 35
+NOT_EQUAL = 36
+AND = 37
+OR = 38
+ARROW = 39
+EQUAL = 40
+INCREMENT = 41
+DECREMENT = 42
+
+
+KEYWORD_KINDS = {
+    "struct": STRUCT, "for": FOR, "while": WHILE, "void": VOID, "int": INT,
+    "if": IF, "else": ELSE, "return": RETURN, "func": FUNC, "var": VAR,
+    "let": LET,
+}
+
+SYMBOL_KINDS = {
+    "[": LEFT_BRACKET, "]": RIGHT_BRACKET, "(": LEFT_PAREN, ")": RIGHT_PAREN,
+    "{": LEFT_BRACE, "}": RIGHT_BRACE, ";": SEMICOLON, "::": COLON_COLON,
+    ",": COMMA, ".": DOT,
+    "-": MINUS, "+": PLUS, "/": SLASH, "*": STAR, "%": PERCENT, "=": ASSIGN,
+    "<": LESS, ">": GREATER, "<=": LESS_EQUAL, ">=": GREATER_EQUAL,
+    "!": NOT, "&": AMPERSAND, "|": PIPE, "!=": NOT_EQUAL, "&&": AND, "||": OR,
+    "->": ARROW, "==": EQUAL, "++": INCREMENT, "--": DECREMENT,
+}
+
+TOKEN_TEXT = {kind: text for text, kind in {**KEYWORD_KINDS, **SYMBOL_KINDS}.items()}
+TOKEN_TEXT[EOF] = "end of file"
@@ -0,0 +1,71 @@
+class Diagnostic:
+    # One reported problem in the source. line and column (1-based, None
+    # when the source text is not at hand) locate the offending token or
+    # character, found is its text and expected the texts of the tokens
+    # that would have been accepted there. context holds (line, message)
+    # pairs added by enclosing constructs while the parser unwinds.
+    __slots__ = ("line", "column", "message", "expected", "found", "context")
+
+    def __init__(self, line, column, message, expected = (), found = None):
+        self.line = line
+        self.column = column
+        self.message = message
+        self.expected = expected
+        self.found = found
+        self.context = []
+
+
+    def __str__(self):
+        text = "Line " + str(self.line)
+        if self.column != None:
+            text += ", column " + str(self.column)
+        text += " : " + self.getMessage()
+
+        for line, message in self.context:
+            text += "\n    Line " + str(line) + " : " + message
+        return text
+
+
+    # The message with the token found and the tokens expected, without
+    # the location or the context.
+    def getMessage(self):
+        text = self.message
+        if self.found != None:
+            text += " : Unmatched token: " + self.found
+        if self.expected:
+            text += " (expected " + " or ".join("'" + token + "'" for token in self.expected) + ")"
+        return text
+
+
+
+class DiagnosticError(Exception):
+    # Raised for errors found after the pass that would have returned them
+    # has finished, as in a function body parsed lazily. diagnostics holds
+    # the parser's Diagnostics or the "Line N : message" strings of the
+    # Resolver and TypeChecker.
+    def __init__(self, diagnostics):
+        super().__init__(diagnostics)
+        self.diagnostics = diagnostics
+
+
+    def __str__(self):
+        return "\n".join(str(diagnostic) for diagnostic in self.diagnostics)
+
+
+
+# Column of an offset within its line, counting from 1. text may be a str
+# or bytes-like, a column then counts bytes.
+def columnOf(text, offset):
+    return offset - text.rfind("\n" if isinstance(text, str) else b"\n", 0, offset)
+
+
+# Sorts diagnostics in place into source order. The sort is stable, so
+# lists that were each in order (the lexer's and the parser's) are merged.
+def sortDiagnostics(diagnostics):
+    diagnostics.sort(key = lambda diagnostic: (diagnostic.line, diagnostic.column or 0))
+
+
+def showErrors(diagnostics):
+    print("AN ERROR HAS OCCURED")
+    for diagnostic in diagnostics:
+        print(diagnostic)
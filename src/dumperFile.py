@@ -0,0 +1,131 @@
+import json
+from json.encoder import encode_basestring
+from visitorFile import getChildren
+
+
+def formatLiteral(value):
+    if value.__class__ == str:
+        return encode_basestring(value)
+    if value == None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return json.dumps(value)
+
+
+
+class AstDumper:
+    # Writes a tree (nodeFile objects or arena views) to a text stream in
+    # one of these formats:
+    #
+    #   tree      node types indented by depth, binary expressions shown by
+    #             their operator (what SyntaxTree has always printed)
+    #   indented  node types indented by depth, with literals and line
+    #   sexpr     an S-expression, one node per line
+    #   compact   the same S-expression on a single line
+    #   json      one JSON object per node, its type under "node" (a literal
+    #             may be called "type") and its children in "children"
+    #
+    # Each node is rendered to one string by the format's rule; the strings
+    # are collected and go to the stream bufferCount at a time, so a tree of
+    # any size is dumped in a few large writes and in constant memory. The
+    # walk is the Visitor's explicit-stack preorder, with the text closing
+    # a node pushed as a plain string below its children.
+
+    formats = ("tree", "indented", "sexpr", "compact", "json")
+    closingTexts = {"sexpr": ")", "compact": ")", "json": "]}"}
+    # what comes before each literal's value, from its name
+    literalPrefixes = {"indented": " %s=", "sexpr": " :%s ", "compact": " :%s ", "json": ", \"%s\": "}
+
+    def __init__(self, stream, format = "tree", bufferCount = 4096):
+        if format not in AstDumper.formats:
+            raise ValueError("Unknown dump format '" + format + "', expected one of " + ", ".join(AstDumper.formats))
+
+        self.stream = stream
+        self.format = format
+        self.render = getattr(self, "_render" + format.capitalize())
+        self.closingText = AstDumper.closingTexts.get(format)
+        self.bufferCount = bufferCount
+        self.literalPrefix = AstDumper.literalPrefixes.get(format)
+        self.literalAttributes = {}    # attributes tuple -> [(prefix, attribute)]
+
+
+#------------- PUBLIC SECTION -------------------------------
+    def dump(self, root):
+        render = self.render
+        closingText = self.closingText
+        bufferCount = self.bufferCount
+        parts = []
+        append = parts.append
+
+        # entries are (node, depth, first of its siblings) or closing text
+        stack = [(root, 0, True)]
+        pop = stack.pop
+        push = stack.append
+
+        while stack:
+            entry = pop()
+            if entry.__class__ == str:
+                append(entry)
+                continue
+
+            node, depth, first = entry
+            append(render(node, depth, first))
+            if closingText != None:
+                push(closingText)
+
+            children = getChildren(node)
+            for i in range(len(children) - 1, -1, -1):
+                push((children[i], depth + 1, i == 0))
+
+            if len(parts) >= bufferCount:
+                self.stream.write("".join(parts))
+                parts.clear()
+
+        if closingText != None:
+            append("\n")
+        self.stream.write("".join(parts))
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    # Every literal of node as its prefix and value
+    def _formatLiterals(self, node):
+        attributes = node.getAttributes()
+        literals = self.literalAttributes.get(attributes)
+        if literals == None:
+            literals = [(self.literalPrefix % attr.split(".")[0], attr) for attr in attributes if attr.endswith(".lit")]
+            self.literalAttributes[attributes] = literals
+
+        getValue = node.getValue
+        return "".join([prefix + formatLiteral(getValue(attr)) for prefix, attr in literals])
+
+
+    def _renderTree(self, node, depth, first):
+        nodeType = node.getType()
+        if nodeType == "binaryExpression":
+            nodeType = node.getValue("operator.lit")
+        return "   " * depth + nodeType + "\n"
+
+
+    def _renderIndented(self, node, depth, first):
+        literals = self._formatLiterals(node)
+        return "   " * depth + node.getType() + literals + " @" + str(node.line) + "\n"
+
+
+    def _renderSexpr(self, node, depth, first):
+        literals = self._formatLiterals(node)
+        prefix = "\n" + "  " * depth if depth else ""
+        return prefix + "(" + node.getType() + " :line " + str(node.line) + literals
+
+
+    def _renderCompact(self, node, depth, first):
+        literals = self._formatLiterals(node)
+        return (" (" if depth else "(") + node.getType() + " :line " + str(node.line) + literals
+
+
+    def _renderJson(self, node, depth, first):
+        literals = self._formatLiterals(node)
+        return ('{"node": ' if first else ', {"node": ') + encode_basestring(node.getType()) + \
+               ', "line": ' + str(node.line) + literals + ', "children": ['
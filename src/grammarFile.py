@@ -0,0 +1,199 @@
+from constants import EOF, TOKEN_TEXT
+
+
+# A terminal whose token text is kept: pushed on the value stack when matched
+CAPTURED = 1 << 8
+
+def text(kind):
+    return kind + CAPTURED
+
+
+def terminalKind(symbol):
+    return symbol - CAPTURED if symbol >= CAPTURED else symbol
+
+
+def isTerminal(symbol):
+    return symbol.__class__ == int
+
+
+def isNonterminal(symbol):
+    return symbol.__class__ == str
+
+
+
+class PredictionRow(dict):
+    # The compiled table row of a nonterminal: token kind -> the symbols
+    # to push for it, last symbol first. expected are the kinds that start
+    # a non-empty match, default the symbols of its empty alternative if it
+    # has one. recovery is set by parsers that resume after syntax errors in
+    # a list this row parses.
+    __slots__ = ("name", "expected", "default", "recovery")
+
+    def __init__(self, name):
+        dict.__init__(self)
+        self.name = name
+        self.expected = ()
+        self.default = None
+        self.recovery = None
+
+
+
+class Grammar:
+    # A context-free grammar over token kinds and the LL(1) prediction
+    # table generated from it. Rules map a nonterminal (a str) to its
+    # alternatives, lists of symbols:
+    #   int             a terminal, the token kind to match
+    #   text(kind)      a terminal whose text goes on the value stack
+    #   str             a nonterminal
+    #   anything else   an action, run by the parser when reached; actions
+    #                   match nothing and are left out of FIRST and FOLLOW
+    #
+    # compile returns a PredictionRow per nonterminal. While a row's entry
+    # is chosen no token is consumed, so the rows of leading nonterminals
+    # are chosen by the same lookahead and are inlined into the entry up
+    # to its first terminal: predicting Expression on an identifier pushes
+    # the whole chain down to PostfixExpression in one step.
+
+    def __init__(self, start):
+        self.start = start
+        self.rules = {}    # nonterminal -> [alternative, ...]
+
+
+#------------- PUBLIC SECTION -------------------------------
+    def addRule(self, nonterminal, *alternatives):
+        self.rules.setdefault(nonterminal, []).extend(list(alternative) for alternative in alternatives)
+
+
+    # nullable (set of nonterminals), first and follow (nonterminal -> set
+    # of token kinds)
+    def getSets(self):
+        self._checkRules()
+        nullable = set()
+        first = {nonterminal: set() for nonterminal in self.rules}
+        follow = {nonterminal: set() for nonterminal in self.rules}
+        follow[self.start].add(EOF)
+
+        changed = True
+        while changed:
+            changed = False
+            for nonterminal, alternatives in self.rules.items():
+                for alternative in alternatives:
+                    kinds, isNullable = self._getFirst(alternative, nullable, first)
+                    if not kinds <= first[nonterminal]:
+                        first[nonterminal] |= kinds
+                        changed = True
+                    if isNullable and nonterminal not in nullable:
+                        nullable.add(nonterminal)
+                        changed = True
+
+        changed = True
+        while changed:
+            changed = False
+            for nonterminal, alternatives in self.rules.items():
+                for alternative in alternatives:
+                    for i, symbol in enumerate(alternative):
+                        if not isNonterminal(symbol):
+                            continue
+                        kinds, isNullable = self._getFirst(alternative[i + 1:], nullable, first)
+                        if isNullable:
+                            kinds = kinds | follow[nonterminal]
+                        if not kinds <= follow[symbol]:
+                            follow[symbol] |= kinds
+                            changed = True
+
+        return nullable, first, follow
+
+
+    # nonterminal -> {token kind: alternative}. Raises ValueError listing
+    # every conflict if the grammar is not LL(1).
+    def makeTable(self):
+        nullable, first, follow = self.getSets()
+        table = {}
+        conflicts = []
+
+        for nonterminal, alternatives in self.rules.items():
+            row = table[nonterminal] = {}
+            for alternative in alternatives:
+                kinds, isNullable = self._getFirst(alternative, nullable, first)
+                if isNullable:
+                    kinds = kinds | follow[nonterminal]
+                for kind in sorted(kinds):
+                    if kind in row and row[kind] is not alternative:
+                        conflicts.append("%s on '%s'" % (nonterminal, TOKEN_TEXT.get(kind, "identifier")))
+                    row[kind] = alternative
+
+        if conflicts:
+            raise ValueError("Grammar is not LL(1), conflicts in " + ", ".join(conflicts))
+        return table
+
+
+    def compile(self):
+        nullable, first, follow = self.getSets()
+        table = self.makeTable()
+        rows = {nonterminal: PredictionRow(nonterminal) for nonterminal in self.rules}
+
+        for nonterminal, row in rows.items():
+            for kind, alternative in table[nonterminal].items():
+                symbols = self._inline(alternative, kind, table, rows)[0]
+                row[kind] = tuple(reversed(symbols))
+
+            row.expected = tuple(sorted(first[nonterminal]))
+            for alternative in self.rules[nonterminal]:
+                if self._getFirst(alternative, nullable, first)[1]:
+                    row.default = tuple(reversed(self._getRowSymbols(alternative, rows)))
+        return rows
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def _checkRules(self):
+        for nonterminal, alternatives in self.rules.items():
+            for alternative in alternatives:
+                for symbol in alternative:
+                    if isNonterminal(symbol) and symbol not in self.rules:
+                        raise ValueError("Rule for " + nonterminal + " uses undefined nonterminal " + symbol)
+
+
+    # (token kinds that can start symbols, whether symbols can match nothing)
+    def _getFirst(self, symbols, nullable, first):
+        kinds = set()
+        for symbol in symbols:
+            if isTerminal(symbol):
+                kinds.add(terminalKind(symbol))
+                return kinds, False
+            if isNonterminal(symbol):
+                kinds |= first[symbol]
+                if symbol not in nullable:
+                    return kinds, False
+        return kinds, True
+
+
+    # symbols with their leading nonterminals replaced by what the table
+    # predicts for them on kind, up to the first terminal; the rest is left
+    # to be predicted when reached. Returns (symbols, whether a terminal
+    # was reached).
+    def _inline(self, symbols, kind, table, rows):
+        inlined = []
+        for i, symbol in enumerate(symbols):
+            if isNonterminal(symbol):
+                alternative = table[symbol].get(kind)
+                if alternative == None:
+                    # an error at runtime, left for the row to report
+                    inlined.extend(self._getRowSymbols(symbols[i:], rows))
+                    return inlined, True
+
+                expanded, consumed = self._inline(alternative, kind, table, rows)
+                inlined.extend(expanded)
+                if consumed:
+                    inlined.extend(self._getRowSymbols(symbols[i + 1:], rows))
+                    return inlined, True
+            else:
+                inlined.append(symbol)
+                if isTerminal(symbol):
+                    inlined.extend(self._getRowSymbols(symbols[i + 1:], rows))
+                    return inlined, True
+        return inlined, False
+
+
+    # symbols with nonterminals replaced by their rows
+    def _getRowSymbols(self, symbols, rows):
+        return [rows[symbol] if isNonterminal(symbol) else symbol for symbol in symbols]
@@ -0,0 +1,261 @@
+from bisect import bisect_right
+from constants import *
+from diagnosticFile import columnOf, sortDiagnostics
+from lexerFile import RegexLexer
+from parserFile import Parser
+from visitorFile import walk
+import nodeFile
+
+
+class Region:
+    # One top-level declaration as parsed: the tokens it was parsed from,
+    # as (kind, text, offset, line) with offset and line relative to the
+    # region's own start and line, the declaration (None if it failed to
+    # parse) and the diagnostics reported in it. A region owns the source
+    # from its start up to where the next region starts.
+    __slots__ = ("start", "line", "tokens", "declaration", "lexerDiagnostics",
+                 "parserDiagnostics", "nodeLine")
+
+    def __init__(self, start, line, tokens, declaration, parserDiagnostics):
+        self.start = start
+        self.line = line
+        self.tokens = [(kind, text, offset - start, tokenLine - line) for kind, text, offset, tokenLine in tokens]
+        self.declaration = declaration
+        self.lexerDiagnostics = []
+        self.parserDiagnostics = parserDiagnostics
+        self.nodeLine = line    # the line the nodes' line numbers were counted from
+
+
+
+class IncrementalParser:
+    # Keeps the tokens and AST of a source text up to date while it is
+    # being edited. The program is kept as a list of regions, one per
+    # top-level declaration. An edit relexes the regions whose text it
+    # touches and reparses from the first of them until the parser is back
+    # at the start of a region whose tokens did not change; every region
+    # from there on is reused. The result is what parsing the whole text
+    # again would give.
+    #
+    # Nodes carry absolute line numbers, so when an edit adds or removes
+    # lines the nodes of the reused declarations after it are renumbered
+    # on the next getProgram().
+
+#------------- PUBLIC SECTION -------------------------------
+    def __init__(self, text = ""):
+        self.text = ""
+        self.lineCount = 1
+        self.regions = []
+        self.starts = []
+        self.program = nodeFile.Program([], 1)
+        self.edit(0, 0, text)
+
+
+    # Replaces deletedLength characters at offset with insertedText.
+    def edit(self, offset, deletedLength, insertedText):
+        text = self.text
+        newText = text[:offset] + insertedText + text[offset + deletedLength:]
+        delta = len(insertedText) - deletedLength
+        lineDelta = insertedText.count("\n") - text.count("\n", offset, offset + deletedLength)
+        regions = self.regions
+        starts = self.starts
+
+        first, last = self._findAffectedRegions(offset, deletedLength)
+        relexStart = starts[first] if first > 0 else 0
+        relexLine = regions[first].line if first > 0 else 1
+        relexEnd = starts[last + 1] + delta if last + 1 < len(regions) else len(newText)
+
+        lexer = RegexLexer()
+        tokens = lexer.makeTokensInRange(newText, relexStart, relexEnd, relexLine)
+
+        self.text = newText
+        self.lineCount += lineDelta
+        newRegions, reused = self._reparse(tokens, relexStart, relexLine, last + 1, delta, lineDelta)
+
+        # lexer diagnostics of regions the reparse ran into stay valid,
+        # their text did not change
+        lexerDiagnostics = lexer.diagnostics
+        for region in regions[last + 1:reused]:
+            self._shiftDiagnostics(region.lexerDiagnostics, lineDelta)
+            lexerDiagnostics.extend(region.lexerDiagnostics)
+        self._assignLexerDiagnostics(newRegions, lexerDiagnostics, first)
+
+        for region in regions[reused:]:
+            region.start += delta
+            region.line += lineDelta
+            if lineDelta != 0:
+                self._shiftDiagnostics(region.lexerDiagnostics, lineDelta)
+                self._shiftDiagnostics(region.parserDiagnostics, lineDelta)
+
+        self.regions = regions[:first] + newRegions + regions[reused:]
+        self.starts = starts[:first] + [region.start for region in newRegions] + \
+                      [start + delta for start in starts[reused:]]
+
+
+    def getText(self):
+        return self.text
+
+
+    # The Program node for the current text. The same node is returned
+    # after every edit, with its declarations updated.
+    def getProgram(self):
+        declarations = []
+        for region in self.regions:
+            if region.nodeLine != region.line:
+                self._shiftNodeLines(region)
+            if region.declaration != None:
+                declarations.append(region.declaration)
+
+        self.program.declarations = declarations
+        self.program.line = self.lineCount
+        for region in self.regions:
+            if region.tokens:
+                self.program.line = region.line + region.tokens[0][3]
+                break
+        return self.program
+
+
+    # Lexer and parser diagnostics for the current text, in source order.
+    def getDiagnostics(self):
+        diagnostics = []
+        for region in self.regions:
+            diagnostics.extend(region.lexerDiagnostics)
+            diagnostics.extend(region.parserDiagnostics)
+        sortDiagnostics(diagnostics)
+        return diagnostics
+
+
+    # The regions in source order. They are replaced or moved by edits, so
+    # they are only valid until the next one.
+    def getRegions(self):
+        return self.regions
+
+
+    # Index of the region that owns the character at offset.
+    def findRegion(self, offset):
+        return max(bisect_right(self.starts, offset) - 1, 0)
+
+
+#--------------- PRIVATE SECTION ----------------------------
+
+
+    # First and last region to relex. Besides the regions the edit is in,
+    # the region before is included when the edit touches a region's first
+    # token, since the parse of a declaration looks one token past its end.
+    # The range is then widened to end at a line start, which no token or
+    # comment runs across.
+    def _findAffectedRegions(self, offset, deletedLength):
+        regions = self.regions
+        starts = self.starts
+        if not regions:
+            return 0, -1
+
+        first = self.findRegion(offset - 1)
+        last = self.findRegion(offset + deletedLength)
+
+        region = regions[first]
+        if first > 0 and region.tokens:
+            kind, text, tokenOffset, tokenLine = region.tokens[0]
+            if offset <= region.start + tokenOffset + len(text):
+                first -= 1
+
+        while last + 1 < len(regions) and self.text[starts[last + 1] - 1] != "\n":
+            last += 1
+        return first, last
+
+
+    # Parses the relexed tokens followed by the tokens of the regions from
+    # nextRegion on, one declaration at a time, and stops once the parser
+    # is at the start of one of those regions. Returns the new regions and
+    # the index of the first old region that is reused.
+    def _reparse(self, tokens, relexStart, relexLine, nextRegion, delta, lineDelta):
+        regions = self.regions
+        fed = []
+        parser = Parser()
+        parser.setTokens(self._feedTokens(tokens, nextRegion, delta, lineDelta, fed), [], self.text)
+
+        # position of the first token of region reused in the token stream
+        reused = nextRegion
+        boundary = len(tokens)
+        parsed = []
+
+        while parser.hasTokens():
+            position = parser.tokenPos
+            while reused < len(regions) and boundary < position:
+                boundary += len(regions[reused].tokens)
+                reused += 1
+            if position == boundary:
+                break
+
+            diagnosticCount = len(parser.diagnostics)
+            declaration = parser.parseNextDeclaration()
+            parsed.append((position, declaration, parser.diagnostics[diagnosticCount:]))
+
+        if not parser.hasTokens():
+            reused = len(regions)
+
+        newRegions = []
+        for i in range(len(parsed)):
+            position, declaration, diagnostics = parsed[i]
+            end = parsed[i + 1][0] if i + 1 < len(parsed) else parser.tokenPos
+            start, line = fed[position][2], fed[position][3]
+            if i == 0:
+                start, line = relexStart, relexLine
+            newRegions.append(Region(start, line, fed[position:end], declaration, diagnostics))
+
+        return newRegions, reused
+
+
+    # The token stream for a reparse: the relexed tokens, then those of the
+    # old regions from nextRegion on, moved to where they are in the new
+    # text. Every token handed out is recorded in fed.
+    def _feedTokens(self, tokens, nextRegion, delta, lineDelta, fed):
+        for token in tokens:
+            fed.append(token)
+            yield token
+
+        for region in self.regions[nextRegion:]:
+            start = region.start + delta
+            line = region.line + lineDelta
+            for kind, text, offset, tokenLine in region.tokens:
+                token = (kind, text, start + offset, line + tokenLine)
+                fed.append(token)
+                yield token
+
+        token = (EOF, TOKEN_TEXT[EOF], len(self.text), self.lineCount)
+        fed.append(token)
+        yield token
+
+
+    # Gives each lexer diagnostic to the new region whose text it is in. If
+    # the edited text no longer holds a declaration, they go to the region
+    # before it, or to an empty region if there is none.
+    def _assignLexerDiagnostics(self, newRegions, diagnostics, first):
+        if not diagnostics:
+            return
+
+        if not newRegions:
+            if first > 0:
+                self.regions[first - 1].lexerDiagnostics.extend(diagnostics)
+                return
+            newRegions.append(Region(0, 1, [], None, []))
+
+        text = self.text
+        bounds = [(region.line, columnOf(text, region.start)) for region in newRegions]
+        bounds[0] = (0, 0)
+        for diagnostic in diagnostics:
+            index = bisect_right(bounds, (diagnostic.line, diagnostic.column)) - 1
+            newRegions[index].lexerDiagnostics.append(diagnostic)
+
+
+    def _shiftDiagnostics(self, diagnostics, lineDelta):
+        for diagnostic in diagnostics:
+            diagnostic.line += lineDelta
+            diagnostic.context = [(line + lineDelta, message) for line, message in diagnostic.context]
+
+
+    def _shiftNodeLines(self, region):
+        shift = region.line - region.nodeLine
+        if region.declaration != None:
+            for node, depth in walk(region.declaration):
+                node.line += shift
+        region.nodeLine = region.line
@@ -0,0 +1,481 @@
+import hashlib
+import marshal
+import os
+from nodeFile import *
+from resolverFile import builtinNames
+
+
+# kinds of symbols, the first part of a symbol key such as "function:main",
+# "struct:point", "member:point.x" or "variable:history"
+FUNCTION = "function"
+STRUCT = "struct"
+MEMBER = "member"
+VARIABLE = "variable"
+
+
+def makeKey(kind, name):
+    return kind + ":" + name
+
+
+# The name a key is found by: a member's own name, without its struct.
+def getKeyName(key):
+    return key.partition(":")[2].rpartition(".")[2]
+
+
+def getStructName(typeSpecifier):
+    if typeSpecifier == None or typeSpecifier.type != "struct":
+        return None
+    return typeSpecifier.identifier
+
+
+def getDigest(source):
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+
+class Location:
+    # Where a symbol is defined or used: the file, the line and the name
+    # of the top-level declaration the line is in.
+    __slots__ = ("path", "line", "context", "isDefinition")
+
+    def __init__(self, path, line, context, isDefinition):
+        self.path = path
+        self.line = line
+        self.context = context
+        self.isDefinition = isDefinition
+
+
+    def __str__(self):
+        return "%s:%d: %s in %s" % (self.path, self.line, "definition" if self.isDefinition else "use", self.context)
+
+
+
+class DeclarationEntry:
+    # What one top-level declaration defines and uses. references maps a
+    # symbol key to (line offset from the declaration's line, is definition)
+    # pairs, so the entry stays valid when the declaration moves. globalTypes
+    # maps the globals it defines to their struct type names (None if not a
+    # struct), dependencies are the globals whose type it used to resolve
+    # "." and "->". declaration is the node it was made from, None once
+    # loaded from disk.
+    __slots__ = ("path", "line", "name", "references", "globalTypes", "dependencies", "declaration")
+
+    def __init__(self, path, line, name, references, globalTypes, dependencies, declaration = None):
+        self.path = path
+        self.line = line
+        self.name = name
+        self.references = references
+        self.globalTypes = globalTypes
+        self.dependencies = dependencies
+        self.declaration = declaration
+
+
+
+class IndexBuilder:
+    # Collects the references of one top-level declaration, which may have
+    # been parsed with errors and miss some of its parts. Names are
+    # scoped like the Resolver does: a use that is not a parameter or a
+    # local in scope is a use of the global of that name. A "." or "->"
+    # access is a use of the member of the struct its variable is declared
+    # with; one on a variable that is not a struct is left out.
+
+    def __init__(self):
+        self.expressionRules = {
+            ConditionalExpression: self.indexConditionalExpression,
+            BinaryExpression: self.indexBinaryExpression,
+            UnaryExpression: self.indexUnaryExpression,
+            NumericLiteral: self.indexNumericLiteral,
+            PostfixExpression: self.indexPostfixExpression,
+            AssignmentExpression: self.indexAssignmentExpression,
+        }
+
+        self.statementRules = {
+            IfStatement: self.indexIfStatement,
+            WhileStatement: self.indexWhileStatement,
+            ForStatement: self.indexForStatement,
+            ReturnStatement: self.indexReturnStatement,
+            VariableDeclaration: self.indexLocalVariable,
+        }
+        for nodeClass in self.expressionRules:
+            self.statementRules[nodeClass] = self.indexExpression
+
+
+#------------- PUBLIC SECTION -------------------------------
+    # globalTypes maps the file's globals to their struct type names, to
+    # resolve "." and "->" on them.
+    def indexDeclaration(self, path, decl, globalTypes):
+        self.references = {}
+        self.dependencies = set()
+        self.globalTypes = globalTypes
+        self.scopes = []
+        self.baseLine = decl.line
+
+        definedTypes = {}
+        if decl.__class__ == FunctionDeclaration:
+            self.indexFunction(decl)
+        elif decl.__class__ == StructDeclaration:
+            self.indexStruct(decl)
+        else:
+            self.add(VARIABLE, decl.identifier, decl.line, True)
+            self.indexType(decl.type)
+            definedTypes[decl.identifier] = getStructName(decl.type)
+            if decl.expression != None:
+                self.indexExpression(decl.expression)
+
+        return DeclarationEntry(path, decl.line, decl.identifier, self.references, definedTypes,
+                                sorted(self.dependencies), decl)
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def add(self, kind, name, line, isDefinition):
+        if name == None:
+            return
+        key = makeKey(kind, name)
+        references = self.references.get(key)
+        if references == None:
+            references = self.references[key] = []
+        references.append((line - self.baseLine, isDefinition))
+
+
+    def indexType(self, typeSpecifier):
+        structName = getStructName(typeSpecifier)
+        if structName != None:
+            self.add(STRUCT, structName, typeSpecifier.line, False)
+
+
+    def indexFunction(self, decl):
+        self.add(FUNCTION, decl.identifier, decl.line, True)
+        self.indexType(decl.type)
+        self.scopes = [{}]
+        for param in decl.parameterList or ():
+            self.indexType(param.type)
+            self.scopes[-1][param.identifier] = getStructName(param.type)
+        self.indexBlock(decl.body)
+
+
+    def indexStruct(self, decl):
+        self.add(STRUCT, decl.identifier, decl.line, True)
+        for member in decl.memberList or ():
+            if decl.identifier != None and member.identifier != None:
+                self.add(MEMBER, decl.identifier + "." + member.identifier, member.line, True)
+            self.indexType(member.type)
+            if member.expression != None:
+                self.indexExpression(member.expression)
+
+
+    def indexBlock(self, statements):
+        if statements == None:
+            return
+
+        self.scopes.append({})
+        for statement in statements:
+            self.statementRules[statement.__class__](statement)
+        self.scopes.pop()
+
+
+    # (struct type name of a variable, whether it is a global), a global's
+    # taken from globalTypes
+    def lookup(self, identifier):
+        for scope in reversed(self.scopes):
+            if identifier in scope:
+                return scope[identifier], False
+        return self.globalTypes.get(identifier), True
+
+
+#--------------- STATEMENTS ---------------------------------
+    def indexLocalVariable(self, node):
+        self.indexType(node.type)
+        if node.expression != None:
+            self.indexExpression(node.expression)
+        self.scopes[-1][node.identifier] = getStructName(node.type)
+
+
+    def indexIfStatement(self, node):
+        self.indexExpression(node.condition)
+        self.indexBlock(node.body)
+        self.indexBlock(node.elseBody)
+
+
+    def indexWhileStatement(self, node):
+        self.indexExpression(node.condition)
+        self.indexBlock(node.body)
+
+
+    def indexForStatement(self, node):
+        self.scopes.append({})
+        if node.forInitializer != None:
+            self.indexLocalVariable(node.forInitializer)
+        self.indexExpression(node.condition)
+        self.indexExpression(node.forUpdater)
+        self.indexBlock(node.body)
+        self.scopes.pop()
+
+
+    def indexReturnStatement(self, node):
+        if node.returnValue != None:
+            self.indexExpression(node.returnValue)
+
+
+#--------------- EXPRESSIONS --------------------------------
+    def indexExpression(self, node):
+        if node != None:
+            self.expressionRules[node.__class__](node)
+
+
+    def indexConditionalExpression(self, node):
+        self.indexExpression(node.body)
+
+
+    def indexBinaryExpression(self, node):
+        self.indexExpression(node.leftOP)
+        self.indexExpression(node.rightOP)
+
+
+    def indexUnaryExpression(self, node):
+        self.indexExpression(node.term)
+
+
+    def indexNumericLiteral(self, node):
+        pass
+
+
+    def indexAssignmentExpression(self, node):
+        self.indexExpression(node.target)
+        self.indexExpression(node.expression)
+
+
+    def indexPostfixExpression(self, node):
+        operator = node.operator
+
+        if operator == "()":
+            if node.identifier not in builtinNames:
+                self.add(FUNCTION, node.identifier, node.line, False)
+            for argument in node.field:
+                self.indexExpression(argument)
+            return
+
+        structName, isGlobal = self.lookup(node.identifier)
+        if isGlobal:
+            self.add(VARIABLE, node.identifier, node.line, False)
+
+        if operator == "[]":
+            self.indexExpression(node.field)
+        elif operator != None:
+            if isGlobal:
+                self.dependencies.add(node.identifier)
+            if structName != None and node.field != None:
+                self.add(MEMBER, structName + "." + node.field, node.line, False)
+
+
+
+class SymbolIndex:
+    # Definitions and uses of the functions, structs, struct members and
+    # global variables of a set of source files. Each top-level declaration
+    # is indexed on its own into a DeclarationEntry, and symbols maps every
+    # symbol key to the entries that mention it, so finding a symbol's
+    # locations costs no more than the locations themselves.
+    #
+    # update() reindexes a file's Program one top-level declaration at a
+    # time: a declaration node that was indexed before (the IncrementalParser
+    # keeps the nodes of unchanged declarations) keeps its entry, unless
+    # the type of a global it resolved members through has changed.
+    #
+    # The index is saved to a single file, with the digest of each source
+    # text it was made from; refresh() reparses only the sources whose text
+    # is not the one indexed.
+
+    formatVersion = 1
+    magic = b"SYMX"
+
+    def __init__(self, path = None):
+        self.path = path
+        self.files = {}      # source path -> (digest, [DeclarationEntry, ...])
+        self.symbols = {}    # symbol key -> {DeclarationEntry: None}, in insertion order
+        self.names = {}      # getKeyName(key) -> {symbol key: None}
+
+
+    # The index saved at path, or an empty one if there is none or it
+    # cannot be read.
+    @staticmethod
+    def open(path):
+        index = SymbolIndex(path)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return index
+
+        try:
+            index._decode(data)
+        except (ValueError, EOFError, TypeError):
+            index = SymbolIndex(path)
+        return index
+
+
+#------------- PUBLIC SECTION -------------------------------
+    def getDefinitions(self, key):
+        return [location for location in self.getReferences(key) if location.isDefinition]
+
+
+    def getUses(self, key):
+        return [location for location in self.getReferences(key) if not location.isDefinition]
+
+
+    # Every Location of the symbol, by file and line.
+    def getReferences(self, key):
+        locations = []
+        for entry in self.symbols.get(key, ()):
+            for lineOffset, isDefinition in entry.references[key]:
+                locations.append(Location(entry.path, entry.line + lineOffset, entry.name, isDefinition))
+        locations.sort(key = lambda location: (location.path, location.line))
+        return locations
+
+
+    # Keys of the symbols called name, or of the member name of a struct
+    # when name is "struct.member".
+    def findKeys(self, name):
+        keys = self.names.get(name.rpartition(".")[2], ())
+        if "." in name:
+            return [key for key in keys if key.partition(":")[2] == name]
+        return list(keys)
+
+
+    def getDigest(self, path):
+        entry = self.files.get(path)
+        return entry[0] if entry != None else None
+
+
+    # Indexes program as the content of the file at path, whose text has
+    # the given digest.
+    def update(self, path, program, digest = None):
+        oldEntries = {}
+        oldTypes = {}
+        if path in self.files:
+            for entry in self.files[path][1]:
+                oldTypes.update(entry.globalTypes)
+                if entry.declaration != None:
+                    oldEntries[id(entry.declaration)] = entry
+
+        declarations = program.declarations
+        globalTypes = {}
+        for decl in declarations:
+            if decl.__class__ == VariableDeclaration:
+                globalTypes[decl.identifier] = getStructName(decl.type)
+        changedGlobals = set(name for name in globalTypes.keys() | oldTypes.keys()
+                             if globalTypes.get(name) != oldTypes.get(name))
+
+        builder = IndexBuilder()
+        entries = []
+        for decl in declarations:
+            entry = oldEntries.pop(id(decl), None)
+            if entry != None and changedGlobals.isdisjoint(entry.dependencies):
+                entry.line = decl.line
+                entries.append(entry)
+                continue
+
+            if entry != None:
+                self._removeEntry(entry)
+            entry = builder.indexDeclaration(path, decl, globalTypes)
+            self._addEntry(entry)
+            entries.append(entry)
+
+        for entry in oldEntries.values():
+            self._removeEntry(entry)
+        for entry in self.files.get(path, (None, ()))[1]:
+            if entry.declaration == None:
+                self._removeEntry(entry)
+        self.files[path] = (digest, entries)
+
+
+    def remove(self, path):
+        if path in self.files:
+            for entry in self.files.pop(path)[1]:
+                self._removeEntry(entry)
+
+
+    # Brings the index up to date with the files at paths, removing the
+    # files it has that are no longer there. A file is read and compared
+    # by digest, and only parsed, with builder (a builderFile.Builder),
+    # when its text changed. Files are indexed under their path relative
+    # to the current directory, like those loaded from disk. Returns the
+    # number of files parsed.
+    def refresh(self, builder, paths):
+        parsed = 0
+        for path in list(self.files):
+            if not os.path.exists(path):
+                self.remove(path)
+
+        for path in paths:
+            path = os.path.relpath(path)
+            with open(path, "r") as file:
+                digest = getDigest(file.read())
+            if digest == self.getDigest(path):
+                continue
+
+            sourceFile = builder.buildFile(path)
+            self.update(path, sourceFile.arena.makeNodes(), getDigest(sourceFile.source))
+            parsed += 1
+        return parsed
+
+
+    def save(self):
+        temporaryPath = self.path + ".%d.tmp" % os.getpid()
+
+        # written aside and renamed, like AstCache entries
+        with open(temporaryPath, "wb") as file:
+            file.write(self._encode())
+        os.replace(temporaryPath, self.path)
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def _addEntry(self, entry):
+        for key in entry.references:
+            keys = self.symbols.get(key)
+            if keys == None:
+                keys = self.symbols[key] = {}
+                self.names.setdefault(getKeyName(key), {})[key] = None
+            keys[entry] = None
+
+
+    def _removeEntry(self, entry):
+        for key in entry.references:
+            keys = self.symbols.get(key)
+            if keys == None:
+                continue
+            keys.pop(entry, None)
+            if not keys:
+                del self.symbols[key]
+                name = getKeyName(key)
+                names = self.names[name]
+                del names[key]
+                if not names:
+                    del self.names[name]
+
+
+    # Source paths are stored relative to the index's directory.
+    def _encode(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        files = []
+        for path, (digest, entries) in self.files.items():
+            files.append((os.path.relpath(os.path.abspath(path), directory), digest,
+                          [(entry.line, entry.name, entry.references, entry.globalTypes, entry.dependencies)
+                           for entry in entries]))
+        return SymbolIndex.magic + marshal.dumps((SymbolIndex.formatVersion, files))
+
+
+    def _decode(self, data):
+        if data[:len(SymbolIndex.magic)] != SymbolIndex.magic:
+            raise ValueError("not a symbol index")
+        version, files = marshal.loads(data[len(SymbolIndex.magic):])
+        if version != SymbolIndex.formatVersion:
+            raise ValueError("symbol index format %d" % version)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        for relativePath, digest, entryTuples in files:
+            path = os.path.relpath(os.path.join(directory, relativePath))
+            entries = []
+            for line, name, references, globalTypes, dependencies in entryTuples:
+                entry = DeclarationEntry(path, line, name, references, globalTypes, dependencies)
+                self._addEntry(entry)
+                entries.append(entry)
+            self.files[path] = (digest, entries)
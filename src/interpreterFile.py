@@ -0,0 +1,455 @@
+from nodeFile import *
+
+
+class ExecutionError(Exception):
+    # Raised by the executors when the program fails at run time. line is
+    # the line it failed on, None for a failure outside of any node.
+    def __init__(self, message, line = None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+
+
+    def __str__(self):
+        text = "Runtime error: " + self.message
+        if self.line != None:
+            text = "Line " + str(self.line) + " : " + text
+        return text
+
+
+
+class Frame:
+    # Variables of one function call, a list indexed by the slots Resolver
+    # assigned; the global frame holds the globals list.
+    __slots__ = ("variables", "returnValue")
+
+    def __init__(self, variables):
+        self.variables = variables
+        self.returnValue = None
+
+
+class Reference:
+    # Value of an '&' expression: the container a variable, array element or
+    # struct member lives in (a variables list, an array or a struct value)
+    # and its index there.
+    __slots__ = ("container", "key")
+
+    def __init__(self, container, key):
+        self.container = container
+        self.key = key
+
+    def get(self):
+        return self.container[self.key]
+
+    def set(self, value):
+        self.container[self.key] = value
+
+
+class StructValue(list):
+    # Struct value: member values in declaration order, indexed by the
+    # member slots Resolver assigned. A distinct class so it is not
+    # mistaken for an array.
+    __slots__ = ()
+
+
+def divide(left, right):
+    quotient = abs(left) // abs(right)
+    return quotient if (left < 0) == (right < 0) else -quotient
+
+def remainder(left, right):
+    return left - right * divide(left, right)
+
+
+# Struct values are copied on assignment and when passed to a function,
+# arrays inside them included; arrays themselves are passed by reference.
+def copyValue(value):
+    if value.__class__ != StructValue:
+        return value
+
+    copy = StructValue()
+    for memberValue in value:
+        if memberValue.__class__ == list:
+            memberValue = [copyValue(elem) for elem in memberValue]
+        copy.append(copyValue(memberValue))
+    return copy
+
+
+
+class Interpreter:
+    # Tree-walking evaluator for a Program annotated by Resolver. Every node
+    # class is mapped to its evaluation method once, in __init__, so
+    # evaluating a node is a single dict lookup on its class. Ints are
+    # Python ints, arrays are lists and struct values are StructValues.
+    # Variables are read and written by slot, never by name. A runtime
+    # error raises ExecutionError.
+
+    binaryOperators = {
+        "+": lambda left, right: left + right,
+        "-": lambda left, right: left - right,
+        "*": lambda left, right: left * right,
+        "/": divide,
+        "%": remainder,
+        "<": lambda left, right: 1 if left < right else 0,
+        ">": lambda left, right: 1 if left > right else 0,
+        "<=": lambda left, right: 1 if left <= right else 0,
+        ">=": lambda left, right: 1 if left >= right else 0,
+        "==": lambda left, right: 1 if left == right else 0,
+        "!=": lambda left, right: 1 if left != right else 0,
+    }
+
+    def __init__(self):
+        self.expressionRules = {
+            ConditionalExpression: self.evaluateConditionalExpression,
+            BinaryExpression: self.evaluateBinaryExpression,
+            UnaryExpression: self.evaluateUnaryExpression,
+            NumericLiteral: self.evaluateNumericLiteral,
+            PostfixExpression: self.evaluatePostfixExpression,
+            AssignmentExpression: self.evaluateAssignmentExpression,
+        }
+
+        self.statementRules = {
+            IfStatement: self.executeIfStatement,
+            WhileStatement: self.executeWhileStatement,
+            ForStatement: self.executeForStatement,
+            ReturnStatement: self.executeReturnStatement,
+            VariableDeclaration: self.executeVariableDeclaration,
+        }
+        for nodeClass in self.expressionRules:
+            self.statementRules[nodeClass] = self.executeExpressionStatement
+
+        self.postfixRules = {
+            "[]": self.evaluateElement,
+            ".": self.evaluateMember,
+            "->": self.evaluateMember,
+            "()": self.evaluateCall,
+        }
+
+        self.builtins = {
+            "print": self.builtinPrint,
+        }
+
+
+#------------- PUBLIC SECTION -------------------------------
+    # Runs the entry function of a Program node and returns its return value.
+    # The program must have been resolved, the slots are read from it.
+    def run(self, program, entry = "main"):
+        if program.globalCount == None:
+            raise ValueError("Program is not resolved, run Resolver().resolveProgram on it first")
+
+        # the type checker has made sure members are only read from structs
+        typed = program.isTyped == True
+        self.postfixRules["."] = self.evaluateTypedMember if typed else self.evaluateMember
+        self.postfixRules["->"] = self.evaluateTypedPointerMember if typed else self.evaluateMember
+
+        self.functions = {}
+        self.structs = {}
+        self.globals = [None] * program.globalCount
+        self.globalFrame = Frame(self.globals)
+
+        for decl in program.declarations:
+            if decl.__class__ == FunctionDeclaration:
+                self.functions[decl.identifier] = decl
+            elif decl.__class__ == StructDeclaration:
+                self.structs[decl.identifier] = decl
+
+        for decl in program.declarations:
+            if decl.__class__ == VariableDeclaration:
+                self.executeVariableDeclaration(decl, self.globalFrame)
+
+        function = self.functions.get(entry)
+        if function == None:
+            raise ExecutionError("no '" + entry + "' function")
+
+        arguments = [self.defaultValue(param.type, param.isArray) for param in function.parameterList]
+        return self.callFunction(function, arguments)
+
+
+    def evaluate(self, node, frame):
+        return self.expressionRules[node.__class__](node, frame)
+
+
+    def runtimeError(self, message, node):
+        raise ExecutionError(message, node.line)
+
+
+#--------------- STATEMENTS ---------------------------------
+    # Statement executors return True when a return statement was executed.
+
+    def executeBlock(self, statements, frame):
+        rules = self.statementRules
+        for statement in statements:
+            if rules[statement.__class__](statement, frame):
+                return True
+        return False
+
+
+    def executeExpressionStatement(self, node, frame):
+        self.expressionRules[node.__class__](node, frame)
+        return False
+
+
+    def executeVariableDeclaration(self, node, frame):
+        if node.declarationType == "array":
+            size = self.evaluate(node.expression, frame)
+            value = self.makeArray(node.type, size, node)
+        elif node.expression != None:
+            value = copyValue(self.evaluate(node.expression, frame))
+        else:
+            value = self.defaultValue(node.type)
+
+        if node.isGlobal:
+            self.globals[node.slot] = value
+        else:
+            frame.variables[node.slot] = value
+        return False
+
+
+    def executeIfStatement(self, node, frame):
+        if self.evaluate(node.condition, frame):
+            return self.executeBlock(node.body, frame)
+        elif node.elseBody != None:
+            return self.executeBlock(node.elseBody, frame)
+        return False
+
+
+    def executeWhileStatement(self, node, frame):
+        condition = node.condition
+        body = node.body
+        evaluate = self.expressionRules[condition.__class__]
+
+        while evaluate(condition, frame):
+            if self.executeBlock(body, frame):
+                return True
+        return False
+
+
+    def executeForStatement(self, node, frame):
+        if node.forInitializer != None:
+            self.executeVariableDeclaration(node.forInitializer, frame)
+
+        condition = node.condition
+        updater = node.forUpdater
+        body = node.body
+        evaluateCondition = self.expressionRules[condition.__class__]
+        evaluateUpdater = self.expressionRules[updater.__class__]
+
+        while evaluateCondition(condition, frame):
+            if self.executeBlock(body, frame):
+                return True
+            evaluateUpdater(updater, frame)
+        return False
+
+
+    def executeReturnStatement(self, node, frame):
+        if node.returnValue != None:
+            frame.returnValue = self.evaluate(node.returnValue, frame)
+        return True
+
+
+#--------------- EXPRESSIONS --------------------------------
+    def evaluateConditionalExpression(self, node, frame):
+        body = node.body
+        return self.expressionRules[body.__class__](body, frame)
+
+
+    def evaluateNumericLiteral(self, node, frame):
+        return int(node.value)
+
+
+    def evaluateBinaryExpression(self, node, frame):
+        operator = node.operator
+        left = self.evaluate(node.leftOP, frame)
+
+        if operator == "&&":
+            return 1 if left and self.evaluate(node.rightOP, frame) else 0
+        if operator == "||":
+            return 1 if left or self.evaluate(node.rightOP, frame) else 0
+
+        right = self.evaluate(node.rightOP, frame)
+        try:
+            return Interpreter.binaryOperators[operator](left, right)
+        except ZeroDivisionError:
+            self.runtimeError("Division by zero", node)
+        except TypeError:
+            self.runtimeError("Invalid operands for '" + operator + "'", node)
+
+
+    def evaluateUnaryExpression(self, node, frame):
+        operator = node.operator
+        term = node.term
+
+        if operator == "&":
+            if term.__class__ != PostfixExpression or term.operator == "()":
+                self.runtimeError("Cannot take the address of this expression", node)
+            return Reference(*self.getLocation(term, frame))
+
+        value = self.evaluate(term, frame)
+        if operator == "-":
+            return -value
+        if operator == "!":
+            return 0 if value else 1
+
+        if value.__class__ != Reference:
+            self.runtimeError("Dereferencing a value that is not a pointer", node)
+        return value.get()
+
+
+    def evaluatePostfixExpression(self, node, frame):
+        # plain variable reads are the most common node, so no rule call
+        if node.operator == None:
+            if node.isGlobal:
+                return self.globals[node.slot]
+            return frame.variables[node.slot]
+        return self.postfixRules[node.operator](node, frame)
+
+
+    def evaluateElement(self, node, frame):
+        container, key = self.getLocation(node, frame)
+        return container[key]
+
+
+    def evaluateMember(self, node, frame):
+        container, key = self.getLocation(node, frame)
+        return container[key]
+
+
+    # Member reads of a type checked program, which leave the class checks
+    # to the failed lookup; only a null pointer or a function that returned
+    # no struct gets there.
+    def evaluateTypedMember(self, node, frame):
+        variables = self.globals if node.isGlobal else frame.variables
+        try:
+            return variables[node.slot][node.memberSlot]
+        except TypeError:
+            return self.evaluateMember(node, frame)
+
+
+    def evaluateTypedPointerMember(self, node, frame):
+        variables = self.globals if node.isGlobal else frame.variables
+        try:
+            return variables[node.slot].get()[node.memberSlot]
+        except (AttributeError, TypeError):
+            return self.evaluateMember(node, frame)
+
+
+    def evaluateAssignmentExpression(self, node, frame):
+        value = copyValue(self.evaluate(node.expression, frame))
+        target = node.target
+
+        if target.operator == None:
+            self.findVariable(target, frame)[target.slot] = value
+        else:
+            container, key = self.getLocation(target, frame)
+            container[key] = value
+
+        return value
+
+
+    def evaluateCall(self, node, frame):
+        arguments = [self.evaluate(argument, frame) for argument in node.field]
+
+        function = self.functions.get(node.identifier)
+        if function == None:
+            builtin = self.builtins.get(node.identifier)
+            if builtin == None:
+                self.runtimeError("Call to undeclared function '" + node.identifier + "'", node)
+            return builtin(arguments)
+
+        if len(arguments) != len(function.parameterList):
+            self.runtimeError("Function '" + node.identifier + "' takes " +
+                              str(len(function.parameterList)) + " arguments", node)
+
+        # calls nest on the Python stack; running out of it is the
+        # program's error, reported at the innermost call
+        try:
+            return self.callFunction(function, arguments)
+        except RecursionError:
+            self.runtimeError("call stack overflow", node)
+
+
+    def callFunction(self, function, arguments):
+        body = function.body    # first, a lazy body sets frameSize once parsed
+        variables = [None] * function.frameSize
+        for param, argument in zip(function.parameterList, arguments):
+            variables[param.slot] = copyValue(argument)
+
+        frame = Frame(variables)
+        self.executeBlock(body, frame)
+        return frame.returnValue
+
+
+#--------------- VALUES -------------------------------------
+    # Returns the list holding a variable: the current frame's or the globals.
+    def findVariable(self, node, frame):
+        if node.isGlobal:
+            return self.globals
+        return frame.variables
+
+
+    # Returns (container, key) for a postfix expression that names storage:
+    # a variable, an array element or a struct member.
+    def getLocation(self, node, frame):
+        operator = node.operator
+        variables = self.findVariable(node, frame)
+
+        if operator == None:
+            return variables, node.slot
+
+        value = variables[node.slot]
+
+        if operator == "[]":
+            index = self.evaluate(node.field, frame)
+            if value.__class__ != list:
+                self.runtimeError("'" + node.identifier + "' is not an array", node)
+            if index.__class__ != int or not 0 <= index < len(value):
+                self.runtimeError("Index " + str(index) + " out of bounds of '" + node.identifier + "'", node)
+            return value, index
+
+        if operator == "->":
+            if value.__class__ != Reference:
+                self.runtimeError("'" + node.identifier + "' is not a pointer", node)
+            value = value.get()
+
+        if value.__class__ != StructValue:
+            self.runtimeError("'" + node.identifier + "' is not a struct", node)
+        return value, node.memberSlot
+
+
+    def defaultValue(self, typeSpecifier, isArray = False):
+        if isArray or typeSpecifier.indirection:
+            return None
+        if typeSpecifier.type == "struct":
+            return self.makeStruct(typeSpecifier)
+        if typeSpecifier.type == "int":
+            return 0
+        return None
+
+
+    def makeArray(self, typeSpecifier, size, node):
+        if size.__class__ != int or size < 0:
+            self.runtimeError("Invalid array size " + str(size), node)
+        return [self.defaultValue(typeSpecifier) for i in range(size)]
+
+
+    def makeStruct(self, typeSpecifier):
+        decl = self.structs.get(typeSpecifier.identifier)
+        if decl == None:
+            self.runtimeError("Unknown struct '" + typeSpecifier.identifier + "'", typeSpecifier)
+
+        value = StructValue()
+        for member in decl.memberList:
+            if member.isArray:
+                size = 0
+                if member.expression != None:
+                    size = self.evaluate(member.expression, self.globalFrame)
+                value.append(self.makeArray(member.type, size, member))
+            else:
+                value.append(self.defaultValue(member.type))
+
+        return value
+
+
+#--------------- BUILTINS -----------------------------------
+    def builtinPrint(self, arguments):
+        print(" ".join(str(argument) for argument in arguments))
+        return 0
@@ -1,23 +1,35 @@
+import re
 from constants import *
+from tokenStoreFile import TokenStore
+from diagnosticFile import Diagnostic, columnOf
 
 class Lexer:
 #------------- PUBLIC SECTION -------------------------------
+    # invalid characters are collected in diagnostics instead of ending
+    # the run; a parser can be handed the same list
+    def __init__(self):
+        self.diagnostics = []
+
+
     def makeTokens(self, text):
         self.text = text
         self.charPos = 0
         self.lineNumber = 1
-        self.tokens = []
+        self.tokens = TokenStore(text)
 
         while not self._isFinished():
             char = self._getChar()
+            self.tokenStart = self.charPos
 
-            if char in r"[](){};:,":
+            if char in r"[](){};:,.":
                 self._tokenizeSpecialSymbol()
 
-            elif char in r"-+/*=<>!&|":
+            elif char in r"-+/*%=<>!&|":
                 self._tokenizeOperator()
 
-            elif char.isalpha() or char == r"_":
+            # the class of RegexLexer's [^\W\d]: word characters but
+            # decimal digits, so '²' starts an identifier in both
+            elif (char.isalnum() and not char.isdecimal()) or char == "_":
                 self._tokenizeIdentifier()
 
             elif char in "0123456789":
@@ -31,8 +43,9 @@ class Lexer:
 
             else:
                 self.handleUnexpectedSymbol()
+                self._advanceChar()
 
-        self.tokens.append(EOF)
+        self.tokens.append(EOF, len(text), 0, self.lineNumber)
         return self.tokens
 
 
@@ -46,8 +59,13 @@ class Lexer:
 
 
     def _addToken(self, newToken):
-        self.tokens.append(newToken)
-        
+        kind = SYMBOL_KINDS.get(newToken)
+        if kind == None:
+            kind = KEYWORD_KINDS.get(newToken, IDENTIFIER)
+            if newToken[0] in "0123456789":
+                kind = NUMBER
+
+        self.tokens.append(kind, self.tokenStart, len(newToken), self.lineNumber)
 
 
     def _getChar(self):
@@ -75,6 +93,8 @@ class Lexer:
                 self._advanceChar()
             else:
                 self.handleUnexpectedSymbol()
+                self._advanceChar()
+                return
 
         self._addToken(tokenStr)
         self._advanceChar()
@@ -84,11 +104,11 @@ class Lexer:
         char = self._getChar()
         tokenStr = char
 
-        if char in "!-&|=+":
-            nextChar = self._getNextChar()
+        if char in "!-&|=+<>":
+            nextChar = self._getNextChar() or ""
             complexOperator = char + nextChar
 
-            if complexOperator in ["!=", "&&", "||", "->", "==","++","--"]:
+            if complexOperator in ["!=", "&&", "||", "->", "==","++","--","<=",">="]:
                 tokenStr += nextChar
                 self._advanceChar()
 
@@ -103,6 +123,8 @@ class Lexer:
         while char.isalnum() or char == "_":
             tokenStr += char
             self._advanceChar()
+            if self._isFinished():
+                break
             char = self._getChar()
 
         self._addToken(tokenStr)
@@ -115,6 +137,8 @@ class Lexer:
         while char in "0123456789":
             tokenStr += char
             self._advanceChar()
+            if self._isFinished():
+                break
             char = self._getChar()
 
         self._addToken(tokenStr)
@@ -124,7 +148,6 @@ class Lexer:
         char = self._getChar()
 
         if char == '\n':
-            self._addToken("\n")
             self.lineNumber += 1
 
         self._advanceChar()
@@ -135,12 +158,155 @@ class Lexer:
             self._advanceChar()
 
 
+    # Invalid characters are reported and skipped, tokenizing goes on.
     def handleUnexpectedSymbol(self):
-        char = self._getChar()
-        print("Line " + str(self.lineNumber) + ": Invalid character: \'" + char + "\'")
-        exit()
+        column = columnOf(self.text, self.charPos)
+        self.diagnostics.append(Diagnostic(self.lineNumber, column, "Invalid character", (), self._getChar()))
+
+
+
+class RegexLexer:
+    # Drop-in alternative to Lexer: one compiled master pattern slices tokens
+    # straight out of the source. Leading blanks are folded into every match,
+    # comments match without any group and anything that is not a token lands
+    # in the last group.
+    #
+    # The source may also be bytes or a mapped file (SourceText.open().text),
+    # lexed in place with a bytes version of the pattern. Identifiers are
+    # then ASCII only and a run of non-ASCII bytes is one invalid character.
+    tokenPatternSource = r"""
+        [ ]*
+        (?:
+            (\n)
+          | ([^\W\d]\w*)
+          | ([0-9]+)
+          | ( ::  | !=  | &&  | \|\|  | ->  | ==  | \+\+  | --  | <=  | >=
+              | [][(){};,.\-+/*%=<>!&|] )
+          | \#[^\n]*
+          | ([^ ])
+        )
+    """
+    tokenPattern = re.compile(tokenPatternSource, re.VERBOSE)
+    bytesTokenPattern = re.compile(tokenPatternSource.replace("([^ ])", r"([\x80-\xff]+|[^ ])").encode(), re.VERBOSE)
+    bytesSymbolKinds = {text.encode(): kind for text, kind in SYMBOL_KINDS.items()}
+    bytesKeywordKinds = {text.encode(): kind for text, kind in KEYWORD_KINDS.items()}
+
+    chunkSize = 1 << 16
+
+#------------- PUBLIC SECTION -------------------------------
+    def __init__(self):
+        self.diagnostics = []
+
+
+    def makeTokens(self, text):
+        self.text = text
+        self.lineNumber = 1
+        self.tokens = TokenStore(text)
+
+        self._tokenizeRange(0, len(text))
+
+        self.tokens.append(EOF, len(text), 0, self.lineNumber)
+        return self.tokens
 
 
+    # Tokenizes text[start:end] alone, to relex part of a file. start must
+    # be a point the lexer would reach between two tokens when tokenizing
+    # the whole text; lines are counted from lineNumber. No EOF is added.
+    def makeTokensInRange(self, text, start, end, lineNumber):
+        self.text = text
+        self.lineNumber = lineNumber
+        self.tokens = TokenStore(text)
+
+        self._tokenizeRange(start, end)
+        return self.tokens
+
+
+    # Reads the source from a file object and yields (kind, text, start, line)
+    # tuples as it goes. Only complete lines are tokenized, since no token
+    # spans a newline; the unfinished tail of a chunk is carried over and
+    # joined with the next one.
+    def streamTokens(self, file, chunkSize = None):
+        chunkSize = chunkSize or RegexLexer.chunkSize
+        self.text = ""
+        self.lineNumber = 1
+        offset = 0
+
+        while True:
+            chunk = file.read(chunkSize)
+            if not chunk:
+                break
+
+            self.text += chunk
+            end = self.text.rfind("\n") + 1
+            if end == 0:
+                continue
+
+            self.tokens = TokenStore(self.text)
+            self._tokenizeRange(0, end)
+            for kind, token, start, line in self.tokens:
+                yield kind, token, offset + start, line
+
+            self.text = self.text[end:]
+            offset += end
+
+        self.tokens = TokenStore(self.text)
+        self._tokenizeRange(0, len(self.text))
+        for kind, token, start, line in self.tokens:
+            yield kind, token, offset + start, line
+
+        yield EOF, TOKEN_TEXT[EOF], offset + len(self.text), self.lineNumber
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    # Hot loop: columns and lookups are bound to locals once per call.
+    def _tokenizeRange(self, start, end):
+        appendKind = self.tokens.kinds.append
+        appendStart = self.tokens.starts.append
+        appendLength = self.tokens.lengths.append
+        appendLine = self.tokens.lines.append
+        symbolKinds = SYMBOL_KINDS
+        keywordKind = KEYWORD_KINDS.get
+        pattern = RegexLexer.tokenPattern
+        if not isinstance(self.text, str):
+            symbolKinds = RegexLexer.bytesSymbolKinds
+            keywordKind = RegexLexer.bytesKeywordKinds.get
+            pattern = RegexLexer.bytesTokenPattern
+        lineNumber = self.lineNumber
+
+        for match in pattern.finditer(self.text, start, end):
+            group = match.lastindex
+
+            if group == 4:
+                token = match.group(4)
+                appendKind(symbolKinds[token])
+            elif group == 2:
+                token = match.group(2)
+                appendKind(keywordKind(token, IDENTIFIER))
+            elif group == 1:
+                lineNumber += 1
+                continue
+            elif group == 3:
+                token = match.group(3)
+                appendKind(NUMBER)
+            elif group == 5:
+                self.lineNumber = lineNumber
+                self.handleUnexpectedSymbol(match.group(5), match.start(5))
+                continue
+            else:
+                continue
+
+            appendStart(match.start(group))
+            appendLength(len(token))
+            appendLine(lineNumber)
 
+        self.lineNumber = lineNumber
 
 
+    # Invalid characters are reported and skipped, tokenizing goes on. The
+    # buffer always starts at a line start, so the column is exact when
+    # streaming too.
+    def handleUnexpectedSymbol(self, char, position):
+        if not isinstance(char, str):
+            char = str(char, "utf-8", "replace")
+        column = columnOf(self.text, position)
+        self.diagnostics.append(Diagnostic(self.lineNumber, column, "Invalid character", (), char))
@@ -1,16 +1,164 @@
+import argparse
+import os
+import sys
+import time
+from contextlib import nullcontext
+from builderFile import Builder
+from cacheFile import AstCache
+from dumperFile import AstDumper
+from sourceTextFile import SourceText
+from resolverFile import Resolver
+from typeCheckerFile import TypeChecker
+from optimizerFile import Optimizer
+from interpreterFile import Interpreter, ExecutionError
+from profilerFile import Profiler
 from parserFile import Parser
-from lexerFile import Lexer
-from nodeFile import Node
-from syntaxTreeFile import SyntaxTree
+from tableParserFile import TableParser
+from serverFile import LanguageServer
+from indexFile import SymbolIndex
 
 
-with open("/home/lazar521/desktop/projects/python/Compiler/inputFile", 'r') as file:
-    text = file.read()
+def parseArguments():
+    parser = argparse.ArgumentParser(description = "Lexes and parses source files, keeping each file's tokens "
+                                                   "and AST in an on-disk cache keyed by the file's contents.")
+    parser.add_argument("paths", nargs = "*", help = "source files, or directories to take every .src file from")
+    parser.add_argument("--cache-dir", default = ".astcache", help = "cache directory (default: .astcache)")
+    parser.add_argument("--no-cache", action = "store_true", help = "parse every file, do not read or write the cache")
+    parser.add_argument("--parser", choices = ("recursive", "table"), default = "recursive",
+                        help = "recursive descent parser or the LL(1) table-driven one (default: recursive)")
+    parser.add_argument("--tree", action = "store_true", help = "print each file's syntax tree")
+    parser.add_argument("--format", choices = AstDumper.formats, default = "tree",
+                        help = "syntax tree format for --tree (default: tree)")
+    parser.add_argument("--run", action = "store_true", help = "run each file without errors")
+    parser.add_argument("--profile", metavar = "REPORT",
+                        help = "time every phase and grammar rule and write a JSON report to REPORT ('-' for stderr, "
+                               "away from the program's output)")
+    parser.add_argument("--profile-memory", action = "store_true",
+                        help = "with --profile, also trace each phase's peak memory (slows everything down)")
+    parser.add_argument("--xref", metavar = "NAME", action = "append",
+                        help = "list the definitions and uses of the functions, structs, globals or members "
+                               "(NAME or STRUCT.MEMBER) called NAME, from the symbol index; may be repeated")
+    parser.add_argument("--index", metavar = "FILE",
+                        help = "symbol index for --xref (default: .symbolindex in the sources' directory)")
+    parser.add_argument("--server", action = "store_true",
+                        help = "run as a language server speaking JSON-RPC (LSP) over stdin and stdout")
+    arguments = parser.parse_args()
+    if not arguments.paths and not arguments.server:
+        parser.error("the following arguments are required: paths")
+    return arguments
 
-tokens = Lexer().makeTokens(text)
-parser = Parser()
-ast = SyntaxTree( parser.parseTokens(tokens) )
 
-Node.printAttributes(nodeType=".node")
+# Brings the symbol index of the sources up to date, parsing only the
+# files that changed since it was saved, and prints the references of
+# every name asked for.
+def crossReference(arguments, builder):
+    sources = builder.findSources(arguments.paths)
+    indexPath = arguments.index
+    if indexPath == None:
+        directories = [os.path.dirname(os.path.abspath(path)) for path in sources] or [os.getcwd()]
+        indexPath = os.path.relpath(os.path.join(os.path.commonpath(directories), ".symbolindex"))
 
-ast.traverseTree()
+    index = SymbolIndex.open(indexPath)
+    parsed = index.refresh(builder, sources)
+    index.save()
+
+    selected = set(os.path.relpath(path) for path in sources)
+    for name in arguments.xref:
+        keys = index.findKeys(name)
+        if not keys:
+            print(name + ": not found")
+        for key in keys:
+            print(key)
+            for location in index.getReferences(key):
+                if location.path in selected:
+                    print("    " + str(location))
+    print("%d files indexed in %s (%d parsed)" % (len(sources), indexPath, parsed))
+
+
+# Errors of the passes after the parser, "Line N : message" strings, shown
+# like the parser's diagnostics.
+def printErrors(sourceFile, errors):
+    for error in errors:
+        print(sourceFile.path + ": " + error)
+
+
+def writeProfile(profiler, path):
+    if path == "-":
+        profiler.writeReport(sys.stderr)
+        return
+    with open(path, "w") as file:
+        profiler.writeReport(file)
+
+
+arguments = parseArguments()
+if arguments.server:
+    sys.exit(LanguageServer().serve())
+
+parserClass = TableParser if arguments.parser == "table" else Parser
+cache = None if arguments.no_cache else AstCache(arguments.cache_dir, parserClass)
+if arguments.xref:
+    crossReference(arguments, Builder(cache, None, parserClass))
+    sys.exit(0)
+
+profiler = None
+phase = lambda name: nullcontext()
+if arguments.profile != None:
+    profiler = Profiler(arguments.profile_memory)
+    phase = profiler.phase
+
+# the report is written even when the build fails
+try:
+    start = time.perf_counter()
+    sourceFiles = Builder(cache, profiler, parserClass).build(arguments.paths)
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    for sourceFile in sourceFiles:
+        if sourceFile.diagnostics:
+            failed += 1
+            source = SourceText(sourceFile.source)
+            for diagnostic in sourceFile.diagnostics:
+                print(sourceFile.path + ": " + str(diagnostic))
+                if diagnostic.column != None:
+                    print(source.getExcerpt(diagnostic.line, diagnostic.column))
+
+        if arguments.tree:
+            print(sourceFile.path)
+            with phase("tree"):
+                AstDumper(sys.stdout, arguments.format).dump(sourceFile.arena.getRoot())
+
+        if arguments.run and not sourceFile.diagnostics:
+            with phase("make nodes"):
+                program = sourceFile.arena.makeNodes()
+            resolver = Resolver()
+            with phase("resolve"):
+                resolved = resolver.resolveProgram(program, False)
+            if resolved == None:
+                printErrors(sourceFile, resolver.errorList)
+                failed += 1
+                continue
+            typeChecker = TypeChecker()
+            with phase("type check"):
+                typed = typeChecker.checkProgram(program, False)
+            if typed == None:
+                printErrors(sourceFile, typeChecker.errorList)
+                failed += 1
+                continue
+            with phase("optimize"):
+                program = Optimizer().optimizeProgram(program)
+            # a runtime error ends this file's run, not the build
+            try:
+                with phase("run"):
+                    Interpreter().run(program)
+            except ExecutionError as error:
+                print(sourceFile.path + ": " + str(error))
+                failed += 1
+
+    cached = sum(1 for sourceFile in sourceFiles if sourceFile.cached)
+    print("%d files (%d from cache, %d parsed), %d with errors, built in %.3f s" %
+          (len(sourceFiles), cached, len(sourceFiles) - cached, failed, elapsed))
+    if failed:
+        sys.exit(1)
+finally:
+    if profiler != None:
+        writeProfile(profiler, arguments.profile)
@@ -1,17 +1,17 @@
-class Node:
-    nodeAttributes = set()
+from operator import attrgetter
+
 
-    def __init__(self, nodeType, attributes, values):
-        if len(attributes) != len(values):
-            print("Attribute list isn't the same length as the value list")
-            exit(-1)
-        
-        for attr in attributes:
-            Node.nodeAttributes.add(attr)
+class Node:
+    # Base class of the generated node classes below. Every node type stores
+    # its fields in __slots__; the attribute names ("leftOP.node", ...) are
+    # kept per class, mapped to slot getters, so getAttributes/getValue work
+    # as before. line is the source line the node starts on.
+    __slots__ = ("line",)
 
-        self.attributes = attributes
-        self.values = values
-        self.type = nodeType
+    nodeAttributes = set()
+    nodeType = None
+    attributes = ()
+    fields = {}
 
 
     def getAttributes(self):
@@ -19,30 +19,177 @@ class Node:
 
 
     def getValue(self, attribute):
-        i = 0
-        while i < len(self.attributes) and self.attributes[i] != attribute:
-            i += 1
-        
-        if i == len(self.attributes):
-            print("Attribute " + attribute + " doesn't exist")
-            exit(-1)
-        
-        return self.values[i]
+        getter = self.fields.get(attribute)
+        if getter == None:
+            raise AttributeError("Attribute " + attribute + " doesn't exist")
+
+        return getter(self)
 
     def getType(self):
-        return self.type
+        return self.nodeType
 
 
 
     @staticmethod
     def printAttributes(nodeType = ".node"):
-        print("----------NODE TYPES-----------")
-        for attr in Node.nodeAttributes:
-            if nodeType in attr:
-                print(attr)
-        print("-------------------------------")
+        lines = ["----------NODE TYPES-----------"]
+        lines.extend(sorted(attr for attr in Node.nodeAttributes if nodeType in attr))
+        lines.append("-------------------------------")
+        print("\n".join(lines))
+
+
+
+# annotations are extra slots filled in by later passes (Resolver,
+# TypeChecker), they start out as None and are not part of the node's
+# attributes
+def makeNodeClass(className, nodeType, attributes, annotations = ()):
+    fieldNames = [attr.split(".")[0] for attr in attributes]
+
+    # __init__ is generated so that construction is plain slot stores
+    source = "def __init__(self, " + ", ".join(fieldNames) + ", line):\n"
+    for field in fieldNames + ["line"]:
+        source += "    self." + field + " = " + field + "\n"
+    for annotation in annotations:
+        source += "    self." + annotation + " = None\n"
+    namespace = {}
+    exec(source, namespace)
+
+    Node.nodeAttributes.update(attributes)
+
+    return type(className, (Node,), {
+        "__slots__": tuple(fieldNames) + tuple(annotations),
+        "__init__": namespace["__init__"],
+        "nodeType": nodeType,
+        "attributes": tuple(attributes),
+        "fields": {attr: attrgetter(field) for attr, field in zip(attributes, fieldNames)},
+    })
+
+
+
+Program = makeNodeClass("Program", "Program",
+    ["declarations.list"], ["globalCount", "isTyped"])
+
+VariableDeclaration = makeNodeClass("VariableDeclaration", "VariableDeclaration",
+    ["type.node", "identifier.lit", "expression.node", "declarationType.lit"], ["slot", "isGlobal", "valueType"])
+
+TypeSpecifier = makeNodeClass("TypeSpecifier", "TypeSpecifier",
+    ["type.lit", "identifier.lit", "indirection.lit"], ["declaration"])
+
+class FunctionDeclaration(makeNodeClass("FunctionDeclaration", "FunctionDeclaration",
+                                        ["type.node", "identifier.lit", "parameterList.list", "body.list"],
+                                        ["frameSize", "lazyBody", "valueType"])):
+    # A parser with lazyBodies leaves the body unparsed and sets lazyBody
+    # (a parserFile.LazyBody) instead. The body is parsed the first time it
+    # is read, then the passes queued with whenBodyLoaded run on it. A body
+    # that fails to parse, or that a pass raises on, stays unloaded, so
+    # reading it again raises again.
+    __slots__ = ()
+
+    def isBodyLoaded(self):
+        return self.lazyBody == None
+
+
+    def loadBody(self):
+        lazyBody = self.lazyBody
+        if lazyBody == None:
+            return
+
+        body = lazyBody.parse()
+        self.lazyBody = None
+        storedBody.__set__(self, body)
+        try:
+            for bodyPass in lazyBody.passes:
+                bodyPass(self)
+        except Exception:
+            self.lazyBody = lazyBody
+            storedBody.__set__(self, None)
+            raise
+
+
+    # Runs bodyPass(self) now, or once the body is parsed if it is not yet.
+    def whenBodyLoaded(self, bodyPass):
+        if self.lazyBody == None:
+            bodyPass(self)
+        else:
+            self.lazyBody.passes.append(bodyPass)
+
+
+# body reads through the slot of the generated class
+storedBody = FunctionDeclaration.__base__.body
+
+def getFunctionBody(node):
+    if node.lazyBody != None:
+        node.loadBody()
+    return storedBody.__get__(node)
+
+FunctionDeclaration.body = property(getFunctionBody, storedBody.__set__)
+
+Parameter = makeNodeClass("Parameter", "Parameter",
+    ["type.node", "identifier.lit", "isArray.lit"], ["slot", "valueType"])
+
+StructDeclaration = makeNodeClass("StructDeclaration", "structDeclaration",
+    ["identifier.lit", "memberList.list"], ["structType"])
+
+Member = makeNodeClass("Member", "member",
+    ["type.node", "identifier.lit", "isArray.lit", "expression.node"], ["valueType"])
+
+IfStatement = makeNodeClass("IfStatement", "ifStatement",
+    ["condition.node", "body.list", "elseBody.list"])
+
+WhileStatement = makeNodeClass("WhileStatement", "whileStatement",
+    ["condition.node", "body.list"])
+
+ForStatement = makeNodeClass("ForStatement", "forStatement",
+    ["forInitializer.node", "condition.node", "forUpdater.node", "body.list"])
+
+ReturnStatement = makeNodeClass("ReturnStatement", "returnStatement",
+    ["returnValue.node"])
+
+AssignmentExpression = makeNodeClass("AssignmentExpression", "assingmentExpression",
+    ["target.node", "expression.node"], ["valueType"])
+
+ConditionalExpression = makeNodeClass("ConditionalExpression", "conditionalExpression",
+    ["body.node"], ["valueType"])
+
+BinaryExpression = makeNodeClass("BinaryExpression", "binaryExpression",
+    ["leftOP.node", "operator.lit", "rightOP.node"], ["valueType"])
+
+UnaryExpression = makeNodeClass("UnaryExpression", "unaryExpression",
+    ["operator.lit", "term.node"], ["valueType"])
+
+NumericLiteral = makeNodeClass("NumericLiteral", "numericLiteral",
+    ["value.lit"], ["valueType"])
+
+
+class PostfixExpression(makeNodeClass("PostfixExpression", "postfixExpression",
+                                      ["identifier.lit", "operator.lit", "field.lit"],
+                                      ["slot", "isGlobal", "memberSlot", "declaration", "memberDeclaration",
+                                       "valueType"])):
+    # field holds an expression for "[]", an argument list for "()" and a
+    # member name otherwise, so its attribute name depends on the operator.
+    # memberSlot is the member's position in its struct for "." and "->".
+    # declaration is the node that declares identifier (a variable, a
+    # Parameter or the called FunctionDeclaration), memberDeclaration the
+    # Member for "." and "->".
+    __slots__ = ()
+
+    fieldAttributes = {
+        "[]": ("identifier.lit", "operator.lit", "field.node"),
+        "()": ("identifier.lit", "operator.lit", "field.list"),
+    }
+    fields = {"identifier.lit": attrgetter("identifier"), "operator.lit": attrgetter("operator"),
+              "field.lit": attrgetter("field"), "field.node": attrgetter("field"),
+              "field.list": attrgetter("field")}
+
+    def getAttributes(self):
+        return PostfixExpression.fieldAttributes.get(self.operator, self.attributes)
+
 
-    
+Node.nodeAttributes.update(PostfixExpression.fields)
 
 
-        
\ No newline at end of file
+nodeClasses = [Program, VariableDeclaration, TypeSpecifier, FunctionDeclaration,
+               Parameter, StructDeclaration, Member, IfStatement, WhileStatement,
+               ForStatement, ReturnStatement, AssignmentExpression,
+               ConditionalExpression, BinaryExpression, UnaryExpression,
+               NumericLiteral, PostfixExpression]
@@ -0,0 +1,121 @@
+from nodeFile import *
+from visitorFile import Transformer
+from interpreterFile import Interpreter
+
+
+def isNot(node):
+    return node.__class__ == UnaryExpression and node.operator == "!"
+
+
+# For conditions and operands of '!', '&&' and '||', where only whether
+# the value is zero matters: !!x is the same as x there.
+def simplifyCondition(node):
+    while isNot(node) and isNot(node.term):
+        node = node.term.term
+    return node
+
+
+
+class Optimizer(Transformer):
+    # AST to AST simplification pass, run after Resolver. Every expression
+    # is replaced by its simplified form: conditionalExpression wrappers are
+    # dropped, operators on numeric literals are folded into a single
+    # literal and identities that cannot change a result are applied (x+0,
+    # 0+x, x-0, x*1, 1*x, x/1, -(-x), and !!x where only the truth of x
+    # matters). Operations that would fail at run time, such as a division
+    # by zero, are left for the executor to report.
+
+#------------- PUBLIC SECTION -------------------------------
+    # Simplifies a Program node in place and returns it. Lazily parsed
+    # function bodies are simplified once they are parsed.
+    def optimizeProgram(self, program):
+        for decl in program.declarations:
+            if decl.__class__ == FunctionDeclaration:
+                decl.whenBodyLoaded(self.transform)
+            else:
+                self.transform(decl)
+        return program
+
+
+#--------------- STATEMENTS ---------------------------------
+    def transformIfStatement(self, node):
+        node.condition = simplifyCondition(node.condition)
+        return node
+
+
+    def transformWhileStatement(self, node):
+        node.condition = simplifyCondition(node.condition)
+        return node
+
+
+    def transformForStatement(self, node):
+        node.condition = simplifyCondition(node.condition)
+        return node
+
+
+#--------------- EXPRESSIONS --------------------------------
+    def transformConditionalExpression(self, node):
+        return node.body
+
+
+    def transformBinaryExpression(self, node):
+        operator = node.operator
+
+        if operator == "&&" or operator == "||":
+            left = node.leftOP = simplifyCondition(node.leftOP)
+            right = node.rightOP = simplifyCondition(node.rightOP)
+
+            if left.__class__ == NumericLiteral and right.__class__ == NumericLiteral:
+                if operator == "&&":
+                    value = 1 if int(left.value) and int(right.value) else 0
+                else:
+                    value = 1 if int(left.value) or int(right.value) else 0
+                return NumericLiteral(str(value), node.line)
+            return node
+
+        left = node.leftOP
+        right = node.rightOP
+        leftValue = int(left.value) if left.__class__ == NumericLiteral else None
+        rightValue = int(right.value) if right.__class__ == NumericLiteral else None
+
+        if leftValue != None and rightValue != None:
+            if (operator == "/" or operator == "%") and rightValue == 0:
+                return node
+            value = Interpreter.binaryOperators[operator](leftValue, rightValue)
+            return NumericLiteral(str(value), node.line)
+
+        if operator == "+":
+            if rightValue == 0:
+                return left
+            if leftValue == 0:
+                return right
+        elif operator == "-" or operator == "/":
+            if rightValue == (0 if operator == "-" else 1):
+                return left
+        elif operator == "*":
+            if rightValue == 1:
+                return left
+            if leftValue == 1:
+                return right
+
+        return node
+
+
+    def transformUnaryExpression(self, node):
+        operator = node.operator
+
+        if operator == "!":
+            term = node.term = simplifyCondition(node.term)
+        else:
+            term = node.term
+
+        if term.__class__ == NumericLiteral:
+            if operator == "-":
+                return NumericLiteral(str(-int(term.value)), node.line)
+            if operator == "!":
+                return NumericLiteral("0" if int(term.value) else "1", node.line)
+
+        if operator == "-" and term.__class__ == UnaryExpression and term.operator == "-":
+            return term.term
+
+        return node
@@ -0,0 +1,158 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+import os
+from constants import *
+from diagnosticFile import showErrors, sortDiagnostics
+from lexerFile import RegexLexer
+from parserFile import Parser
+from arenaFile import AstArena
+
+
+# Brace-balancing pre-scan over the token kinds: returns up to chunkCount
+# token indexes, starting with 0, to split the tokens at. Each split point
+# is a 'func' token outside any braces, at or after an even share of the
+# tokens. Only 'func' is used since 'struct' and 'var' also appear inside
+# declarations.
+def findChunkStarts(tokens, chunkCount):
+    kinds = tokens.kinds.tobytes()
+    funcKind = bytes([FUNC])
+    leftBrace = bytes([LEFT_BRACE])
+    rightBrace = bytes([RIGHT_BRACE])
+    share = len(kinds) // chunkCount
+
+    starts = [0]
+    depth = 0
+    position = 0
+    for i in range(1, chunkCount):
+        candidate = max(i * share, position + 1)
+        while True:
+            candidate = kinds.find(funcKind, candidate)
+            if candidate == -1:
+                return starts
+
+            depth += kinds.count(leftBrace, position, candidate) - kinds.count(rightBrace, position, candidate)
+            position = candidate
+            if depth <= 0:
+                starts.append(candidate)
+                break
+            candidate += 1
+
+    return starts
+
+
+
+# Token store of the file being parsed, set in every worker process.
+workerTokens = None
+
+
+def initializeWorker(tokens):
+    global workerTokens
+    workerTokens = tokens
+
+
+# Runs in a worker: parses the declarations of tokens start to end - 1
+# into a new arena. The parser also gets the token at end, the first of the
+# next chunk, as a declaration's parse may look at the token after it.
+# Returns the arena, its declaration rows, the diagnostics and the token
+# the parse stopped at; it matches a parse of the whole file only if that
+# is end.
+def parseChunk(start, end):
+    tokens = workerTokens
+    arena = AstArena()
+    parser = Parser(arena)
+    endOfFile = (EOF, TOKEN_TEXT[EOF], tokens.starts[end], tokens.lines[end])
+    parser.setTokens(chain(tokens.iterRange(start, end + 1), [endOfFile]), [], tokens.text)
+
+    declarations = []
+    while parser.hasTokens() and parser.tokenPos < end - start:
+        declaration = parser.parseNextDeclaration()
+        if declaration != None:
+            declarations.append(declaration)
+
+    return arena, declarations, parser.diagnostics, start + parser.tokenPos
+
+
+
+class ParallelParser:
+    # Parses a file on a pool of processes. The tokens are split at
+    # top-level 'func' tokens into a few chunks per worker, each chunk is
+    # parsed into its own AstArena and the arenas are joined into one whose
+    # last row is the Program. Arenas are used because node objects take
+    # longer to pickle back from a worker than to parse.
+    #
+    # A split point is only a guess that the whole-file parse starts a
+    # declaration there. A chunk whose parse does not stop exactly at the
+    # next split point (after some syntax errors) is parsed again here,
+    # continuing into the following chunks until the parser is at a split
+    # point again. The result is always that of a sequential parse.
+
+    def __init__(self, workers = None, chunksPerWorker = 4):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksPerWorker = chunksPerWorker
+
+
+#------------- PUBLIC SECTION -------------------------------
+    def parseText(self, text):
+        lexer = RegexLexer()
+        tokens = lexer.makeTokens(text)
+        return self.parseTokens(tokens, lexer.diagnostics)
+
+
+    # Returns the Program row of the joined arena (self.arena) as an
+    # ArenaNode; syntax errors are in self.diagnostics, merged with the
+    # ones passed in in source order.
+    def parseTokens(self, tokens, diagnostics = None):
+        self.diagnostics = diagnostics if diagnostics != None else []
+        self.arena = AstArena()
+
+        starts = findChunkStarts(tokens, self.workers * self.chunksPerWorker)
+        ends = starts[1:] + [len(tokens) - 1]
+
+        with ProcessPoolExecutor(self.workers, initializer = initializeWorker, initargs = (tokens,)) as pool:
+            results = pool.map(parseChunk, starts, ends)
+            declarations = self._joinChunks(tokens, starts, results)
+
+        self.arena.Program(declarations, tokens.lines[0])
+        sortDiagnostics(self.diagnostics)
+        if self.diagnostics:
+            showErrors(self.diagnostics)
+        return self.arena.getRoot()
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def _joinChunks(self, tokens, starts, results):
+        arena = self.arena
+        declarations = []
+        position = 0    # token the sequential parse has reached
+
+        for i, (chunkArena, chunkDeclarations, chunkDiagnostics, end) in enumerate(results):
+            if starts[i] < position:
+                continue
+
+            if end == (starts[i + 1] if i + 1 < len(starts) else len(tokens) - 1):
+                base = arena.appendArena(chunkArena)
+                declarations.extend(declaration + base for declaration in chunkDeclarations)
+                self.diagnostics.extend(chunkDiagnostics)
+                position = end
+            else:
+                position = self._parseFrom(tokens, starts, i, declarations)
+
+        return declarations
+
+
+    # Parses from the start of chunk index into the joined arena until the
+    # parser stops at a later split point, and returns that token.
+    def _parseFrom(self, tokens, starts, index, declarations):
+        start = starts[index]
+        splitPoints = set(starts[index + 1:])
+        parser = Parser(self.arena)
+        parser.setTokens(tokens.iterRange(start, len(tokens)), self.diagnostics, tokens.text)
+
+        while parser.hasTokens():
+            declaration = parser.parseNextDeclaration()
+            if declaration != None:
+                declarations.append(declaration)
+            if start + parser.tokenPos in splitPoints:
+                break
+
+        return start + parser.tokenPos
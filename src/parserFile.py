@@ -1,98 +1,223 @@
-from nodeFile import Node
+import re
+from array import array
+from collections import deque
+from itertools import chain, islice
+import nodeFile
 from constants import *
+from diagnosticFile import Diagnostic, DiagnosticError, columnOf, showErrors, sortDiagnostics
+from tokenStoreFile import TokenStore
 
 class Parser:
-    keywords = ["struct","for","while","void","int","if","else","return","func","var"]
-    
+    # Bump when the tokens or trees the front end produces change; cached
+    # parses are keyed by it.
+    version = 2
+
+    typeSpecifiers = {INT: "int", VOID: "void", STRUCT: "struct"}
+
+    # binary operator kind -> (text, precedence), higher binds tighter
+    binaryOperators = {
+        OR: ("||", 1),
+        AND: ("&&", 2),
+        EQUAL: ("==", 3), NOT_EQUAL: ("!=", 3),
+        LESS: ("<", 4), GREATER: (">", 4), LESS_EQUAL: ("<=", 4), GREATER_EQUAL: (">=", 4),
+        PLUS: ("+", 5), MINUS: ("-", 5),
+        STAR: ("*", 6), SLASH: ("/", 6), PERCENT: ("%", 6),
+    }
+    unaryOperators = {MINUS: "-", NOT: "!", AMPERSAND: "&", STAR: "*"}
+
+    # Token kinds that matter when skipping a function body, as bytes of
+    # TokenStore.kinds
+    bodyScanPattern = re.compile(b"[" + re.escape(array("b", [LEFT_BRACE, RIGHT_BRACE, FUNC, EOF]).tobytes()) + b"]")
+
+    # nodes is the module or object the parser builds nodes with: nodeFile
+    # for node objects, or an AstArena to emit into flat arrays.
+    #
+    # With lazyBodies, function bodies are not parsed: a FunctionDeclaration
+    # gets its signature and a LazyBody holding the token range of its body,
+    # found by brace matching, and the body is parsed when first read. This
+    # needs node objects and a TokenStore; a body that is not closed before
+    # the next 'func' is parsed right away, for its diagnostics. Syntax
+    # errors inside a lazy body are only found when it is parsed. Lazy
+    # bodies are for library callers that run a program straight from its
+    # tokens; the driver's Builder parses every body to report all syntax
+    # errors up front and to fill the cache, so it does not use them.
+    def __init__(self, nodes = nodeFile, lazyBodies = False):
+        self.nodes = nodes
+        self.lazyBodies = lazyBodies and nodes == nodeFile
+
+
+    # tokens can be a TokenStore or any iterable of (kind, text, start, line)
+    # tuples, e.g. a lexer generator; they are pulled one at a time and only
+    # the current token is kept.
+    #
+    # Syntax errors do not stop the parse: each one is recorded in
+    # self.diagnostics and the parser skips ahead to a point where it can
+    # resume, so the Program returned is the part of the source that did
+    # parse. diagnostics can be a list the lexer reports into as well; the
+    # two are merged into source order once the program is parsed.
+    def parseTokens(self, tokens, diagnostics = None):
+        self.setTokens(tokens, diagnostics)
+        program = self.parseProgram()
+        if self.diagnostics:
+            self.showErrors()
 
-    def parseTokens(self, tokens):
-        self.tokens = tokens
-        self.tokenPos = 0
-        self.lineNumber = 1
-        self.errorList = []
+        return program
 
-        while self.hasTokens() and self.getToken() == "\n":
-            self.tokenPos += 1
-            self.lineNumber += 1
 
-        return self.parseProgram()
+    # Prepares to parse tokens without parsing anything yet, for callers
+    # that drive parseNextDeclaration themselves. source is the text the
+    # token offsets point into, used for error columns; a TokenStore
+    # brings its own.
+    def setTokens(self, tokens, diagnostics = None, source = None):
+        self.tokens = iter(tokens)
+        self.tokenStore = tokens if isinstance(tokens, TokenStore) else None
+        self.tokenKinds = None
+        self.source = source if source != None else getattr(tokens, "text", None)
+        self.tokenPos = -1
+        self.diagnostics = diagnostics if diagnostics != None else []
+        self.lastError = None
+        self.expected = []
+        self.expectedPos = -1
+
+        self.nextToken()
 
 
     def getLineNumber(self):
         return self.lineNumber
 
     def hasTokens(self):
-        return self.getToken() != EOF
+        return self.kind != EOF
 
 
-    def advance(self):     
-        if self.hasTokens():
-            self.tokenPos += 1
+    def nextToken(self):
+        self.kind, self.text, self.start, self.lineNumber = next(self.tokens)
+        self.tokenPos += 1
 
-            while self.getToken() == "\n":
-                self.tokenPos += 1
-                self.lineNumber +=1
 
-        else:
-            print("No more tokens")    
-            exit(-1)
+    # EOF is never consumed: advancing past it stays on it, and every loop
+    # over the tokens stops there.
+    def advance(self):
+        if self.hasTokens():
+            self.nextToken()
 
     def getToken(self):
-        return self.tokens[self.tokenPos]
+        return self.kind
 
 
 
-    def match(self,string):
-        if self.getToken() == string:
+    # A failed match records kind as expected at the current token, for
+    # the diagnostic if the parse fails there.
+    def match(self,kind):
+        if self.kind == kind:
             self.advance()
             return True
 
+        if self.expectedPos == self.tokenPos:
+            self.expected.append(kind)
+        else:
+            self.expectedPos = self.tokenPos
+            self.expected = [kind]
         return False
 
 
-    def parseIdentifier(self):
-        token = self.getToken()
-        
-        if token[0].isnumeric():
-            return None
+    def expect(self,kind):
+        if self.expectedPos != self.tokenPos:
+            self.expectedPos = self.tokenPos
+            self.expected = []
+        self.expected.append(kind)
 
-        for letter in token:
-            if not letter.isalnum() and letter != "_":
-                return None
-        
-        if token in Parser.keywords:
+
+    # Returns the operator text if the current token is one of operators (a
+    # kind -> text table) and consumes it, None otherwise.
+    def matchOperator(self,operators):
+        operator = operators.get(self.kind)
+        if operator != None:
+            self.advance()
+
+        return operator
+
+
+    def parseIdentifier(self):
+        if self.kind != IDENTIFIER:
+            self.expect(IDENTIFIER)
             return None
 
+        token = self.text
         self.advance()
         return token
 
     def matchNum(self):
-        if self.getToken().isnumeric():
-            return True
-        return False
+        return self.kind == NUMBER
 
     def parseNumericLiteral(self):             
-        token = self.getToken()                     
-        #print(token)
-        if token.isnumeric():
+        line = self.getLineNumber()
+        token = self.text
+        if self.kind == NUMBER:
             self.advance()
-            return Node("numericLiteral",\
-                        ["value.lit"],\
-                        [token]) 
+            return self.nodes.NumericLiteral(token, line) 
         
         return None
 
 
-    def error(self,message,line,printToken = True):
-        if printToken:
-            self.errorList.insert(0,"Line " + str(line) + " : " + message + " : Unmatched token: " + self.getToken())
-        else:
-            self.errorList.insert(0,"Line " + str(line) + " : " + message)
+    # The first error at a token becomes a Diagnostic located at that
+    # token; errors reported by the enclosing constructs while the parse
+    # unwinds from it are added to its context.
+    def error(self,message,line,expected = None):
+        if self.lastError != None and self.lastError[0] == self.tokenPos:
+            self.lastError[1].context.append((line, message))
+            return
+
+        if expected == None:
+            expected = self.expected if self.expectedPos == self.tokenPos else ()
+        expectedTexts = []
+        for kind in expected:
+            text = TOKEN_TEXT.get(kind, "identifier")
+            if text not in expectedTexts:
+                expectedTexts.append(text)
+
+        column = None
+        if self.source != None:
+            column = columnOf(self.source, self.start)
+
+        diagnostic = Diagnostic(self.lineNumber, column, message, expectedTexts, self.text)
+        self.diagnostics.append(diagnostic)
+        self.lastError = (self.tokenPos, diagnostic)
+
+
+    # Panic mode recovery after a construct that started at token startPos
+    # failed: skips tokens until just after a ';' or a complete { } block,
+    # or up to one of stopKinds. Inside a block (nested) a '}' closing it
+    # or a 'func' always ends the skip; at top level a stray '}' is skipped.
+    # At least one token is skipped if the construct consumed none.
+    def synchronize(self, startPos, stopKinds, nested):
+        depth = 0
+        skipped = self.tokenPos != startPos
+
+        while self.kind != EOF:
+            kind = self.kind
+            if depth == 0:
+                if nested and (kind == RIGHT_BRACE or kind == FUNC):
+                    break
+                if skipped and kind in stopKinds:
+                    break
+
+            self.advance()
+            skipped = True
+
+            if kind == LEFT_BRACE:
+                depth += 1
+            elif kind == RIGHT_BRACE:
+                depth -= 1
+                if depth <= 0:
+                    break
+            elif kind == SEMICOLON and depth == 0:
+                break
+
+        self.lastError = None
+
 
     def showErrors(self):
-        print("AN ERROR HAS OCCURED")
-        for error in self.errorList:
-            print (error)
+        showErrors(self.diagnostics)
 
 ##################  PARSING  ##################
 
@@ -100,14 +225,10 @@ class Parser:
     # Program       -> DeclarationList
     
     def parseProgram(self):
+        line = self.getLineNumber()
         declarationList = self.parseDeclarationList()
-        if declarationList == None:
-            self.showErrors()
-            return None 
-
-        return Node("Program",\
-                    ["declarations.list"],\
-                    [declarationList])
+        sortDiagnostics(self.diagnostics)
+        return self.nodes.Program(declarationList, line)
 
         
     # DeclarationList -> Declaration
@@ -117,16 +238,26 @@ class Parser:
         declarations = []
 
         while self.hasTokens():
-            declaration = self.parseDeclaration()
-            
-            if declaration == None:
-                return None
-
-            declarations.append(declaration)
+            declaration = self.parseNextDeclaration()
+            if declaration != None:
+                declarations.append(declaration)
 
         return declarations
 
 
+    # One top-level declaration, or None if it failed to parse, in which
+    # case the tokens up to the next declaration are skipped.
+
+    def parseNextDeclaration(self):
+        startPos = self.tokenPos
+        declaration = self.parseDeclaration()
+
+        if declaration == None:
+            self.synchronize(startPos, Parser.declarationSyncKinds, False)
+
+        return declaration
+
+
 
     # Declaration    -> VariableDeclarationStatement
     #            | FunctionDeclaration
@@ -134,19 +265,13 @@ class Parser:
 
     def parseDeclaration(self):
         line = self.getLineNumber()
-        token = self.getToken()
 
-        if token == "func":
-            decl = self.parseFunctionDeclaration()
-        elif token == "struct":
-            decl = self.parseStructDeclaration()
-        elif token == "var":
-            decl = self.parseVariableDeclarationStatement()
-        else:
-            decl = None
-            self.error("Cannot deduce declaration type",line)
-            
-        return decl
+        rule = Parser.declarationRules.get(self.kind)
+        if rule == None:
+            self.error("Cannot deduce declaration type",line,Parser.declarationRules)
+            return None
+
+        return getattr(self, rule)()
 
 
 
@@ -157,8 +282,8 @@ class Parser:
         if declarataion == None:
             return None
         
-        if not self.match(";"):
-            self.error("Variable declaration missing ';'" + line)
+        if not self.match(SEMICOLON):
+            self.error("Variable declaration missing ';'",line)
             return None
         
         return declarataion
@@ -173,7 +298,7 @@ class Parser:
         expr = None
         declType = "regular"
 
-        if not self.match("var"):
+        if not self.match(VAR):
             return None
 
         typeSpecifier = self.parseTypeSpecifier()
@@ -185,25 +310,24 @@ class Parser:
         if identifier == None:
             self.error("Invalid identifier",line)
         
-        if self.match("["):  
+        if self.match(LEFT_BRACKET):  
             expr = self.parseConditionalExpression()
             if expr == None:
                 self.error("Invalid expression",line)
                 return None
 
-            if not self.match("]"):
+            if not self.match(RIGHT_BRACKET):
                 self.error("Missing ']'",line)
                 return None
+            declType = "array"
         
-        elif self.match("="):
+        elif self.match(ASSIGN):
             expr = self.parseConditionalExpression()
             if expr == None:
                 self.error("Invalid expression",line)
                 return None
 
-        return Node("VariableDeclaration",\
-                    ["type.node","identifier.lit","expression.node","declarationType.lit"],\
-                    [typeSpecifier,identifier,expr,declType])
+        return self.nodes.VariableDeclaration(typeSpecifier, identifier, expr, declType, line)
         
 
 
@@ -217,11 +341,8 @@ class Parser:
         dataType = None
         indirection = False
 
-        for word in ["int","void","struct"]:
-            dataType = word
-            if self.match(dataType):
-                break
-        else:
+        dataType = self.matchOperator(Parser.typeSpecifiers)
+        if dataType == None:
             self.error("Unknown type ",line)
             return None
 
@@ -231,12 +352,10 @@ class Parser:
                 self.error("Invalid struct identifier",line)
                 return None
 
-        if self.match("*"):
+        if self.match(STAR):
             indirection = True
 
-        return Node("TypeSpecifier",\
-            ["type.lit","identifier.lit","indirection.lit"],\
-            [dataType,identifier,indirection])
+        return self.nodes.TypeSpecifier(dataType, identifier, indirection, line)
 
 
     # FunctionDeclaration -> func TypeSpecifier Identifier ( ParameterList ) CompoundStatement
@@ -247,7 +366,7 @@ class Parser:
     def parseFunctionDeclaration(self):
         line = self.getLineNumber()
 
-        if not self.match("func"):
+        if not self.match(FUNC):
             self.error("Function declaration missing 'func'",line)
             return None
 
@@ -261,15 +380,15 @@ class Parser:
             self.error("Invalid funciton identifier",line)
             return None
 
-        if not self.match("("):
+        if not self.match(LEFT_PAREN):
             self.error("Function declaration missing ')'",line)
             return None
         
         parameterList = []
         paramCnt = 0
-        while not self.match(")"):
+        while not self.match(RIGHT_PAREN):
             if paramCnt > 0:
-                    if not self.match(","):
+                    if not self.match(COMMA):
                         self.error("Parameter list missing ','",line)
                         return None
 
@@ -280,18 +399,53 @@ class Parser:
             parameterList.append(parameter)
             paramCnt += 1
 
+        if self.lazyBodies and self.tokenStore != None and self.kind == LEFT_BRACE:
+            lazyBody = self.skipBody()
+            if lazyBody != None:
+                declaration = self.nodes.FunctionDeclaration(typeSpecifier, identifier, parameterList, None, line)
+                declaration.lazyBody = lazyBody
+                return declaration
         
         statements = self.parseCompountStatement()
         if statements == None:
-            self.error("Invalid function body",line,False)
+            self.error("Invalid function body",line)
             return None
 
 
-        return Node("FunctionDeclaration",\
-                    ["type.node","identifier.lit","parameterList.list","body.list"],\
-                    [typeSpecifier,identifier,parameterList,statements])
+        return self.nodes.FunctionDeclaration(typeSpecifier, identifier, parameterList, statements, line)
+
+
 
 
+    # At the '{' of a function body: moves past the matching '}' and
+    # returns a LazyBody for the tokens in between, or returns None and
+    # stays put if a 'func' or the end of file comes first. The match is
+    # found on the kinds column, the skipped tokens are only iterated over.
+    def skipBody(self):
+        if self.tokenKinds == None:
+            self.tokenKinds = self.tokenStore.kinds.tobytes()
+
+        first = self.tokenPos
+        depth = 0
+        for match in Parser.bodyScanPattern.finditer(self.tokenKinds, first):
+            kind = self.tokenKinds[match.start()]
+            if kind == LEFT_BRACE:
+                depth += 1
+            elif kind == RIGHT_BRACE:
+                depth -= 1
+                if depth == 0:
+                    break
+            else:
+                return None
+        else:
+            return None
+
+        last = match.start()
+        deque(islice(self.tokens, last - first), maxlen = 0)
+        self.tokenPos = last
+        self.nextToken()
+        return LazyBody(self.tokenStore, first, last, self.source)
+
 
 
     # Parameter     -> TypeSpecifier Identifier
@@ -311,16 +465,14 @@ class Parser:
             self.error("Invalid parameter identifier",line)
             return None
         
-        if self.match("["):
-            if not self.match("]"):
-                self.error("Parameter missing ']'")
+        if self.match(LEFT_BRACKET):
+            if not self.match(RIGHT_BRACKET):
+                self.error("Parameter missing ']'",line)
                 return None
             isArray = True
         
         
-        return Node("Parameter",\
-                    ["type.node","identifier.lit","isArray.lit"],\
-                    [typeSpecifier,identifier,isArray])
+        return self.nodes.Parameter(typeSpecifier, identifier, isArray, line)
 
 
     # StructDeclaration -> struct Identifier { MemberList } 
@@ -328,7 +480,7 @@ class Parser:
     def parseStructDeclaration(self):
         line = self.getLineNumber()
 
-        if not self.match("struct"):
+        if not self.match(STRUCT):
             self.error("Missing 'struct' keyword",line)
             return None
         
@@ -337,23 +489,27 @@ class Parser:
             self.error("Invalid identifier",line)
             return None
         
-        if not self.match("{"):
+        if not self.match(LEFT_BRACE):
             self.error("Struct declaration missing '{'",line)
             return None
 
         memberList = []
-        while not self.match("}"):
+        while not self.match(RIGHT_BRACE):
+            if self.kind == FUNC or self.kind == EOF:
+                self.error("Struct declaration missing '}'",line)
+                break
+
+            startPos = self.tokenPos
             member = self.parseMember()
             if member == None:
-                self.error("Invalid struct member or missing '}'",line)
-                return None
+                self.error("Invalid struct member",line)
+                self.synchronize(startPos, (), True)
+                continue
             memberList.append(member)
         
 
 
-        return Node("structDeclaration",\
-                    ["identifier.lit","memberList.list"],\
-                    [identifier,memberList])
+        return self.nodes.StructDeclaration(identifier, memberList, line)
 
 
     # MemberList    -> Member
@@ -380,25 +536,23 @@ class Parser:
             return None
 
 
-        if self.match("["):
-            if not self.match("]"):
+        if self.match(LEFT_BRACKET):
+            if not self.match(RIGHT_BRACKET):
                 constantExpression = self.parseConditionalExpression()
                 if constantExpression == None:
                     self.error("Invalid expression inside [ ]",line)
 
-            if not self.match("]"):
+            if not self.match(RIGHT_BRACKET):
                 self.error("Member missing ']",line)
                 return None
             isArray = True
 
 
-        if not self.match(";"):
+        if not self.match(SEMICOLON):
             self.error("Member missing ';'",line)
             return None
 
-        return Node("member",\
-                    ["type.node","identifier.lit","isArray.lit","expression.node"],\
-                    [typeSpecifier,identifier,isArray,constantExpression])
+        return self.nodes.Member(typeSpecifier, identifier, isArray, constantExpression, line)
 
 
     # CompoundStatement -> { StatementList }
@@ -410,15 +564,22 @@ class Parser:
     def parseCompountStatement(self):
         line = self.getLineNumber()
 
-        if not self.match("{"):
+        if not self.match(LEFT_BRACE):
             self.error("Missing '{'",line)
             return None
         
+        # an unterminated block ends where the next function starts
         statementList = []
-        while not self.match("}"):
+        while not self.match(RIGHT_BRACE):
+            if self.kind == FUNC or self.kind == EOF:
+                self.error("Missing '}'",line)
+                break
+
+            startPos = self.tokenPos
             statement = self.parseStatement()
             if statement == None:
-                return None
+                self.synchronize(startPos, Parser.statementSyncKinds, True)
+                continue
             statementList.append(statement)
        
         return statementList
@@ -434,24 +595,7 @@ class Parser:
 
 
     def parseStatement(self):
-        line = self.getLineNumber()
-        token = self.getToken()
-
-        if token == "if":
-            stmt = self.parseIfStatement()
-        elif token == "while":
-            stmt = self.parseWhileStatement()
-        elif token == "for":
-            stmt = self.parseForStatement()
-        elif token == "return":
-            stmt = self.parseReturnStatement()
-        elif token == "var":
-            stmt = self.parseVariableDeclarationStatement()
-        else:
-            stmt = self.parseExpressionStatement()
-
-
-        return stmt
+        return getattr(self, Parser.statementRules.get(self.kind, "parseExpressionStatement"))()
 
         
     # ExpressionStatement -> Expression ;
@@ -463,7 +607,7 @@ class Parser:
         if expression == None:
             return None
 
-        if not self.match(";"):
+        if not self.match(SEMICOLON):
             self.error("Expression missing ';'",line)
             return None
         
@@ -476,11 +620,11 @@ class Parser:
     def parseIfStatement(self):
         line = self.getLineNumber()
 
-        if not self.match("if"):
+        if not self.match(IF):
             self.error("Missing 'if' keyword",line)
             return None
         
-        if not self.match("("):
+        if not self.match(LEFT_PAREN):
             self.error("If statement missing '('",line)
             return None
 
@@ -489,27 +633,25 @@ class Parser:
             self.error("If statement invalid condition",line)
             return None
         
-        if not self.match(")"):
+        if not self.match(RIGHT_PAREN):
             self.error("If statement missing ')'",line)
             return None
         
         body = self.parseCompountStatement()
         if body == None:
-            self.error("If statement invalid body",line,False)
+            self.error("If statement invalid body",line)
             return None
 
         
         elseBody = None
-        if self.match("else"):
+        if self.match(ELSE):
             elseBody = self.parseCompountStatement()
             if elseBody == None:
-                self.error("If statement else branch has invalid body",line,False)
+                self.error("If statement else branch has invalid body",line)
                 return None
         
     
-        return Node("ifStatement",\
-                    ["condition.node","body.list","elseBody.list"],\
-                    [condition,body,elseBody])
+        return self.nodes.IfStatement(condition, body, elseBody, line)
 
 
     # WhileStatement -> while ( Expression ) CompoundStatement
@@ -517,31 +659,29 @@ class Parser:
     def parseWhileStatement(self):
         line = self.getLineNumber()
 
-        if not self.match("while"):
+        if not self.match(WHILE):
             self.error("Missing 'while' keyword",line)
             return None
         
-        if not self.match("("):
-            self.error("While statement missing '('")
+        if not self.match(LEFT_PAREN):
+            self.error("While statement missing '('",line)
             return None
         
         condition = self.parseConditionalExpression()
         if condition == None:
-            self.error("While statement invalid condition",line,False)
+            self.error("While statement invalid condition",line)
             return None
 
-        if not self.match(")"):
+        if not self.match(RIGHT_PAREN):
             self.error("While statement missing ')'",line)
             return None
         
         compoundStatement = self.parseCompountStatement()
         if compoundStatement == None:
-            self.error("While statement invalid body",line,False)
+            self.error("While statement invalid body",line)
             return None
         
-        return Node("whileStatement",\
-                    ["condition.node","body.list"],\
-                    [condition,compoundStatement])
+        return self.nodes.WhileStatement(condition, compoundStatement, line)
 
 
     # ForStatement   -> for ( <ForInitializer> ; Expression ; ForUpdater ) CompoundStatement
@@ -549,21 +689,22 @@ class Parser:
     def parseForStatement(self):
         line = self.getLineNumber()
 
-        if not self.match("for"):
+        if not self.match(FOR):
             self.error("Missing 'for' keyword",line)
             return None
 
-        if not self.match("("):
+        if not self.match(LEFT_PAREN):
             self.error("For statement missing '('",line)
             return None
         
 
-        if not self.match(";"):
+        forInitializer = None
+        if not self.match(SEMICOLON):
             forInitializer = self.parseForInitializer()
             if forInitializer == None:
                 self.error("Invalid for initializer",line)
             
-            if not self.match(";"):
+            if not self.match(SEMICOLON):
                 self.error("For stetement missing separator ';' after for condition",line)
                 return None
 
@@ -572,7 +713,7 @@ class Parser:
             self.error("For statement missing condition",line)
             return None
         
-        if not self.match(";"):
+        if not self.match(SEMICOLON):
             self.error("For stetement missing separator ';' after for initializer",line)
             return None
 
@@ -581,8 +722,8 @@ class Parser:
             self.error("For statement missing for updater",line)
             return None
 
-        if not self.match(")"):
-            self.error("For statement missing ')'")
+        if not self.match(RIGHT_PAREN):
+            self.error("For statement missing ')'",line)
             return None
 
         compoundStatement = self.parseCompountStatement()
@@ -590,9 +731,7 @@ class Parser:
             self.error("For statement invalid body",line)
             return None
  
-        return Node("forStatement",\
-                    ["forInitializer.node","condition.node","forUpdater.node","body.list"],\
-                    [forInitializer,expression,forUpdater,compoundStatement])
+        return self.nodes.ForStatement(forInitializer, expression, forUpdater, compoundStatement, line)
 
 
     # ForInitializer ->  VariableDeclaration
@@ -612,25 +751,23 @@ class Parser:
 
     def parseReturnStatement(self):
         line = self.getLineNumber()
-        returnType = "void"
+        expr = None
 
-        if not self.match("return"):
+        if not self.match(RETURN):
             self.error("Missing 'return' keyword",line)
             return None
         
-        if not self.match(";"):
+        if not self.match(SEMICOLON):
             expr = self.parseConditionalExpression()
             if expr == None:
                 self.error("Return statement invalid return value",line)
                 return None
 
-            if not self.match(";"):
+            if not self.match(SEMICOLON):
                 self.error("Return statement missing ';'",line)
                 return None
 
-        return Node("returnStatement",\
-                        ["returnValue.node"],\
-                        [expr])
+        return self.nodes.ReturnStatement(expr, line)
 
 
 
@@ -638,24 +775,25 @@ class Parser:
     #       | ConditionalExpression
     
     def parseExpression(self): 
-        if self.match("let"):
+        if self.match(LET):
             return self.parseAssignmentExpression()
 
         return self.parseConditionalExpression()    
 
 
 
-    # AssignmentExpression -> Identifier = Expression
+    # AssignmentExpression -> PostfixExpression = Expression
+    # (any PostfixExpression except a function call)
 
     def parseAssignmentExpression(self):
         line = self.getLineNumber()
 
-        identifier = self.parseIdentifier()
-        if identifier == None:
+        target = self.parsePostfixExpression(True)
+        if target == None:
             self.error("Assignment expression invalid left operator",line)
             return None
         
-        if not self.match("="):
+        if not self.match(ASSIGN):
             self.error("Assignment expression missing '='",line)
             return None
         
@@ -664,180 +802,71 @@ class Parser:
             self.error("Assignment expression invalid right operator",line)
             return None
         
-        return Node("assingmentExpression",\
-                    ["identifier.lit","expression.node"],\
-                    [identifier,expr])
+        return self.nodes.AssignmentExpression(target, expr, line)
 
 
-    # ConditionalExpression -> LogicalOrExpression
+    # ConditionalExpression -> BinaryExpression
 
     def parseConditionalExpression(self):
-        logicalOrExpr = self.parseLogicalOrExpression()
-        if logicalOrExpr == None:
-            return None
-        
-        return Node("conditionalExpression",\
-                    ["body.node"],\
-                    [logicalOrExpr])
-
-    # LogicalOrExpression -> LogicalAndExpression
-    #            | LogicalAndExpression || LogicalOrExpression
-
-    def parseLogicalOrExpression(self):
-        logicalAndExpr = self.parseLogicalAndExpression()
-        if logicalAndExpr == None:
-            return None
-        
-        if self.match("||"):
-            operator = "||"
-        else:
-            return logicalAndExpr
-
-
-        logicalOrExpr = self.parseLogicalOrExpression()
-        if logicalOrExpr == None:
-            return None
-
-
-        return Node("binaryExpression",\
-                    ["leftOP.node","operator.lit","rightOP.node"],\
-                    [logicalAndExpr,operator,logicalOrExpr])
-        
-
-
-    # LogicalAndExpression -> EqualityExpression
-    #         | EqualityExpression && LogicalAndExpression
-    
-    def parseLogicalAndExpression(self):
-        equalityExpr = self.parseEqualityExpression()
-        if equalityExpr == None:
-            return None
-        
-        operator = None
-        if self.match("&&"):
-            operator == "&&"
-        else:
-            return equalityExpr
-
-
-        logicalAndExpr = self.parseLogicalAndExpression()
-        if logicalAndExpr == None:
+        line = self.getLineNumber()
+        binaryExpr = self.parseBinaryExpression()
+        if binaryExpr == None:
             return None
-
-        return Node("binaryExpression",\
-                    ["leftOP.node","operator.lit","rightOP.node"],\
-                    [equalityExpr,operator,logicalAndExpr])
-
         
-    # EqualityExpression -> RelationalExpression
-    #       | RelationalExpression == EqualityExpression
-    #       | RelationalExpression != EqualityExpression
+        return self.nodes.ConditionalExpression(binaryExpr, line)
 
-    def parseEqualityExpression(self):
-        relationalExpr = self.parseRelationalExpression()
-        if relationalExpr == None:
-            None
 
-        if self.match("=="):
-            operator = "=="
-        elif self.match("!="):
-            operator = "!="
-        else:
-            return relationalExpr
+    # BinaryExpression -> UnaryExpression
+    #         | BinaryExpression BinaryOperator UnaryExpression
+    #
+    # with the precedence levels of Parser.binaryOperators, from || (lowest)
+    # through &&, == !=, < > <= >=, + - up to * / % (highest); every level is
+    # left-associative. Operands and pending operators are kept on explicit
+    # stacks, so a long operator chain does not grow the Python stack.
 
-        equalityExpr = self.parseEqualityExpression()
-        if equalityExpr == None:
+    def parseBinaryExpression(self):
+        line = self.getLineNumber()
+        unaryExpr = self.parseUnaryExpression()
+        if unaryExpr == None:
             return None
 
-        return Node("binaryExpression",\
-                    ["leftOP.node","operator.lit","rightOP.node"],\
-                    [relationalExpr,operator,equalityExpr])
-    
-    
-    # RelationalExpression -> AdditiveExpression
-    #             | AdditiveExpression < RelationalExpression
-    #             | AdditiveExpression > RelationalExpression
-    #             | AdditiveExpression <= RelationalExpression
-    #             | AdditiveExpression >= RelationalExpression
-        
-    def parseRelationalExpression(self):
-        additiveExpr = self.parseAdditiveExpression()
-        if additiveExpr == None:
-            return None
-
-        if self.match("<"):
-            operator = "<"
-        elif self.match(">"):
-            operator = ">"
-        elif self.match("<="):
-            operator = "<="
-        elif self.match(">="):
-            operator = ">="
-        else:
-            return additiveExpr
-
-        relationalExpr = self.parseRelationalExpression()
-        if relationalExpr == None:
-            return None
+        operator = Parser.binaryOperators.get(self.kind)
+        if operator == None:
+            return unaryExpr
 
-        return Node("binaryExpression",\
-                    ["leftOP.node","operator.lit","rightOP.node"],\
-                    [additiveExpr,operator,relationalExpr])
+        # operands are (node, line of its first token), operators are
+        # (text, precedence)
+        operands = [(unaryExpr, line)]
+        operators = []
 
-    
-    # AdditiveExpression -> MultiplicativeExpression
-    #           | MultiplicativeExpression + AdditiveExpression
-    #           | MultiplicativeExpression - AdditiveExpression
+        while operator != None:
+            text, precedence = operator
+            self.advance()
 
-    def parseAdditiveExpression(self):
-        multiplicativeExpr = self.parseMultiplicativeExpression()
-        if multiplicativeExpr == None:
-            return None
+            while operators and operators[-1][1] >= precedence:
+                self.reduceBinaryExpression(operands, operators.pop()[0])
+            operators.append(operator)
 
-        if self.match("+"):
-            operator = "+"
-        elif self.match("-"):
-            operator = "-"
-        else:
-            return multiplicativeExpr
-        
-        additiveExpr = self.parseAdditiveExpression()
-        if additiveExpr == None:
-            return None
-        
-        return Node("binaryExpression",\
-                    ["leftOP.node","operator.lit","rightOP.node"],\
-                    [multiplicativeExpr,operator,additiveExpr])
-        
+            line = self.getLineNumber()
+            unaryExpr = self.parseUnaryExpression()
+            if unaryExpr == None:
+                return None
+            operands.append((unaryExpr, line))
 
+            operator = Parser.binaryOperators.get(self.kind)
 
+        while operators:
+            self.reduceBinaryExpression(operands, operators.pop()[0])
 
-    # MultiplicativeExpression -> UnaryExpression
-    #               | UnaryExpression * MultiplicativeExpression
-    #               | UnaryExpression / MultiplicativeExpression
-    #               | UnaryExpression % MultiplicativeExpression
+        return operands[0][0]
 
-    def parseMultiplicativeExpression(self):
-        unaryExpr = self.parseUnaryExpression()
-        if unaryExpr == None:
-            return None
 
-        if self.match("*"):
-            operator = "*"
-        elif self.match("/"):
-            operator = "/"
-        elif self.match("%"):
-            operator = "%"
-        else:
-            return unaryExpr
-        
-        multiplicativeExpr = self.parseMultiplicativeExpression()
-        if multiplicativeExpr == None:
-            return None
-        
-        return Node("binaryExpression",\
-                    ["leftOP.node","operator.lit","rightOP.node"],\
-                    [unaryExpr,operator,multiplicativeExpr])
+    # Replaces the two topmost operands by their BinaryExpression, which
+    # starts on the left operand's line.
+    def reduceBinaryExpression(self, operands, operator):
+        rightOP = operands.pop()[0]
+        leftOP, line = operands[-1]
+        operands[-1] = (self.nodes.BinaryExpression(leftOP, operator, rightOP, line), line)
 
 
 
@@ -848,17 +877,9 @@ class Parser:
 #                      | Term
 
     def parseUnaryExpression(self):
-        if self.match("-"):
-            operator = "-"
-        elif self.match("!"):
-            operator = "!"
-        elif self.match("&"):
-            operator = "&"
-        elif self.match("*"):
-            operator = "*"
-        else:
-            operator = None
-        
+        line = self.getLineNumber()
+        operator = self.matchOperator(Parser.unaryOperators)
+
         term = self.parseTerm()
         if term == None:
             return None
@@ -866,9 +887,7 @@ class Parser:
         if operator == None:
             return term
 
-        return Node("unaryExpression",\
-                    ["operator.lit","term.node"],\
-                    [operator,term])
+        return self.nodes.UnaryExpression(operator, term, line)
 
 
     #       Term -> EnclosedTerm
@@ -881,7 +900,7 @@ class Parser:
 
         if self.matchNum():
             return self.parseNumericLiteral()
-        elif token == "(":
+        elif token == LEFT_PAREN:
             return self.parseEnclosedTerm()   
         else:
             return self.parsePostfixExpression()
@@ -897,16 +916,16 @@ class Parser:
     def parseEnclosedTerm(self):
         line = self.getLineNumber()
 
-        if not self.match("("):
+        if not self.match(LEFT_PAREN):
             self.error("Expression missing '('",line)
             return None
         
         conditionalExpr= self.parseConditionalExpression()
         if conditionalExpr == None:
-            self.error("Invalid expression inside ( )",line,False)
+            self.error("Invalid expression inside ( )",line)
             return None
         
-        if not self.match(")"):
+        if not self.match(RIGHT_PAREN):
             self.error("Expression missing ')'",line)
             return None
         
@@ -920,7 +939,7 @@ class Parser:
     #             | Identifier . Identifier
     #             | Identifier ( ArgumentList )
 
-    def parsePostfixExpression(self):
+    def parsePostfixExpression(self, isAssignmentTarget = False):
         line = self.getLineNumber()
 
         identifier = self.parseIdentifier()
@@ -929,41 +948,43 @@ class Parser:
             return None
 
         field = None
-        fieldAttribue = "field.lit"
 
-        if self.match("["):
-            field = self.conditionalExpression()
+        if self.match(LEFT_BRACKET):
+            field = self.parseConditionalExpression()
             if field == None:
                 self.error("Invalid expression inside [ ]",line)
                 return None
-            if not self.match("]"):
+            if not self.match(RIGHT_BRACKET):
                 self.error("Expression missing ']'",line)
                 return None
             operator = "[]"        
-            fieldAttribue = "field.node"    
 
-        elif self.match("->"):
+        elif self.match(ARROW):
             field = self.parseIdentifier()
             if field == None:
                 self.error("Invalid field specified after '->' operator ",line)
                 return None
             operator = "->"
        
-        elif self.match("."):
+        elif self.match(DOT):
             field = self.parseIdentifier()
             if field == None:
                 self.error("Invalid field specified after '.' operator",line)
                 return None
             operator = "."
 
-        elif self.match("("):
+        elif isAssignmentTarget and self.kind == LEFT_PAREN:
+            self.error("Cannot assign to a function call",line)
+            return None
+
+        elif self.match(LEFT_PAREN):
             argCnt = 0
             argumentsList = []
 
-            while not self.match(")"):
+            while not self.match(RIGHT_PAREN):
                 if argCnt > 0:
-                    if not self.match(","):
-                        self.error("Function call argument list missing ',",line)
+                    if not self.match(COMMA):
+                        self.error("Function call argument list missing ','",line)
                         return None
                 
                 argument = self.parseArgument()
@@ -975,15 +996,12 @@ class Parser:
 
             field = argumentsList
             operator = "()"
-            fieldAttribue = "field.list"
 
         else:
             operator = None
             field = None
         
-        return Node("postfixExpression",\
-                    ["identifier.lit","operator.lit",fieldAttribue],\
-                    [identifier,operator,field])
+        return self.nodes.PostfixExpression(identifier, operator, field, line)
             
 
         
@@ -997,3 +1015,52 @@ class Parser:
 
 
 
+# Rules are named rather than held as functions and are looked up on the
+# parser object, so a Profiler's per-object wrappers see these calls too.
+Parser.declarationRules = {
+    FUNC: "parseFunctionDeclaration",
+    STRUCT: "parseStructDeclaration",
+    VAR: "parseVariableDeclarationStatement",
+}
+
+# tokens panic mode recovery resumes at, between declarations and between
+# the statements of a block
+Parser.declarationSyncKinds = (FUNC, STRUCT, VAR)
+Parser.statementSyncKinds = (IF, WHILE, FOR, RETURN, VAR, LET)
+
+Parser.statementRules = {
+    IF: "parseIfStatement",
+    WHILE: "parseWhileStatement",
+    FOR: "parseForStatement",
+    RETURN: "parseReturnStatement",
+    VAR: "parseVariableDeclarationStatement",
+}
+
+
+
+class LazyBody:
+    # The unparsed body of a function: tokens first ('{') to last ('}') of
+    # a TokenStore. passes are run on the function once the body is parsed.
+    __slots__ = ("tokens", "first", "last", "source", "passes")
+
+    def __init__(self, tokens, first, last, source):
+        self.tokens = tokens
+        self.first = first
+        self.last = last
+        self.source = source
+        self.passes = []
+
+
+    # Parses the body. A syntax error found now cannot be returned to
+    # whoever parsed the file, so it raises DiagnosticError instead.
+    def parse(self):
+        tokens = self.tokens
+        endOfFile = (EOF, TOKEN_TEXT[EOF], tokens.starts[self.last + 1], tokens.lines[self.last + 1])
+
+        parser = Parser()
+        parser.setTokens(chain(tokens.iterRange(self.first, self.last + 1), [endOfFile]), None, self.source)
+        statements = parser.parseCompountStatement()
+
+        if parser.diagnostics:
+            raise DiagnosticError(parser.diagnostics)
+        return statements
@@ -0,0 +1,153 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Profiler:
+    # Instrumentation for the front end and the passes after it. Work is
+    # timed in named phases ("lex", "parse", ...) that add up over every
+    # file: wall and CPU time, number of runs, counts such as tokens or
+    # nodes, and with traceMemory the peak of memory allocated by Python
+    # (tracemalloc) while the phase ran. Phases may nest.
+    #
+    # instrumentParser wraps a parser's parse* methods to count the calls
+    # of every grammar rule and time them, both inclusive ("total", outer
+    # calls only when a rule recurses) and without the rules it called
+    # ("self").
+    #
+    # Listeners attached with addListener are called on:
+    #   phaseStart(name)
+    #   phaseEnd(name, wall, cpu)
+    #   rule(name, elapsed)      after every instrumented rule call
+    #
+    # getReport returns everything as a dict, writeReport as JSON.
+
+    events = ("phaseStart", "phaseEnd", "rule")
+
+    def __init__(self, traceMemory = False):
+        self.traceMemory = traceMemory
+        self.phases = {}    # name -> {"runs", "wall", "cpu", "peakMemory", counts}
+        self.rules = {}     # name -> [calls, total, self]
+        self.listeners = {event: [] for event in Profiler.events}
+        self.memoryPeaks = []    # peak so far of every running phase
+
+        if traceMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+#------------- PUBLIC SECTION -------------------------------
+    def addListener(self, event, listener):
+        if event not in self.listeners:
+            raise ValueError("Unknown profiler event '" + event + "', expected one of " + ", ".join(Profiler.events))
+        self.listeners[event].append(listener)
+
+
+    def removeListener(self, event, listener):
+        self.listeners[event].remove(listener)
+
+
+    @contextmanager
+    def phase(self, name):
+        record = self._getPhase(name)
+        for listener in self.listeners["phaseStart"]:
+            listener(name)
+        if self.traceMemory:
+            self._startMemoryPeak()
+
+        wallStart = time.perf_counter()
+        cpuStart = time.process_time()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - wallStart
+            cpu = time.process_time() - cpuStart
+            record["runs"] += 1
+            record["wall"] += wall
+            record["cpu"] += cpu
+            if self.traceMemory:
+                record["peakMemory"] = max(record["peakMemory"] or 0, self._endMemoryPeak())
+
+            for listener in self.listeners["phaseEnd"]:
+                listener(name, wall, cpu)
+
+
+    # Adds value to a count kept with the phase, e.g. ("lex", "tokens")
+    def addCount(self, phase, name, value = 1):
+        record = self._getPhase(phase)
+        record[name] = record.get(name, 0) + value
+
+
+    # Times the grammar rules of this parser object from now on; other
+    # parsers are not affected.
+    def instrumentParser(self, parser):
+        active = {}    # rule name -> number of calls in progress
+        childTimes = []    # per call in progress, time spent in the rules it called
+        clock = time.perf_counter
+        ruleListeners = self.listeners["rule"]
+
+        def makeWrapper(name, method):
+            stats = self.rules.setdefault(name, [0, 0.0, 0.0])
+
+            def rule(*args, **keywords):
+                stats[0] += 1
+                active[name] = active.get(name, 0) + 1
+                childTimes.append(0.0)
+                start = clock()
+                try:
+                    return method(*args, **keywords)
+                finally:
+                    elapsed = clock() - start
+                    stats[2] += elapsed - childTimes.pop()
+                    if childTimes:
+                        childTimes[-1] += elapsed
+                    active[name] -= 1
+                    if active[name] == 0:
+                        stats[1] += elapsed
+                    for listener in ruleListeners:
+                        listener(name, elapsed)
+
+            return rule
+
+        for name in dir(parser.__class__):
+            if name.startswith("parse") and callable(getattr(parser.__class__, name)):
+                setattr(parser, name, makeWrapper(name, getattr(parser, name)))
+        return parser
+
+
+    def getReport(self):
+        # rules that were called, the most expensive first
+        rules = {name: {"calls": calls, "total": total, "self": selfTime}
+                 for name, (calls, total, selfTime) in sorted(self.rules.items(), key = lambda item: -item[1][2])
+                 if calls}
+        return {"phases": self.phases, "rules": rules}
+
+
+    def writeReport(self, stream):
+        json.dump(self.getReport(), stream, indent = 2)
+        stream.write("\n")
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def _getPhase(self, name):
+        record = self.phases.get(name)
+        if record == None:
+            record = {"runs": 0, "wall": 0.0, "cpu": 0.0, "peakMemory": None}
+            self.phases[name] = record
+        return record
+
+
+    # tracemalloc has one peak; a phase starting inside another folds the
+    # peak so far into the outer one before resetting it.
+    def _startMemoryPeak(self):
+        if self.memoryPeaks:
+            self.memoryPeaks[-1] = max(self.memoryPeaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self.memoryPeaks.append(0)
+
+
+    def _endMemoryPeak(self):
+        peak = max(self.memoryPeaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self.memoryPeaks:
+            self.memoryPeaks[-1] = max(self.memoryPeaks[-1], peak)
+        return peak
@@ -0,0 +1,357 @@
+from nodeFile import *
+from diagnosticFile import DiagnosticError
+
+
+builtinNames = ["print"]
+
+
+class Binding:
+    # What a variable name resolves to: its slot in the frame (or in the
+    # globals list), its declared type, used to look up struct members, and
+    # the VariableDeclaration or Parameter that declares it.
+    __slots__ = ("slot", "isGlobal", "type", "declaration")
+
+    def __init__(self, slot, isGlobal, type, declaration):
+        self.slot = slot
+        self.isGlobal = isGlobal
+        self.type = type
+        self.declaration = declaration
+
+
+
+class Resolver:
+    # Name resolution pass run between the Parser and the executors. Every
+    # parameter and local gets a slot in its function's frame, every global
+    # a slot in the globals list and every "." / "->" access the position
+    # of the member in its struct; the results are stored on the nodes
+    # (slot, isGlobal, memberSlot, frameSize, globalCount), along with the
+    # node each name refers to (declaration, memberDeclaration). Scopes are
+    # lexical: a 'var' is visible from its declaration to the end of the
+    # enclosing block, and a block's slots are reused once it ends. All
+    # errors are collected and reported together, like the Parser's.
+
+    def __init__(self):
+        self.expressionRules = {
+            ConditionalExpression: self.resolveConditionalExpression,
+            BinaryExpression: self.resolveBinaryExpression,
+            UnaryExpression: self.resolveUnaryExpression,
+            NumericLiteral: self.resolveNumericLiteral,
+            PostfixExpression: self.resolvePostfixExpression,
+            AssignmentExpression: self.resolveAssignmentExpression,
+        }
+
+        self.statementRules = {
+            IfStatement: self.resolveIfStatement,
+            WhileStatement: self.resolveWhileStatement,
+            ForStatement: self.resolveForStatement,
+            ReturnStatement: self.resolveReturnStatement,
+            VariableDeclaration: self.resolveVariableDeclaration,
+        }
+        for nodeClass in self.expressionRules:
+            self.statementRules[nodeClass] = self.resolveExpression
+
+
+#------------- PUBLIC SECTION -------------------------------
+    # Annotates a Program node in place. Returns the program, or None if any
+    # name could not be resolved; the errors are printed unless printErrors
+    # is False, and are left in self.errorList either way.
+    def resolveProgram(self, program, printErrors = True):
+        self.errorList = []
+        self.functions = {}
+        self.structLayouts = {}
+        self.structs = {}
+        self.globalScope = {}
+        self.scopes = []
+        self.nextSlot = 0
+        self.frameSize = 0
+
+        declarations = program.declarations
+
+        # structs are hoisted like functions, so a member may name a struct
+        # declared further down
+        for decl in declarations:
+            if decl.__class__ == StructDeclaration:
+                self.declareStruct(decl)
+            elif decl.__class__ == FunctionDeclaration:
+                if decl.identifier in self.functions:
+                    self.error("Function '" + decl.identifier + "' is already declared", decl.line)
+                self.functions[decl.identifier] = decl
+
+        for decl in declarations:
+            if decl.__class__ == StructDeclaration:
+                for member in decl.memberList:
+                    self.checkType(member.type)
+
+        finished = set()
+        for decl in declarations:
+            if decl.__class__ == StructDeclaration:
+                self.checkContainment(decl, set(), finished)
+
+        for decl in declarations:
+            if decl.__class__ == VariableDeclaration:
+                self.checkType(decl.type)
+                if decl.identifier in self.globalScope:
+                    self.error("'" + decl.identifier + "' is already declared", decl.line)
+                decl.slot = len(self.globalScope)
+                decl.isGlobal = True
+                self.globalScope[decl.identifier] = Binding(decl.slot, True, decl.type, decl)
+
+        program.globalCount = len(self.globalScope)
+
+        for decl in declarations:
+            if decl.__class__ == VariableDeclaration:
+                if decl.expression != None:
+                    self.resolveExpression(decl.expression)
+            elif decl.__class__ == StructDeclaration:
+                for member in decl.memberList:
+                    if member.expression != None:
+                        self.resolveExpression(member.expression)
+            elif decl.isBodyLoaded():
+                self.resolveFunction(decl)
+            else:
+                decl.whenBodyLoaded(self.resolveLazyFunction)
+
+        if self.errorList:
+            if printErrors:
+                self.showErrors()
+            return None
+        return program
+
+
+    def showErrors(self):
+        print("AN ERROR HAS OCCURED")
+        for error in self.errorList:
+            print(error)
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def error(self, message, line):
+        self.errorList.append("Line " + str(line) + " : " + message)
+
+
+    def declareStruct(self, decl):
+        if decl.identifier in self.structLayouts:
+            self.error("Struct '" + decl.identifier + "' is already declared", decl.line)
+
+        layout = {}
+        for member in decl.memberList:
+            if member.identifier in layout:
+                self.error("Struct '" + decl.identifier + "' has two members named '" +
+                           member.identifier + "'", member.line)
+            layout[member.identifier] = len(layout)
+        self.structLayouts[decl.identifier] = layout
+        self.structs[decl.identifier] = decl
+
+
+    # A struct must not hold a value of its own type, directly or through
+    # the struct members of its members, or making one would never end;
+    # pointers and arrays break the chain. visiting holds the structs on
+    # the current chain, finished those already found to be sound.
+    def checkContainment(self, decl, visiting, finished):
+        if decl in finished:
+            return
+        if decl in visiting:
+            self.error("Struct '" + decl.identifier + "' contains itself", decl.line)
+            return
+
+        visiting.add(decl)
+        for member in decl.memberList:
+            memberType = member.type
+            if memberType.type == "struct" and not memberType.indirection and not member.isArray and \
+               memberType.declaration != None:
+                self.checkContainment(memberType.declaration, visiting, finished)
+        visiting.discard(decl)
+        finished.add(decl)
+
+
+    def checkType(self, typeSpecifier):
+        if typeSpecifier.type != "struct":
+            return
+        typeSpecifier.declaration = self.structs.get(typeSpecifier.identifier)
+        if typeSpecifier.declaration == None:
+            self.error("Unknown struct '" + typeSpecifier.identifier + "'", typeSpecifier.line)
+
+
+    def lookup(self, identifier):
+        for scope in reversed(self.scopes):
+            binding = scope.get(identifier)
+            if binding != None:
+                return binding
+        return self.globalScope.get(identifier)
+
+
+    def declareLocal(self, declaration):
+        identifier = declaration.identifier
+        scope = self.scopes[-1]
+        if identifier in scope:
+            self.error("'" + identifier + "' is already declared in this scope", declaration.line)
+
+        slot = self.nextSlot
+        self.nextSlot += 1
+        if self.nextSlot > self.frameSize:
+            self.frameSize = self.nextSlot
+
+        scope[identifier] = Binding(slot, False, declaration.type, declaration)
+        return slot
+
+
+    def resolveBlock(self, statements):
+        if statements == None:
+            return
+
+        savedSlot = self.nextSlot
+        self.scopes.append({})
+        for statement in statements:
+            self.statementRules[statement.__class__](statement)
+        self.scopes.pop()
+        self.nextSlot = savedSlot
+
+
+    def resolveFunction(self, decl):
+        self.checkType(decl.type)
+        self.scopes = [{}]
+        self.nextSlot = 0
+        self.frameSize = 0
+
+        for param in decl.parameterList:
+            self.checkType(param.type)
+            param.slot = self.declareLocal(param)
+
+        self.resolveBlock(decl.body)
+        decl.frameSize = self.frameSize
+        self.scopes = []
+
+
+    # A function whose body is parsed lazily is resolved once it is, after
+    # resolveProgram has returned; nobody is left to return its errors to,
+    # so they raise DiagnosticError.
+    def resolveLazyFunction(self, decl):
+        self.errorList = []
+        self.resolveFunction(decl)
+        if self.errorList:
+            raise DiagnosticError(self.errorList)
+
+
+#--------------- STATEMENTS ---------------------------------
+    def resolveVariableDeclaration(self, node):
+        self.checkType(node.type)
+
+        # the initializer is resolved first, so 'var int x = x;' reads an
+        # outer x
+        if node.expression != None:
+            self.resolveExpression(node.expression)
+
+        node.slot = self.declareLocal(node)
+        node.isGlobal = False
+
+
+    def resolveIfStatement(self, node):
+        self.resolveExpression(node.condition)
+        self.resolveBlock(node.body)
+        self.resolveBlock(node.elseBody)
+
+
+    def resolveWhileStatement(self, node):
+        self.resolveExpression(node.condition)
+        self.resolveBlock(node.body)
+
+
+    def resolveForStatement(self, node):
+        # the initializer's variable is scoped to the for statement
+        savedSlot = self.nextSlot
+        self.scopes.append({})
+
+        if node.forInitializer != None:
+            self.resolveVariableDeclaration(node.forInitializer)
+        self.resolveExpression(node.condition)
+        self.resolveExpression(node.forUpdater)
+        self.resolveBlock(node.body)
+
+        self.scopes.pop()
+        self.nextSlot = savedSlot
+
+
+    def resolveReturnStatement(self, node):
+        if node.returnValue != None:
+            self.resolveExpression(node.returnValue)
+
+
+#--------------- EXPRESSIONS --------------------------------
+    def resolveExpression(self, node):
+        self.expressionRules[node.__class__](node)
+
+
+    def resolveConditionalExpression(self, node):
+        self.resolveExpression(node.body)
+
+
+    def resolveBinaryExpression(self, node):
+        self.resolveExpression(node.leftOP)
+        self.resolveExpression(node.rightOP)
+
+
+    def resolveUnaryExpression(self, node):
+        term = node.term
+        if node.operator == "&" and (term.__class__ != PostfixExpression or term.operator == "()"):
+            self.error("Cannot take the address of this expression", node.line)
+        self.resolveExpression(term)
+
+
+    def resolveNumericLiteral(self, node):
+        pass
+
+
+    def resolveAssignmentExpression(self, node):
+        self.resolveExpression(node.expression)
+        self.resolveExpression(node.target)
+
+
+    def resolvePostfixExpression(self, node):
+        operator = node.operator
+
+        if operator == "()":
+            self.resolveCall(node)
+            return
+
+        binding = self.lookup(node.identifier)
+        if binding == None:
+            self.error("Undeclared variable '" + node.identifier + "'", node.line)
+            if operator == "[]":
+                self.resolveExpression(node.field)
+            return
+
+        node.slot = binding.slot
+        node.isGlobal = binding.isGlobal
+        node.declaration = binding.declaration
+
+        if operator == "[]":
+            self.resolveExpression(node.field)
+        elif operator != None:
+            node.memberSlot = self.findMember(binding.type, node)
+
+
+    def findMember(self, typeSpecifier, node):
+        layout = None
+        if typeSpecifier.type == "struct":
+            layout = self.structLayouts.get(typeSpecifier.identifier)
+
+        if layout == None or node.field not in layout:
+            self.error("'" + node.identifier + "' has no member '" + node.field + "'", node.line)
+            return None
+        slot = layout[node.field]
+        node.memberDeclaration = self.structs[typeSpecifier.identifier].memberList[slot]
+        return slot
+
+
+    def resolveCall(self, node):
+        for argument in node.field:
+            self.resolveExpression(argument)
+
+        function = self.functions.get(node.identifier)
+        node.declaration = function
+        if function != None:
+            if len(function.parameterList) != len(node.field):
+                self.error("Function '" + node.identifier + "' takes " +
+                           str(len(function.parameterList)) + " arguments", node.line)
+        elif node.identifier not in builtinNames:
+            self.error("Call to undeclared function '" + node.identifier + "'", node.line)
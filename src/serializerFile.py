@@ -0,0 +1,267 @@
+import mmap
+import struct
+import sys
+from array import array
+from arenaFile import AstArena
+
+
+# Encoding of the items of a literal tuple; strings are their index in the
+# string pool, so the other values are negative.
+NONE_ITEM = -1
+FALSE_ITEM = -2
+TRUE_ITEM = -3
+
+unsignedTypecodes = ("B", "H", "I", "Q")
+signedTypecodes = ("b", "h", "i", "q")
+
+
+# The narrowest of typecodes whose items hold every value up to largest,
+# and -3 too for a signed typecode.
+def narrowestTypecode(typecodes, largest):
+    for typecode in typecodes:
+        bits = 8 * array(typecode).itemsize - (typecode in signedTypecodes)
+        if largest < 1 << bits:
+            return typecode
+    raise OverflowError("value " + str(largest) + " does not fit in 64 bits")
+
+
+# (column name, typecode) of the file's arrays, in file order, for the
+# counts in its header. Every column is as narrow as its largest possible
+# value allows: a row index is below the row count, a literal index below
+# the tuple count and so on; child links and tuple items are signed for
+# -1 and the *_ITEM values. The arrays are ordered widest first, so each
+# one starts aligned to its item size.
+def getColumnLayout(rowCount, tupleCount, itemCount, stringCount, stringSize, largestLine):
+    columns = [
+        ("lines", narrowestTypecode(unsignedTypecodes, largestLine)),
+        ("firstChildren", narrowestTypecode(signedTypecodes, rowCount)),
+        ("nextSiblings", narrowestTypecode(signedTypecodes, rowCount)),
+        ("literals", narrowestTypecode(unsignedTypecodes, tupleCount)),
+        ("tupleStarts", narrowestTypecode(unsignedTypecodes, itemCount)),
+        ("tupleItems", narrowestTypecode(signedTypecodes, stringCount)),
+        ("stringOffsets", narrowestTypecode(unsignedTypecodes, stringSize)),
+        ("kinds", "B"),
+    ]
+    columns.sort(key = lambda column: -array(column[1]).itemsize)
+    return columns
+
+
+
+class AstSerializer:
+    # Writes an AST to a compact binary file that MappedArena reads back
+    # without parsing or unpickling anything. The file is the arena's rows
+    # plus its literal pool split into arrays:
+    #
+    #   header        magic, format version, byte order, then the number of
+    #                 rows, literal tuples, tuple items and strings, the
+    #                 byte size of the string data and the largest line
+    #   lines         per row
+    #   firstChildren per row, -1 for none
+    #   nextSiblings  per row, -1 for none
+    #   literals      per row, index of the row's literal tuple
+    #   tupleStarts   per tuple + 1, where each tuple's items start
+    #   tupleItems    per item, a string index or one of the *_ITEM values
+    #   stringOffsets per string + 1, where each string's bytes start
+    #   kinds         B per row
+    #   strings       the UTF-8 bytes of every distinct string
+    #
+    # Each array has the narrowest item size its header count allows (see
+    # getColumnLayout), which is also what sets their order in the file.
+    # Arrays are in the writer's byte order. The Program is the last row,
+    # as in any arena.
+
+    formatVersion = 2
+    magic = b"ASTB"
+    headerFormat = "<4sHH6Q"
+    byteOrders = ("little", "big")
+
+
+#------------- PUBLIC SECTION -------------------------------
+    # tree is an AstArena or the Program of a nodeFile tree.
+    def dumps(self, tree):
+        arena = tree
+        if not isinstance(tree, AstArena):
+            arena = AstArena()
+            arena.addNodes(tree)
+
+        tupleStarts, tupleItems, stringOffsets, strings = self._encodeLiterals(arena.literalPool)
+        counts = (len(arena.kinds), len(tupleStarts) - 1, len(tupleItems), len(stringOffsets) - 1, len(strings),
+                  max(arena.lines, default = 0))
+        header = struct.pack(AstSerializer.headerFormat, AstSerializer.magic, AstSerializer.formatVersion,
+                             AstSerializer.byteOrders.index(sys.byteorder), *counts)
+
+        columns = {"lines": arena.lines, "firstChildren": arena.firstChildren, "nextSiblings": arena.nextSiblings,
+                   "literals": arena.literals, "tupleStarts": tupleStarts, "tupleItems": tupleItems,
+                   "stringOffsets": stringOffsets, "kinds": arena.kinds}
+        arrays = []
+        for name, typecode in getColumnLayout(*counts):
+            column = columns[name]
+            if column.typecode != typecode:
+                column = array(typecode, column)
+            arrays.append(column.tobytes())
+        return b"".join([header] + arrays + [strings])
+
+
+    def write(self, tree, path):
+        with open(path, "wb") as file:
+            file.write(self.dumps(tree))
+
+
+    def load(self, path):
+        return MappedArena(path)
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def _encodeLiterals(self, literalPool):
+        tupleStarts = array("I", [0])
+        tupleItems = array("i")
+        stringIndexes = {}
+        stringOffsets = array("I", [0])
+        strings = bytearray()
+
+        for literals in literalPool:
+            for value in literals:
+                if value == None:
+                    tupleItems.append(NONE_ITEM)
+                elif value is True:
+                    tupleItems.append(TRUE_ITEM)
+                elif value is False:
+                    tupleItems.append(FALSE_ITEM)
+                else:
+                    index = stringIndexes.get(value)
+                    if index == None:
+                        index = len(stringIndexes)
+                        stringIndexes[value] = index
+                        strings += value.encode("utf-8")
+                        stringOffsets.append(len(strings))
+                    tupleItems.append(index)
+            tupleStarts.append(len(tupleItems))
+
+        return tupleStarts, tupleItems, stringOffsets, bytes(strings)
+
+
+
+class MappedArena(AstArena):
+    # A read-only AstArena over a file written by AstSerializer. The file is
+    # mapped and its columns are memoryviews into the mapping, so loading
+    # costs the same whatever the tree's size; rows are read from the page
+    # cache as they are visited. ArenaNode, SyntaxTree and makeNodes work on
+    # it as on any arena, but nothing can be added to it.
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.mapping = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        try:
+            self._mapColumns()
+        except (ValueError, TypeError, struct.error):
+            self.close()
+            raise
+
+
+#------------- PUBLIC SECTION -------------------------------
+    # Releases the mapping. Nodes of this arena must not be used after it.
+    def close(self):
+        for view in self.__dict__.pop("views", []):
+            view.release()
+        self.mapping.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+    def __getstate__(self):
+        raise TypeError("A mapped arena cannot be pickled, copy it with appendArena first")
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def _mapColumns(self):
+        headerSize = struct.calcsize(AstSerializer.headerFormat)
+        if len(self.mapping) < headerSize:
+            raise ValueError("Not an AST file")
+
+        magic, version, byteOrder, *counts = struct.unpack_from(AstSerializer.headerFormat, self.mapping)
+        if magic != AstSerializer.magic or version != AstSerializer.formatVersion:
+            raise ValueError("Not an AST file of format version %d" % AstSerializer.formatVersion)
+        if AstSerializer.byteOrders[byteOrder] != sys.byteorder:
+            raise ValueError("AST file was written on a " + AstSerializer.byteOrders[byteOrder] + "-endian machine")
+        rowCount, tupleCount, itemCount, stringCount, stringSize, largestLine = counts
+        lengths = {"lines": rowCount, "firstChildren": rowCount, "nextSiblings": rowCount, "literals": rowCount,
+                   "tupleStarts": tupleCount + 1, "tupleItems": itemCount, "stringOffsets": stringCount + 1,
+                   "kinds": rowCount}
+
+        whole = memoryview(self.mapping)
+        self.views = [whole]
+        position = headerSize
+
+        def take(typecode, count):
+            nonlocal position
+            end = position + count * array(typecode).itemsize
+            if end > len(self.mapping):
+                raise ValueError("AST file is truncated")
+            view = whole[position:end].cast(typecode)
+            self.views.append(view)
+            position = end
+            return view
+
+        columns = {name: take(typecode, lengths[name]) for name, typecode in getColumnLayout(*counts)}
+        strings = take("B", stringSize)
+
+        self.lines = columns["lines"]
+        self.firstChildren = columns["firstChildren"]
+        self.nextSiblings = columns["nextSiblings"]
+        self.literals = columns["literals"]
+        self.kinds = columns["kinds"]
+        tupleStarts = columns["tupleStarts"]
+        tupleItems = columns["tupleItems"]
+        stringOffsets = columns["stringOffsets"]
+
+        self.literalPool = MappedLiteralPool(tupleStarts, tupleItems, stringOffsets, strings)
+
+
+
+class MappedLiteralPool:
+    # The literal pool of a MappedArena. Tuples and strings are decoded the
+    # first time they are asked for and kept.
+
+    itemValues = {NONE_ITEM: None, FALSE_ITEM: False, TRUE_ITEM: True}
+
+    def __init__(self, tupleStarts, tupleItems, stringOffsets, strings):
+        self.tupleStarts = tupleStarts
+        self.tupleItems = tupleItems
+        self.stringOffsets = stringOffsets
+        self.strings = strings
+        self.tuples = {}
+        self.decodedStrings = {}
+
+
+    def __len__(self):
+        return len(self.tupleStarts) - 1
+
+
+    def __getitem__(self, index):
+        literals = self.tuples.get(index)
+        if literals == None:
+            if not 0 <= index < len(self):
+                raise IndexError("literal index out of range")
+            items = self.tupleItems[self.tupleStarts[index]:self.tupleStarts[index + 1]]
+            literals = tuple(self.getString(item) if item >= 0 else MappedLiteralPool.itemValues[item] for item in items)
+            self.tuples[index] = literals
+        return literals
+
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+
+    def getString(self, index):
+        string = self.decodedStrings.get(index)
+        if string == None:
+            string = str(self.strings[self.stringOffsets[index]:self.stringOffsets[index + 1]], "utf-8")
+            self.decodedStrings[index] = string
+        return string
@@ -0,0 +1,659 @@
+import itertools
+import json
+import sys
+import traceback
+from bisect import bisect_right
+from contextlib import redirect_stdout
+from urllib.parse import urlparse, unquote
+from constants import IDENTIFIER, EOF
+from diagnosticFile import columnOf
+from incrementalFile import IncrementalParser
+from resolverFile import Resolver
+from sourceTextFile import SourceText
+from visitorFile import walkNames
+from nodeFile import *
+
+
+# JSON-RPC and LSP error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+SERVER_NOT_INITIALIZED = -32002
+
+ERROR_SEVERITY = 1
+
+# LSP symbol kinds
+FIELD_SYMBOL = 8
+FUNCTION_SYMBOL = 12
+VARIABLE_SYMBOL = 13
+STRUCT_SYMBOL = 23
+
+declarationClasses = (VariableDeclaration, FunctionDeclaration, Parameter, StructDeclaration, Member)
+
+
+class RequestError(Exception):
+    # Ends a request with a JSON-RPC error response.
+
+    def __init__(self, code, message):
+        Exception.__init__(self, message)
+        self.code = code
+
+
+
+def formatType(typeSpecifier, isArray = False):
+    text = typeSpecifier.type
+    if typeSpecifier.identifier != None:
+        text += " " + typeSpecifier.identifier
+    if typeSpecifier.indirection:
+        text += " *"
+    if isArray:
+        text += " []"
+    return text
+
+
+
+# Length of the longest common prefix of a and b, or suffix if fromEnd,
+# known to be between low and high. The range is halved by comparing
+# slices rather than walking the characters one by one in Python.
+def getCommonLength(a, b, low, high, fromEnd):
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fromEnd:
+            same = a[len(a) - middle:len(a) - low] == b[len(b) - middle:len(b) - low]
+        else:
+            same = a[low:middle] == b[low:middle]
+        if same:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+
+class Document:
+    # One source text the server answers requests on, kept parsed by an
+    # IncrementalParser across changes. Everything derived from the text
+    # (LSP diagnostics, name resolution, the names of each region) is
+    # worked out when first asked for and kept until the next change.
+    #
+    # LSP positions count UTF-16 code units unless the client agreed on
+    # UTF-32, which are the characters of a str.
+
+    def __init__(self, uri, text, utf16):
+        self.uri = uri
+        self.utf16 = utf16
+        self.parser = IncrementalParser(text)
+        self.revision = 0
+        self.isOpen = False
+        self._clear()
+
+
+#------------- PUBLIC SECTION -------------------------------
+    def getText(self):
+        return self.parser.getText()
+
+
+    # Replaces the text. Only the span between the common prefix and the
+    # common suffix of the old and new text is edited, so just the
+    # declarations around it are reparsed.
+    def setText(self, text):
+        old = self.parser.getText()
+        if text == old:
+            return
+
+        prefix = getCommonLength(old, text, 0, min(len(old), len(text)), False)
+        suffix = getCommonLength(old, text, 0, min(len(old), len(text)) - prefix, True)
+        self.edit(prefix, len(old) - prefix - suffix, text[prefix:len(text) - suffix])
+
+
+    def edit(self, offset, deletedLength, insertedText):
+        self.parser.edit(offset, deletedLength, insertedText)
+        self._clear()
+
+
+    # Applies a textDocument/didChange content change, a range edit or the
+    # whole new text.
+    def applyChange(self, change):
+        if "range" not in change:
+            self.setText(change["text"])
+            return
+
+        start = self.getOffset(change["range"]["start"])
+        end = self.getOffset(change["range"]["end"])
+        self.edit(start, max(end - start, 0), change["text"])
+
+
+    # Offset in the text of an LSP position. A character past the end of
+    # its line is the end of the line, a line past the end of the text the
+    # end of the text.
+    def getOffset(self, position):
+        text = self.parser.getText()
+        try:
+            start = self._getSource().getLineStart(position["line"] + 1)
+        except IndexError:
+            return len(text)
+
+        end = text.find("\n", start)
+        if end == -1:
+            end = len(text)
+
+        character = position["character"]
+        line = text[start:end]
+        if self.utf16 and not line.isascii():
+            units = 0
+            for i in range(len(line)):
+                if units >= character:
+                    return start + i
+                units += 2 if ord(line[i]) > 0xFFFF else 1
+            return end
+        return min(start + character, end)
+
+
+    def getPosition(self, line, offset):
+        text = self.parser.getText()
+        start = offset - columnOf(text, offset) + 1
+        character = offset - start
+        if self.utf16 and not text[start:offset].isascii():
+            character = len(text[start:offset].encode("utf-16-le")) // 2
+        return {"line": line - 1, "character": character}
+
+
+    # LSP range of length characters at offset, on line
+    def getRange(self, line, offset, length):
+        return {"start": self.getPosition(line, offset), "end": self.getPosition(line, offset + length)}
+
+
+    # The lexer and parser diagnostics, as LSP diagnostics
+    def getDiagnostics(self):
+        if self.diagnostics == None:
+            self.diagnostics = [self._makeDiagnostic(diagnostic) for diagnostic in self.parser.getDiagnostics()]
+        return self.diagnostics
+
+
+    # A DocumentSymbol per top-level declaration, with struct members,
+    # parameters and local variables as children.
+    def getSymbols(self):
+        symbols = []
+        for region in self.parser.getRegions():
+            declaration = region.declaration
+            tokens = [token for token in region.tokens if token[0] != EOF]
+            if declaration == None or declaration.identifier == None or not tokens:
+                continue
+
+            names = self._getNames(region)
+            nameRange = self._findNameRange(region, declaration, names)
+            first = tokens[0]
+            last = tokens[-1]
+            symbol = self._makeSymbol(declaration, {
+                "start": self.getPosition(region.line + first[3], region.start + first[2]),
+                "end": self.getPosition(region.line + last[3], region.start + last[2] + len(last[1]))}, nameRange)
+
+            if names != None:
+                children = []
+                for node, field, index in names:
+                    if field == "identifier" and node is not declaration and node.__class__ in declarationClasses:
+                        children.append(self._makeSymbol(node, None, self._getTokenRange(region, index)))
+                symbol["children"] = children
+            symbols.append(symbol)
+        return symbols
+
+
+    # The Location of the declaration of the name at position, None if
+    # there is no name there or it does not resolve.
+    def getDefinition(self, position):
+        offset = self.getOffset(position)
+        regions = self.parser.getRegions()
+        if not regions:
+            return None
+
+        region = regions[self.parser.findRegion(offset)]
+        index = self._findToken(region, offset - region.start)
+        names = self._getNames(region)
+        if index == None or names == None:
+            return None
+
+        self._resolve()
+        node, field = next((node, field) for node, field, nameIndex in names if nameIndex == index)
+        if field == "field":
+            target = node.memberDeclaration
+        elif node.__class__ in declarationClasses:
+            target = node
+        else:
+            target = node.declaration
+        if target == None:
+            return None
+
+        nameRange = self._locate(target)
+        if nameRange == None:
+            return None
+        return {"uri": self.uri, "range": nameRange}
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def _clear(self):
+        self.source = None
+        self.diagnostics = None
+        self.resolved = False
+        self.names = {}
+
+
+    def _getSource(self):
+        if self.source == None:
+            self.source = SourceText(self.parser.getText())
+        return self.source
+
+
+    def _makeDiagnostic(self, diagnostic):
+        text = self.parser.getText()
+        line = diagnostic.line
+        try:
+            lineStart = self._getSource().getLineStart(line)
+        except IndexError:
+            lineStart = len(text)
+
+        offset = lineStart
+        length = 0
+        if diagnostic.column != None:
+            offset = min(lineStart + diagnostic.column - 1, len(text))
+            lineEnd = text.find("\n", offset)
+            if lineEnd == -1:
+                lineEnd = len(text)
+            if diagnostic.found != None:
+                length = min(len(diagnostic.found), lineEnd - offset)
+
+        result = {"range": self.getRange(line, offset, length), "severity": ERROR_SEVERITY,
+                  "source": "parser", "message": diagnostic.getMessage()}
+
+        related = []
+        for contextLine, message in diagnostic.context:
+            try:
+                contextStart = self._getSource().getLineStart(contextLine)
+            except IndexError:
+                continue
+            related.append({"location": {"uri": self.uri, "range": self.getRange(contextLine, contextStart, 0)},
+                            "message": message})
+        if related:
+            result["relatedInformation"] = related
+        return result
+
+
+    def _makeSymbol(self, node, symbolRange, nameRange):
+        nodeClass = node.__class__
+        if nodeClass == FunctionDeclaration:
+            kind = FUNCTION_SYMBOL
+            detail = formatType(node.type) + " (" + ", ".join(formatType(param.type, param.isArray)
+                                                               for param in node.parameterList) + ")"
+        elif nodeClass == StructDeclaration:
+            kind = STRUCT_SYMBOL
+            detail = "struct"
+        else:
+            kind = FIELD_SYMBOL if nodeClass == Member else VARIABLE_SYMBOL
+            detail = formatType(node.type, getattr(node, "isArray", False))
+
+        return {"name": node.identifier, "detail": detail, "kind": kind,
+                "range": symbolRange or nameRange, "selectionRange": nameRange or symbolRange}
+
+
+    # (node, field, token index) for every name in the region's declaration,
+    # from visitorFile.walkNames matched to the region's identifier tokens,
+    # or None if they do not match because the declaration has errors.
+    def _getNames(self, region):
+        if region in self.names:
+            return self.names[region]
+
+        names = None
+        if region.declaration != None:
+            names = []
+            tokens = region.tokens
+            index = 0
+            for node, field in walkNames(region.declaration):
+                while index < len(tokens) and tokens[index][0] != IDENTIFIER:
+                    index += 1
+                if index == len(tokens) or tokens[index][1] != getattr(node, field):
+                    names = None
+                    break
+                names.append((node, field, index))
+                index += 1
+
+            if names != None and any(token[0] == IDENTIFIER for token in tokens[index:]):
+                names = None
+
+        self.names[region] = names
+        return names
+
+
+    def _getTokenRange(self, region, index):
+        kind, text, offset, line = region.tokens[index]
+        return self.getRange(region.line + line, region.start + offset, len(text))
+
+
+    # Index of the identifier token at or just before offset (relative to
+    # the region), None if there is none.
+    def _findToken(self, region, offset):
+        tokens = region.tokens
+        index = bisect_right(tokens, offset, key = lambda token: token[2]) - 1
+        for i in (index, index - 1):
+            if i >= 0:
+                kind, text, start, line = tokens[i]
+                if kind == IDENTIFIER and start <= offset <= start + len(text):
+                    return i
+        return None
+
+
+    # Range of the name a declaration declares. Without the names of the
+    # region it is taken to be the first identifier token with that text.
+    def _findNameRange(self, region, declaration, names):
+        if names != None:
+            for node, field, index in names:
+                if node is declaration and field == "identifier":
+                    return self._getTokenRange(region, index)
+
+        for index in range(len(region.tokens)):
+            kind, text, offset, line = region.tokens[index]
+            if kind == IDENTIFIER and text == declaration.identifier:
+                return self._getTokenRange(region, index)
+        return None
+
+
+    # Range of the name a declaration node declares, looked up in the
+    # regions its line is in.
+    def _locate(self, declaration):
+        text = self.parser.getText()
+        try:
+            lineStart = self._getSource().getLineStart(declaration.line)
+        except IndexError:
+            return None
+        lineEnd = text.find("\n", lineStart)
+        if lineEnd == -1:
+            lineEnd = len(text)
+
+        regions = self.parser.getRegions()
+        for i in range(self.parser.findRegion(lineStart), len(regions)):
+            region = regions[i]
+            if region.start > lineEnd:
+                break
+            names = self._getNames(region)
+            if names == None:
+                if region.declaration is declaration:
+                    return self._findNameRange(region, declaration, None)
+                continue
+            for node, field, index in names:
+                if node is declaration and field == "identifier":
+                    return self._getTokenRange(region, index)
+        return None
+
+
+    # Links every name to its declaration. The resolver's errors are not
+    # wanted here, only the links.
+    def _resolve(self):
+        if self.resolved:
+            return
+        Resolver().resolveProgram(self.parser.getProgram(), False)
+        self.resolved = True
+
+
+
+class LanguageServer:
+    # A language server speaking JSON-RPC over a pair of byte streams, the
+    # Language Server Protocol's Content-Length framing, for editors and
+    # linters that would otherwise start a process per file. Documents stay
+    # parsed between requests: open ones are kept up to date from the
+    # client's changes, and a file asked about without being opened is kept
+    # too and read again on every request, being reparsed only if its text
+    # changed. Either way only the declarations around a change are
+    # reparsed.
+    #
+    # Requests: initialize, shutdown, textDocument/diagnostic,
+    # textDocument/documentSymbol and textDocument/definition.
+    # Notifications: initialized, exit and textDocument/didOpen, didChange,
+    # didSave and didClose. Diagnostics are published after every change
+    # unless the client pulls them with textDocument/diagnostic.
+
+    def __init__(self, input = None, output = None):
+        self.input = input if input != None else sys.stdin.buffer
+        self.output = output if output != None else sys.stdout.buffer
+        self.documents = {}
+        self.revisions = itertools.count(1)
+        self.utf16 = True
+        self.pushDiagnostics = True
+        self.initialized = False
+        self.shutdownRequested = False
+        self.running = False
+
+        self.requestRules = {
+            "initialize": self.initialize,
+            "shutdown": self.shutdown,
+            "textDocument/diagnostic": self.diagnostic,
+            "textDocument/documentSymbol": self.documentSymbol,
+            "textDocument/definition": self.definition,
+        }
+
+        self.notificationRules = {
+            "initialized": self.ignore,
+            "exit": self.exit,
+            "textDocument/didOpen": self.didOpen,
+            "textDocument/didChange": self.didChange,
+            "textDocument/didSave": self.ignore,
+            "textDocument/didClose": self.didClose,
+            "$/cancelRequest": self.ignore,
+            "$/setTrace": self.ignore,
+        }
+
+
+#------------- PUBLIC SECTION -------------------------------
+    # Answers messages until the exit notification or the end of the
+    # input. Returns the exit code: 0 if shutdown was requested first.
+    # Anything printed meanwhile goes to stderr, stdout may be the protocol.
+    def serve(self):
+        self.running = True
+        with redirect_stdout(sys.stderr):
+            while self.running:
+                message = self.readMessage()
+                if message == None:
+                    break
+                self.handleMessage(message)
+        return 0 if self.shutdownRequested else 1
+
+
+    # The next message, None at the end of the input. A body that is not
+    # JSON is answered with a parse error and skipped.
+    def readMessage(self):
+        while True:
+            length = None
+            while True:
+                header = self.input.readline()
+                if not header:
+                    return None
+                header = header.strip()
+                if not header:
+                    break
+                name, separator, value = header.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+
+            if length == None:
+                continue
+            body = self.input.read(length)
+            if len(body) < length:
+                return None
+
+            try:
+                return json.loads(body)
+            except ValueError as error:
+                self.sendError(None, PARSE_ERROR, str(error))
+
+
+    def writeMessage(self, message):
+        body = json.dumps(message, separators = (",", ":")).encode()
+        self.output.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        self.output.flush()
+
+
+    def sendError(self, id, code, message):
+        self.writeMessage({"jsonrpc": "2.0", "id": id, "error": {"code": code, "message": message}})
+
+
+    def handleMessage(self, message):
+        method = message.get("method")
+        params = message.get("params") or {}
+
+        if "id" not in message:
+            rule = self.notificationRules.get(method)
+            if rule != None and (self.initialized or method == "exit"):
+                try:
+                    rule(params)
+                except Exception:
+                    traceback.print_exc(file = sys.stderr)
+            return
+
+        id = message["id"]
+        try:
+            rule = self.requestRules.get(method)
+            if rule == None:
+                raise RequestError(METHOD_NOT_FOUND, "Unknown method " + str(method))
+            if not self.initialized and method != "initialize":
+                raise RequestError(SERVER_NOT_INITIALIZED, "The server is not initialized")
+            if self.shutdownRequested:
+                raise RequestError(INVALID_REQUEST, "The server is shutting down")
+            result = rule(params)
+        except RequestError as error:
+            self.sendError(id, error.code, str(error))
+            return
+        except Exception as error:
+            traceback.print_exc(file = sys.stderr)
+            self.sendError(id, INTERNAL_ERROR, type(error).__name__ + ": " + str(error))
+            return
+        self.writeMessage({"jsonrpc": "2.0", "id": id, "result": result})
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def ignore(self, params):
+        pass
+
+
+    # The document for uri: an open one, or the file it names as it is on
+    # disk now.
+    def getDocument(self, params):
+        try:
+            uri = params["textDocument"]["uri"]
+        except (KeyError, TypeError):
+            raise RequestError(INVALID_PARAMS, "Missing textDocument")
+
+        document = self.documents.get(uri)
+        if document != None and document.isOpen:
+            return document
+
+        parsed = urlparse(uri)
+        if parsed.scheme != "file":
+            raise RequestError(INVALID_PARAMS, "Unknown document " + uri)
+        path = unquote(parsed.path)
+        try:
+            with open(path, "r") as file:
+                text = file.read()
+        except OSError as error:
+            raise RequestError(INVALID_PARAMS, "Cannot read " + uri + ": " + error.strerror)
+
+        if document == None:
+            document = self.documents[uri] = Document(uri, text, self.utf16)
+            document.revision = next(self.revisions)
+        else:
+            self.setText(document, text)
+        return document
+
+
+    def setText(self, document, text):
+        if text != document.getText():
+            document.setText(text)
+            document.revision = next(self.revisions)
+
+
+    def publishDiagnostics(self, document):
+        if self.pushDiagnostics:
+            self.writeMessage({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics",
+                               "params": {"uri": document.uri, "diagnostics": document.getDiagnostics()}})
+
+
+#--------------- REQUESTS -----------------------------------
+    def initialize(self, params):
+        if self.initialized:
+            raise RequestError(INVALID_REQUEST, "The server is already initialized")
+        self.initialized = True
+
+        capabilities = params.get("capabilities") or {}
+        encodings = (capabilities.get("general") or {}).get("positionEncodings") or ()
+        self.utf16 = "utf-32" not in encodings
+        self.pushDiagnostics = "diagnostic" not in (capabilities.get("textDocument") or {})
+
+        return {
+            "capabilities": {
+                "positionEncoding": "utf-16" if self.utf16 else "utf-32",
+                "textDocumentSync": {"openClose": True, "change": 2, "save": False},
+                "documentSymbolProvider": True,
+                "definitionProvider": True,
+                "diagnosticProvider": {"interFileDependencies": False, "workspaceDiagnostics": False},
+            },
+            "serverInfo": {"name": "parser language server"},
+        }
+
+
+    def shutdown(self, params):
+        self.shutdownRequested = True
+        return None
+
+
+    # Pull diagnostics. The result id is the document's revision, so a
+    # client that already has the current ones gets "unchanged".
+    def diagnostic(self, params):
+        document = self.getDocument(params)
+        resultId = str(document.revision)
+        if params.get("previousResultId") == resultId:
+            return {"kind": "unchanged", "resultId": resultId}
+        return {"kind": "full", "resultId": resultId, "items": document.getDiagnostics()}
+
+
+    def documentSymbol(self, params):
+        return self.getDocument(params).getSymbols()
+
+
+    def definition(self, params):
+        if "position" not in params:
+            raise RequestError(INVALID_PARAMS, "Missing position")
+        return self.getDocument(params).getDefinition(params["position"])
+
+
+#--------------- NOTIFICATIONS ------------------------------
+    def exit(self, params):
+        self.running = False
+
+
+    def didOpen(self, params):
+        item = params["textDocument"]
+        document = self.documents.get(item["uri"])
+        if document == None:
+            document = self.documents[item["uri"]] = Document(item["uri"], item["text"], self.utf16)
+            document.revision = next(self.revisions)
+        else:
+            self.setText(document, item["text"])
+        document.isOpen = True
+        self.publishDiagnostics(document)
+
+
+    def didChange(self, params):
+        document = self.documents.get(params["textDocument"]["uri"])
+        if document == None or not document.isOpen:
+            return
+
+        for change in params["contentChanges"]:
+            document.applyChange(change)
+        document.revision = next(self.revisions)
+        self.publishDiagnostics(document)
+
+
+    # The document is forgotten, its diagnostics cleared.
+    def didClose(self, params):
+        uri = params["textDocument"]["uri"]
+        if self.documents.pop(uri, None) != None and self.pushDiagnostics:
+            self.writeMessage({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics",
+                               "params": {"uri": uri, "diagnostics": []}})
@@ -0,0 +1,128 @@
+import mmap
+from array import array
+from bisect import bisect_right
+
+
+class SourceText:
+    # A source text, either a str or a bytes-like object such as a mapped
+    # file, with an index to find lines in it. Lexer, tokens and
+    # diagnostics only keep offsets and line/column numbers; lines, columns
+    # and excerpts are worked out from the index when they are asked for.
+    #
+    # The index is sparse: the text is cut into chunks of about
+    # indexChunkSize that end on a newline, and only where each chunk starts
+    # and on which line is kept. Newlines inside a chunk are counted when
+    # needed. It is also lazy, built only as far into the text as the
+    # furthest position asked for, so reporting an error near the start of
+    # a giant file scans only that far. Columns count characters in a str
+    # and bytes in a bytes-like text.
+
+    indexChunkSize = 1 << 16
+
+    def __init__(self, text):
+        self.text = text
+        self.newline = "\n" if isinstance(text, str) else b"\n"
+        # the last entry is where the unindexed rest of the text starts
+        self.chunkStarts = array("q", [0])
+        self.chunkLines = array("q", [1])
+        self.mapping = None
+
+
+    # Maps the file at path instead of reading it, so nothing is copied or
+    # decoded up front.
+    @staticmethod
+    def open(path):
+        with open(path, "rb") as file:
+            if file.seek(0, 2) == 0:
+                return SourceText(b"")
+            mapping = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        source = SourceText(mapping)
+        source.mapping = mapping
+        return source
+
+
+#------------- PUBLIC SECTION -------------------------------
+    def close(self):
+        if self.mapping != None:
+            self.mapping.close()
+
+
+    def __len__(self):
+        return len(self.text)
+
+
+    def getLineCount(self):
+        self._indexTo(len(self.text))
+        return self.chunkLines[-1]
+
+
+    # (line, column) of an offset, both counting from 1
+    def getPosition(self, offset):
+        self._indexTo(offset)
+        chunk = self._getChunk(self.chunkStarts, offset)
+        start = self.chunkStarts[chunk]
+
+        text = self.text[start:offset]
+        line = self.chunkLines[chunk] + text.count(self.newline)
+        return line, len(text) - text.rfind(self.newline)
+
+
+    def getLineStart(self, line):
+        while self.chunkLines[-1] <= line and self.chunkStarts[-1] < len(self.text):
+            self._indexTo(self.chunkStarts[-1])
+
+        chunk = self._getChunk(self.chunkLines, line)
+        start = self.chunkStarts[chunk]
+        for i in range(line - self.chunkLines[chunk]):
+            start = self.text.find(self.newline, start) + 1
+            if start == 0:
+                raise IndexError("line %d is past the end of the source" % line)
+        return start
+
+
+    # The text of a line, without its newline
+    def getLine(self, line):
+        start = self.getLineStart(line)
+        end = self.text.find(self.newline, start)
+        return self.getSnippet(start, end if end != -1 else len(self.text))
+
+
+    def getSnippet(self, start, end):
+        snippet = self.text[start:end]
+        if snippet.__class__ != str:
+            snippet = str(snippet, "utf-8", "replace")
+        return snippet
+
+
+    # The line holding a diagnostic and a caret under its column
+    def getExcerpt(self, line, column):
+        text = self.getLine(line).replace("\t", " ")
+        return "    " + text + "\n    " + " " * (column - 1) + "^"
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    # The indexed chunk holding position, an offset or line looked up in
+    # chunkStarts or chunkLines. The last entry is no chunk: it is the end of
+    # the text there, which need not be a line start.
+    def _getChunk(self, entries, position):
+        return max(min(bisect_right(entries, position), len(entries) - 1) - 1, 0)
+
+
+    # Extends the index over the text up to offset, a chunk at a time.
+    def _indexTo(self, offset):
+        text = self.text
+        newline = self.newline
+        while self.chunkStarts[-1] <= offset and self.chunkStarts[-1] < len(text):
+            start = self.chunkStarts[-1]
+            end = min(start + SourceText.indexChunkSize, len(text))
+            if end < len(text):
+                # the chunk ends after its last newline, or after the
+                # first one past it on a very long line
+                last = text.rfind(newline, start, end)
+                if last == -1:
+                    last = text.find(newline, end)
+                end = last + 1 if last != -1 else len(text)
+
+            self.chunkStarts.append(end)
+            self.chunkLines.append(self.chunkLines[-1] + text[start:end].count(newline))
@@ -0,0 +1,344 @@
+import nodeFile
+from constants import *
+from diagnosticFile import sortDiagnostics
+from grammarFile import Grammar, PredictionRow, CAPTURED, text, terminalKind
+from parserFile import Parser
+
+
+class TableParser(Parser):
+    # Predictive parser driven by the LL(1) table generated from the
+    # grammar at the end of this file, the grammar in the comments of
+    # Parser written out as rules. It builds the same nodes as Parser, in
+    # the same order, so it works with nodeFile and AstArena alike.
+    #
+    # Symbols are kept on an explicit stack: a nonterminal is replaced by
+    # the row entry for the current token, a terminal is matched, an action
+    # builds nodes from the value stack. There is no Python call per rule
+    # and nesting depth is limited by memory only. Binary expressions are
+    # flat operator chains in the grammar, their precedence is applied by
+    # the actions like Parser.parseBinaryExpression does.
+    #
+    # On a syntax error the item of the innermost declaration, statement or
+    # struct member list being parsed is dropped and the tokens are skipped
+    # with Parser.synchronize, as Parser does. Messages name the missing
+    # token or the rule that had no entry for the current one.
+    #
+    # Only parseProgram and parseNextDeclaration use the table; other
+    # parse* methods are Parser's.
+
+    def __init__(self, nodes = nodeFile):
+        Parser.__init__(self, nodes)
+        self.constructors = {nodeClass.__name__: getattr(nodes, nodeClass.__name__) for nodeClass in nodeFile.nodeClasses}
+
+
+    def parseProgram(self):
+        program = self.parseSymbol(TableParser.rows["Program"])
+        sortDiagnostics(self.diagnostics)
+        return program
+
+
+    def parseNextDeclaration(self):
+        return self.parseSymbol(TableParser.rows["Declaration"])
+
+
+    # Parses what row derives and returns its value, or None if it failed
+    # outside of any list, in which case the tokens up to the next
+    # declaration are skipped.
+    def parseSymbol(self, row):
+        self.stack = stack = [row]
+        self.marks = []    # (value count, token position) per list item in progress
+        self.startPos = self.tokenPos
+        values = []
+
+        tokens = self.tokens
+        constructors = self.constructors
+        kind = self.kind
+        while stack:
+            symbol = stack.pop()
+            symbolClass = symbol.__class__
+
+            if symbolClass is PredictionRow:
+                production = symbol.get(kind)
+                if production != None:
+                    stack.extend(production)
+                    continue
+
+            elif symbolClass is int:
+                if symbol == kind:
+                    self.kind, self.text, self.start, self.lineNumber = next(tokens)
+                    self.tokenPos += 1
+                    kind = self.kind
+                    continue
+                if symbol - CAPTURED == kind:
+                    values.append(self.text)
+                    self.kind, self.text, self.start, self.lineNumber = next(tokens)
+                    self.tokenPos += 1
+                    kind = self.kind
+                    continue
+
+            # the most frequent actions are run in place
+            elif symbol is pushLine:
+                values.append(self.lineNumber)
+                continue
+            elif symbolClass is NodeBuilder:
+                count = symbol.count
+                fields = values[-count:]
+                del values[-count:]
+                values.append(constructors[symbol.className](*fields[1:], fields[0]))
+                continue
+            elif symbolClass is tuple:
+                values.extend(symbol)
+                continue
+            else:
+                symbol(self, values)
+                continue
+
+            if not self.recover(symbol, values):
+                return None
+            kind = self.kind
+
+        return values[0]
+
+
+    # Reports that symbol did not match and resumes at the innermost list
+    # being parsed. Returns False if there is none.
+    #
+    # A row that can match nothing does so instead, the error then shows
+    # at the next symbol that has to match, which adds the kinds the row
+    # expected to its diagnostic.
+    def recover(self, symbol, values):
+        if symbol.__class__ is PredictionRow:
+            if self.expectedPos != self.tokenPos:
+                self.expectedPos = self.tokenPos
+                self.expected = []
+            self.expected.extend(symbol.expected)
+            if symbol.default != None:
+                self.stack.extend(symbol.default)
+                return True
+            self.error("Unexpected token in " + symbol.name, self.lineNumber)
+        else:
+            kind = terminalKind(symbol)
+            self.expect(kind)
+            self.error("Missing " + ("'" + TOKEN_TEXT[kind] + "'" if kind in TOKEN_TEXT else "identifier"), self.lineNumber)
+
+        # a list that failed to start its next item resumes there
+        if symbol.__class__ is PredictionRow and symbol.recovery != None:
+            self.synchronize(self.tokenPos, *symbol.recovery)
+            self.stack.append(symbol)
+            return True
+
+        # otherwise the item in progress is dropped; the list's row is
+        # below the action that would have added it
+        stack = self.stack
+        for i in range(len(stack) - 1, -1, -1):
+            recovery = getattr(stack[i], "recovery", None)
+            if recovery != None and stack[i].__class__ is not PredictionRow:
+                del stack[i:]
+                valueCount, startPos = self.marks.pop()
+                del values[valueCount:]
+                self.synchronize(startPos, *recovery)
+                return True
+
+        del stack[:]
+        self.synchronize(self.startPos, Parser.declarationSyncKinds, False)
+        return False
+
+
+
+#--------------- GRAMMAR ACTIONS ----------------------------
+# Actions are called with the parser and the value stack, except for the
+# frequent ones parseSymbol runs in place: pushLine, a tuple of constants to
+# push and a NodeBuilder. Node fields are pushed in constructor order after
+# the line of the node's first token.
+
+def pushLine(parser, values):
+    values.append(parser.lineNumber)
+
+
+def push(*constants):
+    return constants
+
+
+class NodeBuilder:
+    # Replaces the line and count - 1 fields on top of the value stack by a
+    # node of the named class, made by the parser's node backend.
+    __slots__ = ("className", "count")
+
+    def __init__(self, className, count):
+        self.className = className
+        self.count = count
+
+def build(className, count):
+    return NodeBuilder(className, count)
+
+
+def newList(parser, values):
+    values.append([])
+
+
+def appendItem(parser, values):
+    item = values.pop()
+    values[-1].append(item)
+
+
+# Items of declaration, statement and member lists are marked when they
+# start, for recovery to drop what a failed one pushed.
+def startItem(parser, values):
+    parser.marks.append((len(values), parser.tokenPos))
+
+
+def appendRecoverableItem(syncKinds, nested):
+    def appendItemOf(parser, values):
+        parser.marks.pop()
+        item = values.pop()
+        values[-1].append(item)
+    appendItemOf.recovery = (syncKinds, nested)
+    return appendItemOf
+
+appendDeclaration = appendRecoverableItem(Parser.declarationSyncKinds, False)
+appendStatement = appendRecoverableItem(Parser.statementSyncKinds, True)
+appendMember = appendRecoverableItem((), True)
+
+
+# A block cut short by the next function or the end of file is reported
+# and closed, like Parser.parseCompountStatement does; the '}' it expected
+# is taken off the stack.
+def missingBrace(message):
+    def closeBlock(parser, values):
+        parser.error(message, parser.lineNumber, (RIGHT_BRACE,))
+        parser.stack.pop()
+    return closeBlock
+
+
+binaryPrecedences = {operator: precedence for operator, precedence in Parser.binaryOperators.values()}
+
+# A binary expression is on the value stack as
+#   line, operand, (operator, precedence), line, operand, ...
+# which is kept in order of increasing precedence: an operator reduces the
+# operators before it that bind at least as tightly.
+def shiftOperator(parser, values):
+    operator = values.pop()
+    precedence = binaryPrecedences[operator]
+    while values[-3].__class__ is tuple and values[-3][1] >= precedence:
+        reduceOperator(parser, values)
+    values.append((operator, precedence))
+
+
+def reduceOperators(parser, values):
+    while values[-3].__class__ is tuple:
+        reduceOperator(parser, values)
+
+
+def reduceOperator(parser, values):
+    rightOP = values.pop()
+    values.pop()
+    operator = values.pop()[0]
+    values[-1] = parser.nodes.BinaryExpression(values[-1], operator, rightOP, values[-2])
+
+
+
+#--------------- GRAMMAR -----------------------------------
+def makeGrammar():
+    grammar = Grammar("Program")
+    rule = grammar.addRule
+
+    rule("Program", [pushLine, newList, "DeclarationList", build("Program", 2)])
+    rule("DeclarationList", [startItem, "Declaration", appendDeclaration, "DeclarationList"], [])
+    rule("Declaration", ["VariableDeclarationStatement"], ["FunctionDeclaration"], ["StructDeclaration"])
+
+    rule("VariableDeclarationStatement", ["VariableDeclaration", SEMICOLON])
+    rule("VariableDeclaration",
+         [pushLine, VAR, "TypeSpecifier", text(IDENTIFIER), "VariableInitializer", build("VariableDeclaration", 5)])
+    rule("VariableInitializer",
+         [LEFT_BRACKET, "ConditionalExpression", RIGHT_BRACKET, push("array")],
+         [ASSIGN, "ConditionalExpression", push("regular")],
+         [push(None, "regular")])
+
+    rule("TypeSpecifier", [pushLine, "TypeName", "Indirection", build("TypeSpecifier", 4)])
+    rule("TypeName", *([kind, push(name, None)] for kind, name in Parser.typeSpecifiers.items() if kind != STRUCT))
+    rule("TypeName", [STRUCT, push("struct"), text(IDENTIFIER)])
+    rule("Indirection", [STAR, push(True)], [push(False)])
+
+    rule("FunctionDeclaration",
+         [pushLine, FUNC, "TypeSpecifier", text(IDENTIFIER), LEFT_PAREN, newList, "ParameterList", RIGHT_PAREN,
+          "CompoundStatement", build("FunctionDeclaration", 5)])
+    rule("ParameterList", ["Parameter", appendItem, "ParameterTail"], [])
+    rule("ParameterTail", [COMMA, "Parameter", appendItem, "ParameterTail"], [])
+    rule("Parameter", [pushLine, "TypeSpecifier", text(IDENTIFIER), "ParameterArray", build("Parameter", 4)])
+    rule("ParameterArray", [LEFT_BRACKET, RIGHT_BRACKET, push(True)], [push(False)])
+
+    rule("StructDeclaration",
+         [pushLine, STRUCT, text(IDENTIFIER), LEFT_BRACE, newList, "MemberList", RIGHT_BRACE,
+          build("StructDeclaration", 3)])
+    rule("MemberList", [startItem, "Member", appendMember, "MemberList"], [])
+    rule("Member", [pushLine, "TypeSpecifier", text(IDENTIFIER), "MemberArray", SEMICOLON, build("Member", 5)])
+    rule("MemberArray", [LEFT_BRACKET, push(True), "ConditionalExpression", RIGHT_BRACKET], [push(False, None)])
+
+    rule("CompoundStatement", [LEFT_BRACE, newList, "StatementList", RIGHT_BRACE])
+    rule("StatementList", [startItem, "Statement", appendStatement, "StatementList"], [])
+    rule("Statement",
+         ["IfStatement"], ["WhileStatement"], ["ForStatement"], ["ReturnStatement"],
+         ["VariableDeclarationStatement"], ["ExpressionStatement"])
+    rule("ExpressionStatement", ["Expression", SEMICOLON])
+
+    rule("IfStatement",
+         [pushLine, IF, LEFT_PAREN, "ConditionalExpression", RIGHT_PAREN, "CompoundStatement", "ElseBranch",
+          build("IfStatement", 4)])
+    rule("ElseBranch", [ELSE, "CompoundStatement"], [push(None)])
+    rule("WhileStatement",
+         [pushLine, WHILE, LEFT_PAREN, "ConditionalExpression", RIGHT_PAREN, "CompoundStatement",
+          build("WhileStatement", 3)])
+    rule("ForStatement",
+         [pushLine, FOR, LEFT_PAREN, "ForInitializer", SEMICOLON, "Expression", SEMICOLON, "AssignmentExpression",
+          RIGHT_PAREN, "CompoundStatement", build("ForStatement", 5)])
+    rule("ForInitializer", ["VariableDeclaration"], [push(None)])
+    rule("ReturnStatement", [pushLine, RETURN, "ReturnValue", SEMICOLON, build("ReturnStatement", 2)])
+    rule("ReturnValue", ["ConditionalExpression"], [push(None)])
+
+    rule("Expression", [LET, "AssignmentExpression"], ["ConditionalExpression"])
+    rule("AssignmentExpression",
+         [pushLine, "AssignmentTarget", ASSIGN, "Expression", build("AssignmentExpression", 3)])
+    rule("AssignmentTarget", [pushLine, text(IDENTIFIER), "TargetSuffix", build("PostfixExpression", 4)])
+    rule("TargetSuffix", ["FieldSuffix"], [push(None, None)])
+
+    rule("ConditionalExpression",
+         [pushLine, "UnaryExpression", "BinaryRest", build("ConditionalExpression", 2)])
+    rule("BinaryRest",
+         ["BinaryOperator", shiftOperator, pushLine, "UnaryExpression", "BinaryTail", reduceOperators], [])
+    rule("BinaryTail", ["BinaryOperator", shiftOperator, pushLine, "UnaryExpression", "BinaryTail"], [])
+    rule("BinaryOperator", *([text(kind)] for kind in Parser.binaryOperators))
+
+    rule("UnaryExpression", [pushLine, "UnaryOperator", "Term", build("UnaryExpression", 3)], ["Term"])
+    rule("UnaryOperator", *([text(kind)] for kind in Parser.unaryOperators))
+    rule("Term",
+         [pushLine, text(NUMBER), build("NumericLiteral", 2)],
+         [LEFT_PAREN, "ConditionalExpression", RIGHT_PAREN],
+         ["PostfixExpression"])
+
+    rule("PostfixExpression", [pushLine, text(IDENTIFIER), "PostfixSuffix", build("PostfixExpression", 4)])
+    rule("PostfixSuffix",
+         ["FieldSuffix"],
+         [LEFT_PAREN, push("()"), newList, "ArgumentList", RIGHT_PAREN],
+         [push(None, None)])
+    rule("FieldSuffix",
+         [LEFT_BRACKET, push("[]"), "ConditionalExpression", RIGHT_BRACKET],
+         [ARROW, push("->"), text(IDENTIFIER)],
+         [DOT, push("."), text(IDENTIFIER)])
+    rule("ArgumentList", ["ConditionalExpression", appendItem, "ArgumentTail"], [])
+    rule("ArgumentTail", [COMMA, "ConditionalExpression", appendItem, "ArgumentTail"], [])
+
+    return grammar
+
+
+TableParser.grammar = makeGrammar()
+TableParser.rows = TableParser.grammar.compile()
+
+rows = TableParser.rows
+# lists resume after an error where their next item starts, they are never
+# ended by one
+for name, append in (("DeclarationList", appendDeclaration), ("StatementList", appendStatement),
+                     ("MemberList", appendMember)):
+    rows[name].recovery = append.recovery
+    rows[name].default = None
+rows["StatementList"][FUNC] = rows["StatementList"][EOF] = (missingBrace("Missing '}'"),)
+rows["MemberList"][FUNC] = rows["MemberList"][EOF] = (missingBrace("Struct declaration missing '}'"),)
@@ -0,0 +1,103 @@
+import sys
+from array import array
+from constants import *
+
+
+class TokenStore:
+    # Tokens kept as parallel columns instead of one string object per token:
+    # kind code, start offset and length into the source text, and line
+    # number. Newlines are not tokens, every token carries its own line.
+
+    def __init__(self, text):
+        self.text = text
+        self.kinds = array("b")
+        self.starts = array("q")
+        self.lengths = array("I")
+        self.lines = array("I")
+
+
+    def append(self, kind, start, length, line):
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.lines.append(line)
+
+
+    def __len__(self):
+        return len(self.kinds)
+
+
+    def __eq__(self, other):
+        return isinstance(other, TokenStore) and \
+               self.kinds == other.kinds and \
+               self.starts == other.starts and \
+               self.lengths == other.lengths and \
+               self.lines == other.lines
+
+
+    def getKind(self, index):
+        return self.kinds[index]
+
+
+    def getText(self, index):
+        kind = self.kinds[index]
+        if kind > NUMBER or kind == EOF:
+            return TOKEN_TEXT[kind]
+
+        start = self.starts[index]
+        text = self.text[start:start + self.lengths[index]]
+        return text if text.__class__ == str else str(text, "ascii")
+
+
+    def getLine(self, index):
+        return self.lines[index]
+
+
+    # The column arrays, in a fixed order.
+    def getColumns(self):
+        return [self.kinds, self.starts, self.lengths, self.lines]
+
+
+    def getByteSize(self):
+        return sum(column.itemsize * len(column) for column in self.getColumns())
+
+
+    # Yields (kind, text, start, line) tuples, the form the parser consumes.
+    # Text is only sliced out of the source for identifiers and numbers, and
+    # identifiers are interned so every use of a name shares one string.
+    def __iter__(self):
+        return self.iterRange(0, len(self.kinds))
+
+
+    # The same tuples, for tokens first to end - 1 only.
+    def iterRange(self, first, end):
+        text = self.text
+        intern = sys.intern
+        columns = [self.kinds, self.starts, self.lengths, self.lines]
+        if first != 0 or end != len(self.kinds):
+            columns = [column[first:end] for column in columns]
+
+        if not isinstance(text, str):
+            yield from self._iterBytes(columns)
+            return
+
+        for kind, start, length, line in zip(*columns):
+            if kind == IDENTIFIER:
+                yield kind, intern(text[start:start + length]), start, line
+            elif kind == NUMBER:
+                yield kind, text[start:start + length], start, line
+            else:
+                yield kind, TOKEN_TEXT[kind], start, line
+
+
+    # iterRange over a bytes-like text, where names and numbers are ASCII
+    def _iterBytes(self, columns):
+        text = self.text
+        intern = sys.intern
+        for kind, start, length, line in zip(*columns):
+            if kind == IDENTIFIER:
+                yield kind, intern(str(text[start:start + length], "ascii")), start, line
+            elif kind == NUMBER:
+                yield kind, str(text[start:start + length], "ascii"), start, line
+            else:
+                yield kind, TOKEN_TEXT[kind], start, line
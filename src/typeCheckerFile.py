@@ -0,0 +1,400 @@
+from nodeFile import *
+from resolverFile import builtinNames
+from diagnosticFile import DiagnosticError
+
+
+class Type:
+    # A type of the language. int and void are the single INT and VOID, a
+    # struct type is made once per StructDeclaration, and the pointer to
+    # and the array of a type are made the first time they are asked for
+    # and kept on it, so types are the same object exactly when they are
+    # equal and are compared with 'is'. A struct type's members map each
+    # member name to (member slot, Type).
+    __slots__ = ("kind", "name", "target", "members", "pointer", "array")
+
+    def __init__(self, kind, name = None, target = None):
+        self.kind = kind
+        self.name = name
+        self.target = target
+        self.members = None
+        self.pointer = None
+        self.array = None
+
+
+    def getPointer(self):
+        if self.pointer == None:
+            self.pointer = Type("pointer", None, self)
+        return self.pointer
+
+
+    def getArray(self):
+        if self.array == None:
+            self.array = Type("array", None, self)
+        return self.array
+
+
+    def isStructPointer(self):
+        return self.kind == "pointer" and self.target.kind == "struct"
+
+
+    def __str__(self):
+        if self.kind == "struct":
+            return "struct " + self.name
+        if self.kind == "pointer":
+            return str(self.target) + " *"
+        if self.kind == "array":
+            return str(self.target) + " []"
+        return self.kind
+
+
+INT = Type("int")
+VOID = Type("void")
+
+
+
+class TypeChecker:
+    # Type checking pass run after the Resolver, whose links from names to
+    # declarations it follows. Every expression gets its Type in valueType,
+    # and so does every variable, parameter, member and function (its
+    # return type); every StructDeclaration gets its struct Type in
+    # structType, made once per declaration and used for all member
+    # accesses. A program without type errors is marked isTyped, which
+    # tells the executors that every operand has its expected kind of value
+    # and needs no check at run time.
+    #
+    # A type that cannot be worked out, after an error reported here or by
+    # the Resolver, is None and matches anything, so one error is reported
+    # once. Like the Resolver's, all errors are collected and reported
+    # together.
+
+    arithmeticOperators = ("+", "-", "*", "/", "%", "<", ">", "<=", ">=")
+
+    def __init__(self):
+        self.expressionRules = {
+            ConditionalExpression: self.checkConditionalExpression,
+            BinaryExpression: self.checkBinaryExpression,
+            UnaryExpression: self.checkUnaryExpression,
+            NumericLiteral: self.checkNumericLiteral,
+            PostfixExpression: self.checkPostfixExpression,
+            AssignmentExpression: self.checkAssignmentExpression,
+        }
+
+        self.statementRules = {
+            IfStatement: self.checkIfStatement,
+            WhileStatement: self.checkWhileStatement,
+            ForStatement: self.checkForStatement,
+            ReturnStatement: self.checkReturnStatement,
+            VariableDeclaration: self.checkVariableDeclaration,
+        }
+        for nodeClass in self.expressionRules:
+            self.statementRules[nodeClass] = self.checkExpression
+
+        self.postfixRules = {
+            None: self.checkVariable,
+            "[]": self.checkElement,
+            ".": self.checkMember,
+            "->": self.checkMember,
+            "()": self.checkCall,
+        }
+
+
+#------------- PUBLIC SECTION -------------------------------
+    # Annotates a resolved Program node in place. Returns the program, or
+    # None if it has type errors; the errors are printed unless printErrors
+    # is False, and are left in self.errorList either way.
+    def checkProgram(self, program, printErrors = True):
+        self.errorList = []
+        self.function = None
+        declarations = program.declarations
+
+        for decl in declarations:
+            if decl.__class__ == StructDeclaration:
+                decl.structType = Type("struct", decl.identifier)
+        for decl in declarations:
+            if decl.__class__ == StructDeclaration:
+                self.makeMembers(decl)
+
+        for decl in declarations:
+            if decl.__class__ == VariableDeclaration:
+                decl.valueType = self.getDeclaredType(decl.type, decl.declarationType == "array")
+            elif decl.__class__ == FunctionDeclaration:
+                decl.valueType = self.getType(decl.type)
+                for param in decl.parameterList:
+                    param.valueType = self.getDeclaredType(param.type, param.isArray)
+
+        for decl in declarations:
+            if decl.__class__ == VariableDeclaration:
+                self.checkInitializer(decl)
+            elif decl.__class__ == StructDeclaration:
+                for member in decl.memberList:
+                    if member.expression != None:
+                        self.checkInt(member.expression, "Array size")
+            elif decl.isBodyLoaded():
+                self.checkFunction(decl)
+            else:
+                decl.whenBodyLoaded(self.checkLazyFunction)
+
+        program.isTyped = not self.errorList
+        if self.errorList:
+            if printErrors:
+                self.showErrors()
+            return None
+        return program
+
+
+    def showErrors(self):
+        print("AN ERROR HAS OCCURED")
+        for error in self.errorList:
+            print(error)
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def error(self, message, line):
+        self.errorList.append("Line " + str(line) + " : " + message)
+
+
+    # The struct's type descriptor: each member's slot and type, looked up
+    # by name on every "." and "->" instead of searching the member list.
+    def makeMembers(self, decl):
+        members = {}
+        for slot in range(len(decl.memberList)):
+            member = decl.memberList[slot]
+            member.valueType = self.getDeclaredType(member.type, member.isArray)
+            members.setdefault(member.identifier, (slot, member.valueType))
+        decl.structType.members = members
+
+
+    # The Type a TypeSpecifier names, None for an unknown struct
+    def getType(self, typeSpecifier):
+        if typeSpecifier.type == "int":
+            baseType = INT
+        elif typeSpecifier.type == "void":
+            baseType = VOID
+        elif typeSpecifier.declaration != None:
+            baseType = typeSpecifier.declaration.structType
+        else:
+            return None
+
+        if typeSpecifier.indirection:
+            return baseType.getPointer()
+        return baseType
+
+
+    def getDeclaredType(self, typeSpecifier, isArray):
+        valueType = self.getType(typeSpecifier)
+        if valueType is VOID:
+            self.error("A variable cannot be void", typeSpecifier.line)
+            return None
+        if valueType != None and isArray:
+            return valueType.getArray()
+        return valueType
+
+
+    # Reports message, a format with {target} and {value}, unless a value
+    # of type value can be stored where target is expected.
+    def checkAssignable(self, target, value, message, line):
+        if target != None and value != None and target is not value:
+            self.error(message.format(target = target, value = value), line)
+
+
+    def checkInt(self, node, what):
+        valueType = self.checkExpression(node)
+        if valueType != None and valueType is not INT:
+            self.error(what + " must be an int, not '" + str(valueType) + "'", node.line)
+
+
+    def checkCondition(self, node):
+        valueType = self.checkExpression(node)
+        if valueType is VOID:
+            self.error("A void value cannot be used as a condition", node.line)
+
+
+    def checkFunction(self, decl):
+        self.function = decl
+        self.checkBlock(decl.body)
+        self.function = None
+
+
+    # A function whose body is parsed lazily is checked once it is, after
+    # checkProgram has returned; nobody is left to return its errors to,
+    # so they raise DiagnosticError.
+    def checkLazyFunction(self, decl):
+        self.errorList = []
+        self.checkFunction(decl)
+        if self.errorList:
+            raise DiagnosticError(self.errorList)
+
+
+    def checkBlock(self, statements):
+        if statements == None:
+            return
+        for statement in statements:
+            self.statementRules[statement.__class__](statement)
+
+
+#--------------- STATEMENTS ---------------------------------
+    def checkVariableDeclaration(self, node):
+        node.valueType = self.getDeclaredType(node.type, node.declarationType == "array")
+        self.checkInitializer(node)
+
+
+    def checkInitializer(self, node):
+        if node.expression == None:
+            return
+        if node.declarationType == "array":
+            self.checkInt(node.expression, "Array size")
+        else:
+            self.checkAssignable(node.valueType, self.checkExpression(node.expression),
+                                 "Cannot initialize '" + node.identifier + "' of type '{target}' with '{value}'", node.line)
+
+
+    def checkIfStatement(self, node):
+        self.checkCondition(node.condition)
+        self.checkBlock(node.body)
+        self.checkBlock(node.elseBody)
+
+
+    def checkWhileStatement(self, node):
+        self.checkCondition(node.condition)
+        self.checkBlock(node.body)
+
+
+    def checkForStatement(self, node):
+        if node.forInitializer != None:
+            self.checkVariableDeclaration(node.forInitializer)
+        self.checkCondition(node.condition)
+        self.checkExpression(node.forUpdater)
+        self.checkBlock(node.body)
+
+
+    def checkReturnStatement(self, node):
+        returnType = self.function.valueType
+        if node.returnValue == None:
+            if returnType != None and returnType is not VOID:
+                self.error("Function '" + self.function.identifier + "' must return a value", node.line)
+            return
+
+        valueType = self.checkExpression(node.returnValue)
+        if returnType is VOID:
+            self.error("Function '" + self.function.identifier + "' returns void", node.line)
+        else:
+            self.checkAssignable(returnType, valueType, "Function '" + self.function.identifier +
+                                 "' must return '{target}', not '{value}'", node.line)
+
+
+#--------------- EXPRESSIONS --------------------------------
+    def checkExpression(self, node):
+        node.valueType = self.expressionRules[node.__class__](node)
+        return node.valueType
+
+
+    def checkConditionalExpression(self, node):
+        return self.checkExpression(node.body)
+
+
+    def checkNumericLiteral(self, node):
+        return INT
+
+
+    def checkBinaryExpression(self, node):
+        operator = node.operator
+        if operator == "&&" or operator == "||":
+            self.checkCondition(node.leftOP)
+            self.checkCondition(node.rightOP)
+            return INT
+
+        left = self.checkExpression(node.leftOP)
+        right = self.checkExpression(node.rightOP)
+        if left == None or right == None:
+            return INT
+
+        if operator in TypeChecker.arithmeticOperators:
+            if left is not INT or right is not INT:
+                self.error("Operator '" + operator + "' needs int operands, not '" + str(left) +
+                           "' and '" + str(right) + "'", node.line)
+        elif left is not right or left is VOID:
+            self.error("Cannot compare '" + str(left) + "' with '" + str(right) + "'", node.line)
+        return INT
+
+
+    def checkUnaryExpression(self, node):
+        operator = node.operator
+        if operator == "!":
+            self.checkCondition(node.term)
+            return INT
+        if operator == "-":
+            self.checkInt(node.term, "Operand of '-'")
+            return INT
+
+        termType = self.checkExpression(node.term)
+        if termType == None:
+            return None
+        if operator == "&":
+            return termType.getPointer()
+
+        if termType.kind != "pointer":
+            self.error("Cannot dereference '" + str(termType) + "'", node.line)
+            return None
+        return termType.target
+
+
+    def checkAssignmentExpression(self, node):
+        valueType = self.checkExpression(node.expression)
+        targetType = self.checkExpression(node.target)
+        self.checkAssignable(targetType, valueType, "Cannot assign '{value}' to '{target}'", node.line)
+        return targetType
+
+
+    def checkPostfixExpression(self, node):
+        return self.postfixRules[node.operator](node)
+
+
+    def checkVariable(self, node):
+        declaration = node.declaration
+        return declaration.valueType if declaration != None else None
+
+
+    def checkElement(self, node):
+        self.checkInt(node.field, "Array index")
+        valueType = self.checkVariable(node)
+        if valueType == None:
+            return None
+        if valueType.kind != "array":
+            self.error("'" + node.identifier + "' is not an array", node.line)
+            return None
+        return valueType.target
+
+
+    def checkMember(self, node):
+        valueType = self.checkVariable(node)
+        if valueType == None:
+            return None
+
+        if node.operator == "->":
+            if not valueType.isStructPointer():
+                self.error("'" + node.identifier + "' is not a pointer to a struct", node.line)
+                return None
+            valueType = valueType.target
+        elif valueType.kind != "struct":
+            self.error("'" + node.identifier + "' is not a struct", node.line)
+            return None
+
+        member = valueType.members.get(node.field)
+        return member[1] if member != None else None
+
+
+    def checkCall(self, node):
+        function = node.declaration
+        argumentTypes = [self.checkExpression(argument) for argument in node.field]
+        if function == None:
+            if node.identifier in builtinNames:
+                for argument, argumentType in zip(node.field, argumentTypes):
+                    if argumentType is VOID:
+                        self.error("A void value cannot be printed", argument.line)
+                return INT
+            return None
+
+        for i in range(min(len(function.parameterList), len(argumentTypes))):
+            self.checkAssignable(function.parameterList[i].valueType, argumentTypes[i], "Argument " + str(i + 1) +
+                                 " of '" + node.identifier + "' must be '{target}', not '{value}'", node.line)
+        return function.valueType
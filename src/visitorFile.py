@@ -0,0 +1,242 @@
+from operator import attrgetter
+from nodeFile import *
+
+
+# For every node class, its child fields in attribute order as
+# (getter, field name, is list) triples, computed once instead of testing
+# attribute names on every visit. PostfixExpression's depend on its operator.
+childFields = {}
+for nodeClass in nodeClasses:
+    childFields[nodeClass] = tuple((attrgetter(attr.split(".")[0]), attr.split(".")[0], attr.endswith(".list"))
+                                   for attr in nodeClass.attributes if not attr.endswith(".lit"))
+
+postfixChildFields = {
+    "[]": ((attrgetter("field"), "field", False),),
+    "()": ((attrgetter("field"), "field", True),),
+}
+
+
+def getChildFields(node):
+    if node.__class__ == PostfixExpression:
+        return postfixChildFields.get(node.operator, ())
+    return childFields[node.__class__]
+
+
+# Children of a node in attribute order. Nodes that are not nodeFile
+# classes (arena views) are read through getAttributes/getValue.
+def getChildren(node):
+    fields = childFields.get(node.__class__)
+    if fields == None:
+        return getGenericChildren(node)
+    if node.__class__ == PostfixExpression:
+        fields = postfixChildFields.get(node.operator, ())
+
+    children = []
+    for getter, field, isList in fields:
+        value = getter(node)
+        if value == None:
+            continue
+        if isList:
+            children.extend(value)
+        else:
+            children.append(value)
+    return children
+
+
+def getGenericChildren(node):
+    children = []
+    for attr in node.getAttributes():
+        if attr.endswith(".node"):
+            value = node.getValue(attr)
+            if value != None:
+                children.append(value)
+        elif attr.endswith(".list"):
+            value = node.getValue(attr)
+            if value != None:
+                children.extend(value)
+    return children
+
+
+# Yields (node, depth) for root and every node under it, in preorder.
+def walk(root):
+    stack = [(root, 0)]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        node, depth = pop()
+        yield node, depth
+
+        children = getChildren(node)
+        for i in range(len(children) - 1, -1, -1):
+            push((children[i], depth + 1))
+
+
+# For every node class, its names and child fields in attribute order, which
+# is source order, as (getter, field name, kind) triples: kind is "name" for
+# a field holding an identifier, "node" or "list" for children.
+nameFields = {}
+for nodeClass in nodeClasses:
+    fields = []
+    for attr in nodeClass.attributes:
+        field, kind = attr.split(".")
+        if kind == "lit" and field != "identifier":
+            continue
+        fields.append((attrgetter(field), field, "name" if kind == "lit" else kind))
+    nameFields[nodeClass] = tuple(fields)
+
+postfixNameFields = {
+    "[]": nameFields[PostfixExpression][:1] + ((attrgetter("field"), "field", "node"),),
+    "()": nameFields[PostfixExpression][:1] + ((attrgetter("field"), "field", "list"),),
+    ".": nameFields[PostfixExpression][:1] + ((attrgetter("field"), "field", "name"),),
+    "->": nameFields[PostfixExpression][:1] + ((attrgetter("field"), "field", "name"),),
+}
+
+
+# Yields (node, field) for every name under root, in source order: field is
+# "identifier" for the name a node declares or uses (for a TypeSpecifier the
+# struct it names) and "field" for the member name of a "." or "->" access.
+# For a tree parsed without errors these are the identifier tokens it was
+# parsed from, one to one and in the same order.
+def walkNames(root):
+    stack = [root]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        entry = pop()
+        if entry.__class__ == tuple:
+            yield entry
+            continue
+
+        node = entry
+        if node.__class__ == PostfixExpression:
+            fields = postfixNameFields.get(node.operator, nameFields[PostfixExpression])
+        else:
+            fields = nameFields[node.__class__]
+
+        entries = []
+        for getter, field, kind in fields:
+            value = getter(node)
+            if value == None:
+                continue
+            if kind == "name":
+                entries.append((node, field))
+            elif kind == "list":
+                entries.extend(value)
+            else:
+                entries.append(value)
+        for i in range(len(entries) - 1, -1, -1):
+            push(entries[i])
+
+
+
+class Visitor:
+    # Preorder walk with an explicit stack, so tree depth is not limited by
+    # the recursion limit. A subclass defines enter<NodeClass>(node, depth)
+    # and leave<NodeClass>(node, depth) methods for the node classes it
+    # cares about, and enterNode/leaveNode for all others. Returning False
+    # from an enter method skips the node's children.
+
+    def __init__(self):
+        self.enterRules = {}
+        self.leaveRules = {}
+        for nodeClass in nodeClasses:
+            self.enterRules[nodeClass] = getattr(self, "enter" + nodeClass.__name__, self.enterNode)
+            self.leaveRules[nodeClass] = getattr(self, "leave" + nodeClass.__name__, self.leaveNode)
+
+
+    def visit(self, root):
+        enterRules = self.enterRules
+        leaveRules = self.leaveRules
+        enterNode = self.enterNode
+        leaveNode = self.leaveNode
+
+        # entries are (node, depth, children pushed yet)
+        stack = [(root, 0, False)]
+        pop = stack.pop
+        push = stack.append
+
+        while stack:
+            node, depth, entered = pop()
+
+            if entered:
+                leaveRules.get(node.__class__, leaveNode)(node, depth)
+                continue
+
+            push((node, depth, True))
+            if enterRules.get(node.__class__, enterNode)(node, depth) == False:
+                continue
+
+            children = getChildren(node)
+            for i in range(len(children) - 1, -1, -1):
+                push((children[i], depth + 1, False))
+
+
+    def enterNode(self, node, depth):
+        pass
+
+
+    def leaveNode(self, node, depth):
+        pass
+
+
+
+class Transformer:
+    # Postorder rewrite with an explicit stack. transform<NodeClass>(node)
+    # is called once the node's children have been transformed and returns
+    # the node to put in its place, which may be the node itself. Node
+    # classes without a method are kept as they are.
+
+    def __init__(self):
+        self.transformRules = {}
+        for nodeClass in nodeClasses:
+            rule = getattr(self, "transform" + nodeClass.__name__, None)
+            if rule != None:
+                self.transformRules[nodeClass] = rule
+
+
+    # Transforms the tree under root in place and returns the new root.
+    def transform(self, root):
+        rules = self.transformRules
+        result = [root]
+
+        # entries are (node, container, key, children pushed yet); the
+        # container is the parent node (key is a field name) or a list
+        # (key is an index) the node's replacement is stored in
+        stack = [(root, result, 0, False)]
+        pop = stack.pop
+        push = stack.append
+
+        while stack:
+            node, container, key, expanded = pop()
+
+            if not expanded:
+                entries = []
+                for getter, field, isList in getChildFields(node):
+                    value = getter(node)
+                    if value == None:
+                        continue
+                    if isList:
+                        for i in range(len(value)):
+                            entries.append((value[i], value, i, False))
+                    else:
+                        entries.append((value, node, field, False))
+
+                # leaves are transformed right away
+                if entries:
+                    push((node, container, key, True))
+                    for i in range(len(entries) - 1, -1, -1):
+                        push(entries[i])
+                    continue
+
+            rule = rules.get(node.__class__)
+            if rule != None:
+                replacement = rule(node)
+                if replacement is not node:
+                    if container.__class__ == list:
+                        container[key] = replacement
+                    else:
+                        setattr(container, key, replacement)
+
+        return result[0]
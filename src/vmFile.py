@@ -0,0 +1,255 @@
+from compilerFile import *
+from interpreterFile import ExecutionError, Reference, StructValue, divide, remainder, copyValue
+
+
+# Message for a Python exception raised while executing an opcode
+errorMessages = {
+    ADD: "Invalid operands for '+'", ADD_CONST: "Invalid operands for '+'",
+    JUMP_IF_NOT_LESS: "Invalid operands for '<'", SUB: "Invalid operands for '-'",
+    MUL: "Invalid operands for '*'", DIV: "Invalid operands for '/'",
+    MOD: "Invalid operands for '%'",
+    LESS_THAN: "Invalid operands for '<'", GREATER_THAN: "Invalid operands for '>'",
+    LESS_EQUAL_THAN: "Invalid operands for '<='", GREATER_EQUAL_THAN: "Invalid operands for '>='",
+    NEGATE: "Invalid operand for '-'",
+    LOAD_INDEX: "Index out of bounds or value is not an array",
+    STORE_INDEX: "Index out of bounds or value is not an array",
+    REF_INDEX: "Index out of bounds or value is not an array",
+    LOAD_MEMBER: "Value is not a struct",
+    STORE_MEMBER: "Value is not a struct",
+    REF_MEMBER: "Value is not a struct",
+    DEREF: "Dereferencing a value that is not a pointer",
+}
+
+
+
+class VirtualMachine:
+    # Stack machine for the bytecode made by Compiler. Values are the same
+    # as the Interpreter's (ints, lists, StructValues, References), so both
+    # tiers print the same results and raise the same ExecutionErrors.
+    # Calls push a saved frame instead of recursing in Python; one operand
+    # stack is shared by all frames.
+
+    def __init__(self):
+        self.builtins = [self.builtinPrint]
+
+
+#------------- PUBLIC SECTION -------------------------------
+    # Compiles a Program node, runs its entry function and returns its
+    # return value.
+    def run(self, program, entry = "main"):
+        return self.runCompiled(Compiler().compileProgram(program), entry)
+
+
+    def runCompiled(self, program, entry = "main"):
+        self.program = program
+        self.globals = [None] * len(program.globalNames)
+        self.execute(program.initializer, [])
+
+        index = program.functionIndexes.get(entry)
+        if index == None:
+            raise ExecutionError("no '" + entry + "' function")
+
+        function = program.functions[index]
+        return self.execute(function, [0] * function.paramCount)
+
+
+    def runtimeError(self, message, line):
+        raise ExecutionError(message, line)
+
+
+#--------------- PRIVATE SECTION ----------------------------
+    def execute(self, function, arguments):
+        constants = self.program.constants
+        functions = self.program.functions
+        globalVariables = self.globals
+        builtins = self.builtins
+
+        frames = []
+        stack = []
+        push = stack.append
+        pop = stack.pop
+
+        code = function.code
+        variables = arguments + [None] * (function.localCount - len(arguments))
+        pc = 0
+        op = None
+
+        try:
+            while True:
+                op = code[pc]
+                arg = code[pc + 1]
+                pc += 2
+
+                # most frequent opcodes first
+                if op == LOAD_LOCAL:
+                    push(variables[arg])
+                elif op == CONST:
+                    push(constants[arg])
+                elif op == STORE_LOCAL:
+                    variables[arg] = pop()
+                elif op == JUMP_IF_NOT_LESS:
+                    right = pop()
+                    if not pop() < right:
+                        pc = arg
+                elif op == ADD_CONST:
+                    stack[-1] = stack[-1] + constants[arg]
+                elif op == JUMP_IF_FALSE:
+                    if not pop():
+                        pc = arg
+                elif op == ADD:
+                    right = pop()
+                    stack[-1] = stack[-1] + right
+                elif op == LESS_THAN:
+                    right = pop()
+                    stack[-1] = 1 if stack[-1] < right else 0
+                elif op == JUMP:
+                    pc = arg
+                elif op == SUB:
+                    right = pop()
+                    stack[-1] = stack[-1] - right
+                elif op == MUL:
+                    right = pop()
+                    stack[-1] = stack[-1] * right
+                elif op == LOAD_INDEX:
+                    index = pop()
+                    if index < 0 or stack[-1].__class__ != list:
+                        raise IndexError
+                    stack[-1] = stack[-1][index]
+                elif op == DEREF:
+                    stack[-1] = stack[-1].get()
+                elif op == LOAD_MEMBER:
+                    if stack[-1].__class__ != StructValue:
+                        raise TypeError
+                    stack[-1] = stack[-1][arg]
+                elif op == STORE_MEMBER:
+                    struct = pop()
+                    if struct.__class__ != StructValue:
+                        raise TypeError
+                    struct[arg] = pop()
+                elif op == STORE_INDEX:
+                    index = pop()
+                    array = pop()
+                    if index < 0 or array.__class__ != list:
+                        raise IndexError
+                    array[index] = pop()
+                elif op == MOD:
+                    right = pop()
+                    left = stack[-1]
+                    if left >= 0 and right > 0:
+                        stack[-1] = left % right
+                    else:
+                        stack[-1] = remainder(left, right)
+                elif op == DIV:
+                    right = pop()
+                    left = stack[-1]
+                    if left >= 0 and right > 0:
+                        stack[-1] = left // right
+                    else:
+                        stack[-1] = divide(left, right)
+                elif op == LOAD_GLOBAL:
+                    push(globalVariables[arg])
+                elif op == STORE_GLOBAL:
+                    globalVariables[arg] = pop()
+                elif op == CALL:
+                    callee = functions[arg]
+                    count = callee.paramCount
+                    if count:
+                        calleeVariables = stack[-count:]
+                        del stack[-count:]
+                    else:
+                        calleeVariables = []
+                    calleeVariables += [None] * (callee.localCount - count)
+
+                    frames.append((function, pc, variables))
+                    function = callee
+                    code = callee.code
+                    variables = calleeVariables
+                    pc = 0
+                elif op == RETURN:
+                    if not frames:
+                        return pop()
+                    function, pc, variables = frames.pop()
+                    code = function.code
+                elif op == COPY:
+                    if stack[-1].__class__ == StructValue:
+                        stack[-1] = copyValue(stack[-1])
+                elif op == POP:
+                    pop()
+                elif op == DUP:
+                    push(stack[-1])
+                elif op == GREATER_THAN:
+                    right = pop()
+                    stack[-1] = 1 if stack[-1] > right else 0
+                elif op == LESS_EQUAL_THAN:
+                    right = pop()
+                    stack[-1] = 1 if stack[-1] <= right else 0
+                elif op == GREATER_EQUAL_THAN:
+                    right = pop()
+                    stack[-1] = 1 if stack[-1] >= right else 0
+                elif op == EQUAL_TO:
+                    right = pop()
+                    stack[-1] = 1 if stack[-1] == right else 0
+                elif op == NOT_EQUAL_TO:
+                    right = pop()
+                    stack[-1] = 1 if stack[-1] != right else 0
+                elif op == LOGICAL_NOT:
+                    stack[-1] = 0 if stack[-1] else 1
+                elif op == NEGATE:
+                    stack[-1] = -stack[-1]
+                elif op == REF_LOCAL:
+                    push(Reference(variables, arg))
+                elif op == REF_GLOBAL:
+                    push(Reference(globalVariables, arg))
+                elif op == REF_INDEX:
+                    index = pop()
+                    array = pop()
+                    if array.__class__ != list or index.__class__ != int or not 0 <= index < len(array):
+                        raise IndexError
+                    push(Reference(array, index))
+                elif op == REF_MEMBER:
+                    struct = pop()
+                    if struct.__class__ != StructValue:
+                        raise TypeError
+                    push(Reference(struct, arg))
+                elif op == CALL_BUILTIN:
+                    count = arg & 0xff
+                    if count:
+                        values = stack[-count:]
+                        del stack[-count:]
+                    else:
+                        values = []
+                    push(builtins[arg >> 8](values))
+                elif op == MAKE_ARRAY:
+                    push(self.makeArray(pop(), constants[arg], function.lines[pc // 2 - 1]))
+                elif op == BUILD_STRUCT:
+                    if arg:
+                        values = StructValue(stack[-arg:])
+                        del stack[-arg:]
+                    else:
+                        values = StructValue()
+                    push(values)
+                else:
+                    self.runtimeError("Invalid opcode " + str(op), function.lines[pc // 2 - 1])
+
+        except ZeroDivisionError:
+            self.runtimeError("Division by zero", function.lines[pc // 2 - 1])
+        except (IndexError, TypeError, AttributeError):
+            self.runtimeError(errorMessages.get(op, "Invalid operation"), function.lines[pc // 2 - 1])
+
+
+    def makeArray(self, size, descriptor, line):
+        if size.__class__ != int or size < 0:
+            self.runtimeError("Invalid array size " + str(size), line)
+
+        kind, value = descriptor
+        if kind == "value":
+            return [value] * size
+
+        constructor = self.program.functions[value]
+        return [self.execute(constructor, []) for i in range(size)]
+
+
+#--------------- BUILTINS -----------------------------------
+    def builtinPrint(self, arguments):
+        print(" ".join(str(argument) for argument in arguments))
+        return 0